@@ -5,8 +5,8 @@ This work is licensed under the terms of the MIT license.
 For a copy, see LICENSE.txt in the project root.
 
 @author: Michael Küchenmeister - Technische Hochschule Ingolstadt (mik6331@thi.de)
-@version: 0.4
-@date: 15.01.2024
+@version: 0.5
+@date: 17.10.2026
 
 This script implements a Flask web application that serves as an API for handling 
 dataset filtering and metadata retrieval. The application provides the following functionality:
@@ -19,10 +19,48 @@ dataset filtering and metadata retrieval. The application provides the following
     3. Fetching Dataset Data: The '/api/data' endpoint handles requests for dataset data, 
        supporting pagination and filtering based on specified criteria. It reads data from 
        the 'response-data.json' file within the chosen dataset and applies filters, 
-       either recursively or using standard filtering methods.
+       either recursively or using standard filtering methods. Prefix filters can have an 'operator'
+       (covered_by, covers or lpm), other operators are answered with an error. The filtered data is cached
+       and shared by all sessions with the same filters (see helper/result_cache.py). With filters, the graphData
+       and pieData are those of the filtered data (see helper/chart_data.py). With 'sort_by' (prefix or a numeric
+       key) and 'sort_order' (asc or desc), the table data is sorted on the server by cached sort permutations
+       (see helper/sort_permutation.py). Page flips ('pagination_req') only return the datasetSum and tableData,
+       the graphData and pieData of the first page haven't changed. With 'cursor' (empty for the first page), the
+       page is read from the position where the previous page ended and the response has the 'cursor' of the next
+       page, None after the last page (see helper/export.py).
+       The '/api/data/aggregate' endpoint returns the datasetSum, graphData and pieData of a data source with an
+       ETag of the version of its response-data.json and answers requests with this ETag in If-None-Match with
+       304 Not Modified, without reading the file. The frontend loads the pages of a data source without filters
+       with GET requests to '/api/data' (the parameters in the query string), they get the same ETag. Parsed
+       response-data.json files are kept in memory until they change (see helper/hierarchy.py).
 
-    4. Retrieving Metadata: The '/api/metadata' endpoint retrieves metadata based on the specified path, 
-       utilizing the 'get_metadata' function from the 'helper.metadata' module.
+    4. Shared Spark Engine: The Spark session used by the filters is started once with the app and shared
+       by all requests. Its resources are configured by environment variables (see helper/spark_engine.py).
+
+    5. Filtered Data Cache: The '/api/cache' endpoint returns the hits, misses, evictions and size of the cache.
+
+    6. Filter Jobs: The '/api/jobs' endpoint runs a filter as an asynchronous job and returns its id immediately.
+       '/api/jobs/<job>' returns its progress (GET) or cancels it (DELETE), '/api/jobs/<job>/data' returns a page
+       of its filtered data, partial pages while it is running (see helper/filter_jobs.py).
+
+    7. Top ASNs: The '/api/top' endpoint returns the origin ASNs, transit ASNs or peers of a folder with the
+       highest validation counter (e.g. the most ROA invalid records), from the top-data.json files written by
+       sort_raw_exabgp_data.py (see helper/top_data.py).
+
+    8. Time Ranges: The '/api/range' endpoint returns the graphData and pieData of any time range of a data source
+       in buckets of any number of seconds, from the cumulative counters per second of the day folders
+       (see helper/range_counts.py).
+
+    9. Retrieving Metadata: The '/api/metadata' endpoint retrieves metadata based on the specified path, 
+       utilizing the 'get_metadata' function from the 'helper.metadata' module. '/api/metadata/batch' returns
+       the metadata of the AS numbers of several AS paths (the rows of a page) in one request.
+
+    10. Response Encoding: JSON responses of GET requests get an ETag and are answered with 304 Not Modified if
+        the client already has them. Large JSON responses are compressed with brotli or gzip according to the
+        Accept-Encoding of the request (see helper/response_encoding.py).
+
+    11. Export: The '/api/export' endpoint streams all records of a data source, or of its filtered data with the
+        'table_filter' of '/api/data', as NDJSON or CSV ('format') in chunks (see helper/export.py).
 
 Run with:
 python3 app.py
@@ -31,16 +69,26 @@ or to run in the background:
 nohup python3 app.py > app.log 2>&1 &
 '''
 
-from flask import Flask, request, send_from_directory
-from helper.metadata import get_metadata
-from helper.pagination import paginate_table_data, read_data_lines
-from helper.filter import recursive_table_data_filter, normal_table_data_filter
+from flask import Flask, Response, request, send_from_directory, jsonify, after_this_request
+from helper.metadata import get_metadata, get_metadata_batch
+from helper.pagination import paginate_table_data
+from helper.filter import (filter_table_data, read_filtered_data_lines, read_filtered_chart_data, get_filter_error,
+                           get_sort_error, get_data_source_result, read_sorted_data_lines, filter_pinned_table_data)
+from helper.result_cache import release_session_result, get_cache_statistics, pin_cached_result, unpin_cached_result
+from helper.filter_jobs import submit_filter_job, get_filter_job, read_filter_job_page, cancel_filter_job
+from helper.hierarchy import read_response_data, get_response_data_version
+from helper.response_encoding import make_conditional_response, compress_response
+from helper.export import EXPORT_FORMATS, read_cursor_page, stream_export
+from helper.top_data import TOP_DATA_KINDS, TOP_DATA_FIELDS, read_top_data, get_top_ranking
+from helper.range_counts import RANGE_MAX_BUCKETS, parse_range_time, create_range_response_data
+from helper.spark_engine import start_spark_engine, is_spark_available
 import os
-import shutil
-import json
 
 app = Flask(__name__)
 
+# JSON responses are sent without indentation, also in debug mode
+app.json.compact = True
+
 # Define the path to the React frontend build static directory
 react_folder = '../frontend'
 directory = os.getcwd() + f'/{react_folder}/build/static'
@@ -74,58 +122,319 @@ def get_available_datasets():
 
         return aviable_datasets
 
+# Function to get the ETag of the datasetSum, graphData and pieData of a data source (the version of its response-data.json),
+# None if the data source doesn't exist
+def get_response_data_etag(data_source):
+    version = get_response_data_version(os.path.join('./database', data_source, 'response-data.json'))
+    if version is not None:
+        return f'{version[0]:x}-{version[1]:x}'
+
+    # time periods without records have no response-data.json, their response is always empty
+    return 'empty' if read_response_data('./database', data_source) is not None else None
+
+# Function to set the ETag of a successful response
+def set_response_etag(response, etag):
+    if response.status_code == 200:
+        response.set_etag(etag)
+    return response
+
 # Define the route for getting data based on filters and pagination
-@app.route('/api/data', methods=['POST'])
+@app.route('/api/data', methods=['GET', 'POST'])
 def get_data():
-    if request.method == 'POST':
-        # Get parameters from the request
+    if request.method in ('GET', 'POST'):
+        # Get parameters from the request, GET requests (pages without filters) have all parameters in the query string
         page_size = int(request.args.get('page_size', 25))
         page_number = int(request.args.get('page_number', 1))
+        body = request.json if request.method == 'POST' else {}
 
-        data_source = request.json.get('data_source', "")
-        table_filter = request.json.get('table_filter', [])
-        session = request.json.get('uuid', "")[0]
-        pagination_req = request.json.get('pagination_req', "")
-        folder_path = './database/filtered_data/' + session
+        data_source = body.get('data_source', request.args.get('data_source', ""))
+        table_filter = body.get('table_filter', [])
+        session = body.get('uuid', [request.args.get('uuid', "")])[0]
+        pagination_req = body.get('pagination_req', request.args.get('pagination_req') == 'true')
+        sort_by = body.get('sort_by', request.args.get('sort_by'))
+        sort_order = body.get('sort_order', request.args.get('sort_order', 'asc'))
+        cursor_req = 'cursor' in body or 'cursor' in request.args
+        cursor = body.get('cursor', request.args.get('cursor')) or None
+
+        # The pages of GET requests only change with the response-data.json of the data source, so the client can
+        # revalidate them with its version as ETag (like '/api/data/aggregate')
+        if request.method == 'GET':
+            etag = get_response_data_etag(data_source)
+            if etag is None:
+                return {"error": f"Data source '{data_source}' not found."}, 404
+            if request.if_none_match.contains_weak(etag):
+                response = app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+            after_this_request(lambda response: set_response_etag(response, etag))
 
-        # Load data from the specified source
-        with open('./database/' + data_source + '/response-data.json', 'r') as f:
-            data = json.load(f)
+        # Load data from the specified source, time periods without records get an empty response
+        data = read_response_data('./database', data_source)
+        if data is None:
+            return {"error": f"Data source '{data_source}' not found."}, 404
+
+        # Reject filters with an operator that can't be evaluated
+        filter_error = get_filter_error(table_filter)
+        if filter_error is not None:
+            return {"error": filter_error}, 400
+
+        # Reject sort keys and orders that can't be sorted by
+        sort_error = get_sort_error(sort_by, sort_order)
+        if sort_error is not None:
+            return {"error": sort_error}, 400
+        if cursor_req and sort_by is not None:
+            return {"error": "'cursor' can't be combined with 'sort_by'."}, 400
 
         if table_filter == []:
-            # If no table filters, paginate the table data
-            if os.path.exists(folder_path) and os.path.isdir(folder_path):
-                shutil.rmtree(folder_path)
-                print("Folder with id=" + session + " is deleted!")
+            # If no table filters, the session no longer references filtered data and the table data is paginated
+            release_session_result(session)
+
+            if sort_by is not None and os.path.isdir('./database/' + data_source):
+                # A sorted page is read from the sort permutation of all records of the data source
+                entry_path, _ = get_data_source_result(data_source)
+                data["tableData"] = read_sorted_data_lines(entry_path, page_number, page_size, sort_by, sort_order)
+                if data["tableData"] is None:
+                    # The entry has been removed from the cache since it was found, so it is created again
+                    entry_path, _ = get_data_source_result(data_source)
+                    data["tableData"] = read_sorted_data_lines(entry_path, page_number, page_size, sort_by, sort_order) or []
+            elif cursor_req:
+                # The page is read from the cursor on, the response has the cursor of the next page
+                page = read_cursor_page('./database/' + data_source, None, cursor, page_size)
+                if page is None:
+                    return {"error": "Invalid cursor."}, 400
+                data["tableData"], data["cursor"] = page
+            else:
+                _, table_data = paginate_table_data('./database/' + data_source, page_number, page_size)
+                data["tableData"] = table_data
 
-            valid, table_data = paginate_table_data('./database/' + data_source, page_number, page_size)
-            data["tableData"] = table_data
+            # Page flips only need the rows of the page, the charts of the data source haven't changed
+            if pagination_req == True:
+                return get_page_response(data)
         else:
             # If table filters are present, apply filtering
-            if os.path.exists(folder_path) and os.path.isdir(folder_path):
-                filtered_data_file_name = [f for f in os.listdir('./database/filtered_data/' + session) if f.endswith('.json')]
-                if pagination_req == True:
-                    # If pagination is requested, read data for the specified page
-                    filtered_data_file_name = [f for f in os.listdir('./database/filtered_data/' + session) if f.endswith('.json')]
-                    table_data = read_data_lines('./database/filtered_data/'+ session + "/" + filtered_data_file_name[0], page_number, page_size)
-                    data["tableData"] = table_data
-                else:
-                    # If pagination is not requested, apply normal filtering
-                    num_filtered_rows = normal_table_data_filter('./database/filtered_data/'+ session + "/" + filtered_data_file_name[0], table_filter, session)
-                    filtered_data_file_name = [f for f in os.listdir('./database/filtered_data/' + session) if f.endswith('.json')]
-                    table_data = read_data_lines('./database/filtered_data/'+ session + "/" + filtered_data_file_name[0], page_number, page_size)
-                    data["datasetSum"] = num_filtered_rows
-                    data["tableData"] = table_data
+            if not os.path.isdir('./database/' + data_source):
+                # Time periods without records have no folder, so no records match the filters
+                data["datasetSum"] = 0
+                data["tableData"] = []
+                if cursor_req:
+                    data["cursor"] = None
             else:
-                # If no existing filtered data, apply recursive filtering
-                num_filtered_rows = recursive_table_data_filter('./database/' + data_source, table_filter, session)
-                filtered_data_file_name = [f for f in os.listdir('./database/filtered_data/' + session) if f.endswith('.json')]
-                table_data = read_data_lines('./database/filtered_data/'+ session + "/" + filtered_data_file_name[0], page_number, page_size)
+                # The filtered data is taken from the cache shared by all sessions, or filtered and added to it
+                entry_path, num_filtered_rows = filter_table_data(data_source, table_filter, session)
+                if sort_by is not None:
+                    data["tableData"] = read_sorted_data_lines(entry_path, page_number, page_size, sort_by, sort_order)
+                    if data["tableData"] is None:
+                        # The filtered data has been removed from the cache since it was found, so it is filtered again
+                        entry_path, num_filtered_rows = filter_table_data(data_source, table_filter, session)
+                        data["tableData"] = read_sorted_data_lines(entry_path, page_number, page_size, sort_by, sort_order) or []
+                elif cursor_req:
+                    # The entry is pinned while the page is read, so it isn't evicted in the meantime
+                    if not pin_cached_result(entry_path):
+                        entry_path, num_filtered_rows = filter_pinned_table_data(data_source, table_filter, session)
+                    try:
+                        page = read_cursor_page('./database/' + data_source, entry_path, cursor, page_size)
+                    finally:
+                        unpin_cached_result(entry_path)
+                    if page is None:
+                        return {"error": "Invalid cursor."}, 400
+                    data["tableData"], data["cursor"] = page
+                else:
+                    data["tableData"] = read_filtered_data_lines(entry_path, page_number, page_size)
+                    if data["tableData"] is None:
+                        # The filtered data has been removed from the cache since it was found, so it is filtered again
+                        entry_path, num_filtered_rows = filter_table_data(data_source, table_filter, session)
+                        data["tableData"] = read_filtered_data_lines(entry_path, page_number, page_size) or []
+
                 data["datasetSum"] = num_filtered_rows
-                data["tableData"] = table_data
+
+                # Page flips only need the rows of the page, the charts of the filtered data haven't changed
+                if pagination_req == True:
+                    return get_page_response(data)
+
+                # The charts show the validation results of the filtered data
+                chart_data = read_filtered_chart_data(entry_path, data_source)
+                if chart_data is not None:
+                    data["graphData"] = chart_data["graphData"]
+                    data["pieData"] = chart_data["pieData"]
 
         return data
 
+# Function to get the response of a page flip: the rows of the page without the charts
+def get_page_response(data):
+    return {key: data[key] for key in ("datasetSum", "tableData", "cursor") if key in data}
+
+# Define the route for exporting all (filtered) records of a data source as NDJSON or CSV
+@app.route('/api/export', methods=['POST'])
+def export_data():
+    if request.method == 'POST':
+        data_source = request.json.get('data_source', "")
+        table_filter = request.json.get('table_filter', [])
+        session = request.json.get('uuid', "")[0]
+        export_format = request.json.get('format', request.args.get('format', 'ndjson'))
+
+        if export_format not in EXPORT_FORMATS:
+            return {"error": f"Format '{export_format}' is not supported (supported: {', '.join(EXPORT_FORMATS)})."}, 400
+        if read_response_data('./database', data_source) is None:
+            return {"error": f"Data source '{data_source}' not found."}, 404
+
+        filter_error = get_filter_error(table_filter)
+        if filter_error is not None:
+            return {"error": filter_error}, 400
+
+        # The filtered data is taken from the cache (or filtered) before the response starts, time periods without records have no folder.
+        # Its cache entry is pinned until the response is closed, so it isn't evicted while the records are sent
+        entry_path = None
+        if table_filter != [] and os.path.isdir('./database/' + data_source):
+            entry_path, _ = filter_pinned_table_data(data_source, table_filter, session)
+
+        # The records are sent in chunks while they are read
+        file_name = '_'.join(part for part in data_source.replace(':', '').split('/') if part) or 'export'
+        response = Response(stream_export('./database/' + data_source, entry_path, export_format), mimetype=EXPORT_FORMATS[export_format],
+                            headers={"Content-Disposition": f'attachment; filename="{file_name}.{export_format}"'})
+        if entry_path is not None:
+            response.call_on_close(lambda: unpin_cached_result(entry_path))
+        return response
+
+# Define the route for getting the datasetSum, graphData and pieData of a data source
+@app.route('/api/data/aggregate', methods=['GET'])
+def get_aggregate():
+    if request.method == 'GET':
+        data_source = request.args.get('data_source', "")
+
+        # The ETag is the version of the response-data.json, a data source that doesn't exist has none
+        etag = get_response_data_etag(data_source)
+        if etag is None:
+            return {"error": f"Data source '{data_source}' not found."}, 404
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+
+        data = read_response_data('./database', data_source)
+        if data is None:
+            return {"error": f"Data source '{data_source}' not found."}, 404
+
+        response = jsonify({"datasetSum": data["datasetSum"], "graphData": data["graphData"], "pieData": data["pieData"]})
+        response.set_etag(etag)
+        return response
+
+# Define the route for getting the statistics of the filtered data cache
+@app.route('/api/cache', methods=['GET'])
+def get_cache():
+    if request.method == 'GET':
+        return get_cache_statistics()
+
+# Define the route for submitting a filter job
+@app.route('/api/jobs', methods=['POST'])
+def submit_job():
+    if request.method == 'POST':
+        data_source = request.json.get('data_source', "")
+        table_filter = request.json.get('table_filter', [])
+        session = request.json.get('uuid', "")[0]
+
+        # Only folders with records can be filtered by a job
+        if read_response_data('./database', data_source) is None or not os.path.isdir('./database/' + data_source):
+            return {"error": f"Data source '{data_source}' has no records."}, 404
+
+        if table_filter == []:
+            return {"error": "A filter job needs at least one table filter."}, 400
+
+        filter_error = get_filter_error(table_filter)
+        if filter_error is not None:
+            return {"error": filter_error}, 400
+
+        # The job is queued and its id is returned immediately
+        return submit_filter_job(data_source, table_filter, session), 202
+
+# Define the route for getting the progress of a filter job or cancelling it
+@app.route('/api/jobs/<job_id>', methods=['GET', 'DELETE'])
+def get_job(job_id):
+    job = get_filter_job(job_id) if request.method == 'GET' else cancel_filter_job(job_id)
+    if job is None:
+        return {"error": f"Filter job '{job_id}' not found."}, 404
+    return job
+
+# Define the route for getting a page of the filtered data of a filter job
+@app.route('/api/jobs/<job_id>/data', methods=['GET'])
+def get_job_data(job_id):
+    if request.method == 'GET':
+        page_size = int(request.args.get('page_size', 25))
+        page_number = int(request.args.get('page_number', 1))
+        sort_by = request.args.get('sort_by')
+        sort_order = request.args.get('sort_order', 'asc')
+
+        sort_error = get_sort_error(sort_by, sort_order)
+        if sort_error is not None:
+            return {"error": sort_error}, 400
+
+        job = get_filter_job(job_id)
+        page = read_filter_job_page(job_id, page_number, page_size, sort_by, sort_order)
+        if job is None or page is None:
+            return {"error": f"Filter job '{job_id}' not found."}, 404
+
+        # The response has the format of '/api/data', while the job is running the tableData is a partial page
+        data = read_response_data('./database', job["data_source"])
+        if data is None:
+            # the data source has been removed since the job was submitted
+            return {"error": f"Data source '{job['data_source']}' not found."}, 404
+        data["datasetSum"], data["tableData"], chart_data, data["partial"] = page
+        data["state"] = job["state"]
+        if chart_data is not None:
+            data["graphData"] = chart_data["graphData"]
+            data["pieData"] = chart_data["pieData"]
+
+        return data
+
+# Define the route for getting the ASNs with the highest validation counters of a folder
+@app.route('/api/top', methods=['GET'])
+def get_top():
+    if request.method == 'GET':
+        data_source = request.args.get('data_source', "")
+        kind = request.args.get('kind', "origin")
+        field = request.args.get('field', "ROA.invalid")
+        limit = int(request.args.get('limit', 10))
+
+        if kind not in TOP_DATA_KINDS:
+            return {"error": f"Kind '{kind}' is not supported (supported: {', '.join(TOP_DATA_KINDS)})."}, 400
+        if field not in TOP_DATA_FIELDS:
+            return {"error": f"Field '{field}' is not supported (supported: {', '.join(TOP_DATA_FIELDS)})."}, 400
+
+        data = read_response_data('./database', data_source)
+        if data is None:
+            return {"error": f"Data source '{data_source}' not found."}, 404
+
+        # The ranking is taken from the counters of the folder, time periods without records have no counters
+        top_data = read_top_data('./database/' + data_source)
+        if top_data is None and data["datasetSum"] > 0:
+            return {"error": f"Data source '{data_source}' has no ASN counters, it has been sorted by an older version of sort_raw_exabgp_data.py."}, 404
+
+        top = get_top_ranking(top_data, kind, field, max(limit, 0)) if top_data is not None else []
+        return {"data_source": data_source, "kind": kind, "field": field, "datasetSum": data["datasetSum"], "top": top}
+
+# Define the route for getting the charts of a time range in buckets of a number of seconds
+@app.route('/api/range', methods=['GET'])
+def get_range():
+    if request.method == 'GET':
+        data_source = request.args.get('data_source', "")
+        start = parse_range_time(request.args.get('start'))
+        end = parse_range_time(request.args.get('end'))
+        bucket = int(request.args.get('bucket', 60))
+
+        if start is None or end is None or start >= end:
+            return {"error": "'start' and 'end' must be times (unix time or ISO 8601) with start before end."}, 400
+        if bucket <= 0 or (end - start + bucket - 1) // bucket > RANGE_MAX_BUCKETS:
+            return {"error": f"'bucket' must be a positive number of seconds that divides the range into at most {RANGE_MAX_BUCKETS} buckets."}, 400
+
+        # The range is counted over the day folders of the root folder of the data source
+        root_folder = [part for part in data_source.split('/') if part][:1]
+        if not root_folder or not os.path.isdir(os.path.join('./database', root_folder[0])):
+            return {"error": f"Data source '{data_source}' not found."}, 404
+
+        data = create_range_response_data(os.path.join('./database', root_folder[0]), start, end, bucket)
+        if data is None:
+            return {"error": f"Data source '{data_source}' has no counters per second, it has been sorted by an older version of sort_raw_exabgp_data.py."}, 404
+        return data
+
 # Define the route for getting metadata
 @app.route('/api/metadata', methods=['POST'])
 def get_meta_data():
@@ -135,6 +444,30 @@ def get_meta_data():
         result = get_metadata(req_data.get("aspath", []))
         return result
 
+# Define the route for getting the metadata of the AS paths of a page
+@app.route('/api/metadata/batch', methods=['POST'])
+def get_meta_data_batch():
+    if request.method == 'POST':
+        # Get the metadata of all AS numbers of the specified AS paths, by AS number
+        aspaths = request.json.get("aspaths", [])
+        if not isinstance(aspaths, list) or not all(isinstance(aspath, list) for aspath in aspaths):
+            return {"error": "'aspaths' must be a list of AS paths."}, 400
+        return get_metadata_batch(aspaths)
+
+# Add an ETag to the JSON responses of GET requests and compress large JSON responses
+@app.after_request
+def encode_response(response):
+    response = make_conditional_response(request, response)
+    return compress_response(request, response)
+
 # Run the Flask app
 if __name__ == '__main__':
-    app.run(debug=True, threaded=True, host='0.0.0.0', port=8080)
+    # The debug mode (FLASK_DEBUG, default: 1) runs the app in a child process of the reloader
+    debug = os.environ.get('FLASK_DEBUG', '1') == '1'
+
+    # Start the Spark engine in the process that serves the requests, not in the reloader process of the debug mode,
+    # without PySpark all filters run on the local backend
+    if is_spark_available() and (not debug or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+        start_spark_engine()
+
+    app.run(debug=debug, threaded=True, host='0.0.0.0', port=8080)
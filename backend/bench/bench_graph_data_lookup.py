@@ -0,0 +1,119 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script measures how fast sort_raw_exabgp_data.py updates the per-second graphData datasets of the
+response-data.json of a minute folder. It includes the following key functionalities:
+
+1. bench_label_lookup Function:
+   - Feeds the records of a hot minute (--records updates spread over --labels second labels) through
+     update_response_data, which looks up the graphData dataset of a label in a dict (get_graph_data_dataset).
+
+2. bench_label_scan Function:
+   - Runs the same updates with the previous lookup, which scanned graphData for the label and sorted it after
+     every new label, as the baseline.
+
+Run from the backend folder with: python3 bench/bench_graph_data_lookup.py [--records 30000] [--labels 60] [--repeat 5]
+'''
+
+import os
+import sys
+import copy
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sort_raw_exabgp_data as sorter
+from helper.hierarchy import graph_data_dataset_format, create_empty_response_data
+
+# File path of the opened response-data.json, the file is never written
+FILE_PATH = 'bench/2019-06-06/02:00/00:10/00:01/response-data.json'
+
+# Function to create the records of a hot minute, (record, second label) pairs
+def create_updates(records, labels):
+    rng = random.Random(1)
+    updates = []
+    for _ in range(records):
+        record = {"roa1": rng.randrange(3), "aspa1": rng.randrange(3), "aspa2": rng.randrange(3)}
+        updates.append((record, f"00:00:{rng.randrange(labels):02d}"))
+    return updates
+
+# Function to open an empty response-data.json of a minute folder
+def open_minute_response_data():
+    sorter.OPEND_FILES_TO_WRITE.clear()
+    sorter.GRAPH_DATA_BY_LABEL.clear()
+    sorter.UNSORTED_GRAPH_DATA.clear()
+    sorter.OPEND_FILES_TO_WRITE[FILE_PATH] = create_empty_response_data([])
+    return sorter.OPEND_FILES_TO_WRITE[FILE_PATH]
+
+# Function to update the graphData dataset of a label by scanning graphData (the lookup before the dict index)
+def update_response_data_by_scan(data_to_update, data, time_formatted):
+    data_to_update["datasetSum"] += 1
+    graph_data_to_update = data_to_update["graphData"]
+
+    update_graph_data_dataset = {}
+    for dataset in graph_data_to_update:
+        if dataset["label"] == time_formatted:
+            update_graph_data_dataset = dataset
+            break
+
+    if update_graph_data_dataset == {}:
+        update_graph_data_dataset = copy.deepcopy(graph_data_dataset_format)
+        update_graph_data_dataset["label"] = time_formatted
+        graph_data_to_update.append(update_graph_data_dataset)
+        data_to_update["graphData"] = sorted(graph_data_to_update, key=lambda x: x['label'])
+
+    sorter.update_validation_results(update_graph_data_dataset, data_to_update["pieData"], data)
+
+# Function to measure the updates with the dict lookup, returns the seconds and the graphData
+def bench_label_lookup(updates):
+    open_minute_response_data()
+    start_time = time.perf_counter()
+    for record, label in updates:
+        sorter.update_response_data(FILE_PATH, record, None, label)
+    elapsed_time = time.perf_counter() - start_time
+
+    # write_opend_files sorts the new labels once
+    data = sorter.OPEND_FILES_TO_WRITE[FILE_PATH]
+    return elapsed_time, sorted(data["graphData"], key=lambda x: x['label'])
+
+# Function to measure the updates with the scan of graphData, returns the seconds and the graphData
+def bench_label_scan(updates):
+    data = open_minute_response_data()
+    start_time = time.perf_counter()
+    for record, label in updates:
+        update_response_data_by_scan(data, record, label)
+    return time.perf_counter() - start_time, data["graphData"]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--records', type=int, default=30000, help='number of records of the minute (default: 30000)')
+    parser.add_argument('--labels', type=int, default=60, help='number of second labels (default: 60)')
+    parser.add_argument('--repeat', type=int, default=5, help='number of runs, the best one is reported (default: 5)')
+    args = parser.parse_args()
+
+    updates = create_updates(args.records, args.labels)
+    lookup_times, scan_times = [], []
+    for _ in range(args.repeat):
+        lookup_time, lookup_graph_data = bench_label_lookup(updates)
+        scan_time, scan_graph_data = bench_label_scan(updates)
+        lookup_times.append(lookup_time)
+        scan_times.append(scan_time)
+
+    # both lookups must count the same records
+    assert lookup_graph_data == scan_graph_data
+
+    print(f"{args.records} updates over {args.labels} labels, best of {args.repeat} runs")
+    print(f"scan    {min(scan_times) * 1000:8.1f} ms")
+    print(f"lookup  {min(lookup_times) * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
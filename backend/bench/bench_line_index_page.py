@@ -0,0 +1,105 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script measures how fast a page of a datasets.json file is read with and without its line index
+(see helper/line_index.py). It includes the following key functionalities:
+
+1. create_datasets_files Function:
+   - Writes a datasets.json file with --lines records into two temporary folders, only one of them gets a line index.
+
+2. bench_page_reads Function:
+   - Reads the same pages of both files with read_data_rows of pagination.py (the file without index is read
+     from its first line) and reports the mean time per page.
+
+Run from the backend folder with: python3 bench/bench_line_index_page.py [--lines 600000] [--page-size 25] [--repeat 3]
+'''
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper.line_index import write_line_index
+from helper.pagination import read_data_rows
+
+# Pages that are read, the pages after the end of the file are skipped
+PAGE_NUMBERS = (1, 100, 1000, 4000, 20000)
+
+# Function to write a datasets.json file with lines records into the folders scan and indexed of temp_folder
+def create_datasets_files(temp_folder, lines):
+    rng = random.Random(1)
+    file_paths = {}
+    for name in ("scan", "indexed"):
+        os.makedirs(os.path.join(temp_folder, name))
+        file_paths[name] = os.path.join(temp_folder, name, 'datasets.json')
+
+    with open(file_paths["scan"], 'w') as f:
+        for i in range(lines):
+            record = {
+                "prefix": f"11.{rng.randrange(256)}.{rng.randrange(256)}.0", "length": 24, "aspath": ["15169", "174", "56203"],
+                "roa1": rng.randrange(3), "aspa1": rng.randrange(3), "aspa2": rng.randrange(3), "sourceip": "80.249.208.14",
+                "sourceasn": "13335", "numberpeers": 1, "nexthopip": "80.249.209.15", "timestamp": 1559779200 + i // 10
+            }
+            f.write(json.dumps(record) + '\n')
+
+    shutil.copyfile(file_paths["scan"], file_paths["indexed"])
+    start_time = time.perf_counter()
+    write_line_index(file_paths["indexed"])
+    print(f"line index of {lines} lines written in {time.perf_counter() - start_time:.2f}s")
+    return file_paths
+
+# Function to get the mean time in ms to read a page of a file
+def bench_page_read(file_path, page_number, page_size, repeat):
+    start_index = (page_number - 1) * page_size
+    start_time = time.perf_counter()
+    for _ in range(repeat):
+        rows = read_data_rows(file_path, start_index, start_index + page_size)
+    return (time.perf_counter() - start_time) / repeat * 1000, rows
+
+# Function to read the pages of both files and print the mean time per page
+def bench_page_reads(file_paths, lines, page_size, repeat):
+    page_numbers = [page_number for page_number in PAGE_NUMBERS if (page_number - 1) * page_size < lines]
+    times = {name: [] for name in file_paths}
+
+    for page_number in page_numbers:
+        results = {name: bench_page_read(file_path, page_number, page_size, repeat) for name, file_path in file_paths.items()}
+
+        # both reads must return the same rows
+        assert results["scan"][1] == results["indexed"][1]
+        for name, (page_time, _) in results.items():
+            times[name].append(page_time)
+
+    print(f"{page_size} rows per page, mean of {repeat} reads")
+    print("page     " + "".join(f"{page_number:>10}" for page_number in page_numbers))
+    for name, page_times in times.items():
+        print(f"{name:<9}" + "".join(f"{page_time:>8.2f}ms" for page_time in page_times))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=600000, help='number of records of the file (default: 600000)')
+    parser.add_argument('--page-size', type=int, default=25, help='number of rows per page (default: 25)')
+    parser.add_argument('--repeat', type=int, default=3, help='number of reads of each page (default: 3)')
+    args = parser.parse_args()
+
+    temp_folder = tempfile.mkdtemp()
+    try:
+        file_paths = create_datasets_files(temp_folder, args.lines)
+        bench_page_reads(file_paths, args.lines, args.page_size, args.repeat)
+    finally:
+        shutil.rmtree(temp_folder)
+
+
+if __name__ == "__main__":
+    main()
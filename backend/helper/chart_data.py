@@ -0,0 +1,114 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script creates the graphData and pieData of filtered data, with the same time buckets and labels as the
+response-data.json files written by sort_raw_exabgp_data.py. The filter backends group the filtered records by
+time bucket and validation states (roa1, aspa1, aspa2), this script turns the counts of the groups
+into the datasets of the charts. It includes the following key functionalities:
+
+1. get_bucket_width Function:
+   - Returns how the timestamps of the records are divided into the time buckets (graphData datasets) of a folder:
+     days in the root folder, two hours in a day folder, ten minutes in a two hour folder, minutes in a ten minute
+     folder and seconds in a minute folder.
+
+2. create_chart_data Function:
+   - Creates the graphData and pieData from the counts of the groups.
+
+3. write_chart_data and read_chart_data Functions:
+   - Write and read the chart data of the filtered data in an entry of the filtered data cache (see result_cache.py).
+'''
+
+import os
+import json
+import threading
+from datetime import datetime, timezone
+from helper.hierarchy import create_empty_response_data, get_date_folder, get_time_label, get_graph_data_sort_key
+
+CHART_DATA_FILE = 'chart-data.json'
+
+SECONDS_PER_DAY = 86400
+
+# Time buckets of the folder levels (number of folders below the root folder): (period of the buckets or None, width of a bucket in seconds)
+BUCKET_WIDTHS = [(None, SECONDS_PER_DAY), (SECONDS_PER_DAY, 7200), (7200, 600), (600, 60), (None, 1)]
+
+# Validation states counted in the charts: chart key -> (record key, value of the record -> state)
+VALIDATION_STATES = {
+    "ROA": ("roa1", {2: "invalid", 0: "valid", 1: "unknown"}),
+    "ASPA_CAIDA": ("aspa2", {1: "invalid", 2: "valid", 0: "unknown"}),
+    "ASPA_AI": ("aspa1", {1: "invalid", 2: "valid", 0: "unknown"})
+}
+
+# Function to get the folder names below the root folder of a data source, e.g. ['2019-06-06', '02:00'] for example/2019-06-06/02:00
+def get_bucket_scope(data_source):
+    return [part for part in data_source.split('/') if part][1:]
+
+# Function to get the time buckets of a folder, returns (period or None, width): the bucket of a timestamp is (timestamp % period) // width
+def get_bucket_width(path_parts):
+    return BUCKET_WIDTHS[min(len(path_parts), len(BUCKET_WIDTHS) - 1)]
+
+# Function to get the graphData label of a bucket in the root folder (a day) or a minute folder (a second)
+def get_bucket_label(bucket, path_parts):
+    if not path_parts:
+        time_utc = datetime.fromtimestamp(bucket * SECONDS_PER_DAY, timezone.utc)
+        return get_date_folder(time_utc.year, time_utc.month, time_utc.day)[1]
+    return get_time_label(datetime.fromtimestamp(bucket, timezone.utc))
+
+# Function to create the datasetSum, graphData and pieData of a folder from the counts of (bucket, roa1, aspa1, aspa2, count) groups
+def create_chart_data(path_parts, groups):
+    chart_data = create_empty_response_data(path_parts)
+    del chart_data["tableData"]
+    graph_data = chart_data["graphData"]
+    graph_data_by_label = {}
+
+    for bucket, roa1, aspa1, aspa2, count in groups:
+        chart_data["datasetSum"] += count
+        if bucket is None:
+            continue
+
+        if graph_data:
+            # the folders of days, two hours and ten minutes have a dataset for each of their sub folders
+            if not 0 <= bucket < len(graph_data):
+                continue
+            dataset = graph_data[bucket]
+        else:
+            # the root folder and the minute folders have a dataset for each day or second with records
+            label = get_bucket_label(bucket, path_parts)
+            dataset = graph_data_by_label.get(label)
+            if dataset is None:
+                dataset = create_empty_response_data([])["pieData"]
+                dataset["label"] = label
+                graph_data_by_label[label] = dataset
+
+        values = {"roa1": roa1, "aspa1": aspa1, "aspa2": aspa2}
+        for validation, (key, states) in VALIDATION_STATES.items():
+            state = states.get(values[key])
+            if state is not None:
+                dataset[validation][state] += count
+                chart_data["pieData"][validation][state] += count
+
+    if graph_data_by_label:
+        chart_data["graphData"] = sorted(graph_data_by_label.values(), key=get_graph_data_sort_key)
+
+    return chart_data
+
+# Function to write the chart data of filtered data into a (cache entry) folder
+def write_chart_data(folder_path, chart_data):
+    chart_data_path = os.path.join(folder_path, CHART_DATA_FILE)
+    temp_path = f'{chart_data_path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    with open(temp_path, 'w') as f:
+        f.write(json.dumps(chart_data))
+    os.replace(temp_path, chart_data_path)
+
+# Function to read the chart data of the filtered data of a (cache entry) folder, None if it has none
+def read_chart_data(folder_path):
+    try:
+        with open(os.path.join(folder_path, CHART_DATA_FILE), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
@@ -0,0 +1,279 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides a binary, column based copy of the datasets.json file of a minute folder. The columns are
+stored as NumPy .npy files in the sub folder 'columns' and can be memory-mapped, so reading a range of records or
+a single column doesn't require parsing JSON. It includes the following key functionalities:
+
+1. read_partition_columns and write_partition_columns Functions:
+   - Read the datasets.json file of a minute folder and write its records as typed columns:
+     family/prefix_hi/prefix_lo (prefix as 128 bit integer), length, roa1, aspa1, aspa2 (uint8), timestamp,
+     numberpeers and the ids of the AS path, source IP, next hop IP and source ASN in the dictionary of the data
+     source (see dictionary.py).
+   - roa2, roa3 and aspa3 are optional uint8 columns, UINT8_MAX marks records without them. Keys that have no
+     column are kept per row in extras.json next to the columns.
+   - read_partition_columns assigns ids local to the minute folder, sort_raw_exabgp_data.py replaces them by the
+     ids of the dictionary before the columns are written.
+   - Records that can't be stored without loss (a missing key, non-numeric AS numbers, ...) keep the folder without
+     columns, the readers then fall back to datasets.json.
+
+2. load_partition_columns Function:
+   - Loads the memory-mapped columns (all or only the requested ones) and the dictionary of a minute folder,
+     or None if there are none or they are outdated.
+
+3. read_column_rows Function:
+   - Rebuilds the records of a range of rows in the JSON format of datasets.json.
+'''
+
+import os
+import json
+import shutil
+import ipaddress
+import numpy as np
+from helper.dictionary import DICTIONARY_COLUMNS, load_dictionary_tables, get_aspath, get_string_value
+from helper.hierarchy import RECORD_KEYS
+
+COLUMNS_FOLDER = 'columns'
+
+# Validation states that not every exaBGP output has, UINT8_MAX in their column marks a record without them
+OPTIONAL_STATE_KEYS = ("roa2", "roa3", "aspa3")
+
+# Keys every record must have to be stored as columns
+REQUIRED_KEYS = tuple(key for key in RECORD_KEYS if key not in OPTIONAL_STATE_KEYS)
+
+# File with the keys of the records that have no column (row -> other keys)
+EXTRAS_FILE = 'extras.json'
+
+COLUMN_TYPES = {
+    "family": np.uint8,
+    "prefix_hi": np.uint64,
+    "prefix_lo": np.uint64,
+    "length": np.uint8,
+    "roa1": np.uint8,
+    "aspa1": np.uint8,
+    "aspa2": np.uint8,
+    "roa2": np.uint8,
+    "roa3": np.uint8,
+    "aspa3": np.uint8,
+    "timestamp": np.int64,
+    "numberpeers": np.uint32,
+    "aspath": np.uint32,
+    "sourceip": np.uint32,
+    "nexthopip": np.uint32,
+    "sourceasn": np.uint32
+}
+
+UINT8_MAX = 2**8 - 1
+UINT32_MAX = 2**32 - 1
+INT64_MAX = 2**63 - 1
+
+# Function to convert an IP address string into (family, upper 64 bit, lower 64 bit), None if it isn't canonical
+def address_to_int(address):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return None
+
+    if str(ip) != address:
+        return None
+
+    value = int(ip)
+    return ip.version, value >> 64, value & 0xFFFFFFFFFFFFFFFF
+
+# Function to convert (family, upper 64 bit, lower 64 bit) back into an IP address string
+def int_to_address(family, prefix_hi, prefix_lo):
+    value = (prefix_hi << 64) | prefix_lo
+    if family == 4:
+        return str(ipaddress.IPv4Address(value))
+    return str(ipaddress.IPv6Address(value))
+
+# Function to convert an AS number string into an integer, None if it isn't a canonical 32 bit AS number
+def asn_to_int(asn):
+    if not isinstance(asn, str) or not asn.isdigit() or str(int(asn)) != asn or int(asn) > UINT32_MAX:
+        return None
+    return int(asn)
+
+# Function to check that a value is an integer between 0 and maximum
+def is_unsigned(value, maximum):
+    return type(value) is int and 0 <= value <= maximum
+
+# Function to build the columns of a list of records with local ids, the values of the ids and the other keys of the records (row -> keys),
+# None if a record can't be stored without loss
+def build_partition_columns(records):
+    columns = {name: [] for name in COLUMN_TYPES}
+    local_ids = {name: {} for name in DICTIONARY_COLUMNS}
+    extras = {}
+
+    for row, record in enumerate(records):
+        if not isinstance(record, dict) or any(key not in record for key in REQUIRED_KEYS):
+            return None
+
+        prefix = address_to_int(record["prefix"]) if isinstance(record["prefix"], str) else None
+        sourceasn = asn_to_int(record["sourceasn"])
+        if prefix is None or sourceasn is None or not isinstance(record["aspath"], list):
+            return None
+        if not isinstance(record["sourceip"], str) or not isinstance(record["nexthopip"], str):
+            return None
+
+        for name, maximum in (("length", 128), ("roa1", UINT8_MAX), ("aspa1", UINT8_MAX), ("aspa2", UINT8_MAX),
+                              ("numberpeers", UINT32_MAX), ("timestamp", INT64_MAX)):
+            if not is_unsigned(record[name], maximum):
+                return None
+            columns[name].append(record[name])
+
+        for name in OPTIONAL_STATE_KEYS:
+            if name in record and not is_unsigned(record[name], UINT8_MAX - 1):
+                return None
+            columns[name].append(record.get(name, UINT8_MAX))
+
+        other_keys = {key: value for key, value in record.items() if key not in RECORD_KEYS}
+        if other_keys:
+            extras[row] = other_keys
+
+        columns["family"].append(prefix[0])
+        columns["prefix_hi"].append(prefix[1])
+        columns["prefix_lo"].append(prefix[2])
+
+        aspath = tuple(asn_to_int(asn) for asn in record["aspath"])
+        if None in aspath:
+            return None
+
+        # the first occurrence of a value gets the next local id
+        for name, value in (("aspath", aspath), ("sourceip", record["sourceip"]), ("nexthopip", record["nexthopip"]), ("sourceasn", sourceasn)):
+            ids = local_ids[name]
+            columns[name].append(ids.setdefault(value, len(ids)))
+
+    arrays = {name: np.array(values, dtype=COLUMN_TYPES[name]) for name, values in columns.items()}
+    return arrays, {name: list(ids) for name, ids in local_ids.items()}, extras
+
+# Function to read the datasets.json file in folder_path, returns (columns with local ids, values of the ids, other keys, file size) or None
+def read_partition_columns(folder_path):
+    dataset_path = os.path.join(folder_path, 'datasets.json')
+
+    with open(dataset_path, 'r') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    source_size = os.path.getsize(dataset_path)
+
+    partition = build_partition_columns(records)
+    if partition is None:
+        return None
+
+    return partition[0], partition[1], partition[2], source_size
+
+# Function to remove the columns of a minute folder, outdated columns must not be used instead of datasets.json
+def remove_partition_columns(folder_path):
+    shutil.rmtree(os.path.join(folder_path, COLUMNS_FOLDER), ignore_errors=True)
+
+# Function to write the columns (with the ids of the dictionary version dictionary_version) of a minute folder
+def write_partition_columns(folder_path, arrays, extras, source_size, dictionary_version):
+    columns_path = os.path.join(folder_path, COLUMNS_FOLDER)
+
+    # write the columns into a temporary folder and replace the existing columns afterwards
+    temp_path = f'{columns_path}.tmp-{os.getpid()}'
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(temp_path, name + '.npy'), array)
+
+    if extras:
+        with open(os.path.join(temp_path, EXTRAS_FILE), 'w') as f:
+            f.write(json.dumps(sorted(extras.items())))
+
+    with open(os.path.join(temp_path, 'meta.json'), 'w') as f:
+        f.write(json.dumps({"rows": len(arrays["timestamp"]), "source_size": source_size, "dictionary_version": dictionary_version}))
+
+    old_path = f'{columns_path}.old-{os.getpid()}'
+    if os.path.exists(columns_path):
+        os.replace(columns_path, old_path)
+    os.replace(temp_path, columns_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+# Function to get the root folder of a data source from one of its minute folders (root/day/two hours/ten minutes/minute)
+def get_root_folder_path(folder_path):
+    return os.path.normpath(os.path.join(folder_path, '..', '..', '..', '..'))
+
+# Function to load a memory-mapped column, the optional columns of columns written without them are marked as missing
+def load_column(columns_path, name, rows):
+    try:
+        return np.load(os.path.join(columns_path, name + '.npy'), mmap_mode='r')
+    except FileNotFoundError:
+        if name not in OPTIONAL_STATE_KEYS:
+            raise
+        return np.full(rows, UINT8_MAX, dtype=COLUMN_TYPES[name])
+
+# Function to load the memory-mapped columns (all or the given names) of a minute folder, None if there are no up-to-date columns
+def load_partition_columns(folder_path, names=None):
+    columns_path = os.path.join(folder_path, COLUMNS_FOLDER)
+    meta_path = os.path.join(columns_path, 'meta.json')
+
+    try:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+
+        # records appended to datasets.json after the columns were written
+        if os.path.getsize(os.path.join(folder_path, 'datasets.json')) != meta["source_size"]:
+            return None
+
+        # columns written by a run that was aborted before the dictionary with their ids was saved
+        dictionary = load_dictionary_tables(get_root_folder_path(folder_path))
+        if dictionary is None or meta["dictionary_version"] > dictionary["version"]:
+            return None
+
+        columns = {name: load_column(columns_path, name, meta["rows"]) for name in (names or COLUMN_TYPES)}
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+    # the other keys are only needed to rebuild the records
+    if names is None:
+        try:
+            with open(os.path.join(columns_path, EXTRAS_FILE), 'r') as f:
+                columns["extras"] = {row: keys for row, keys in json.load(f)}
+        except FileNotFoundError:
+            columns["extras"] = {}
+
+    columns["rows"] = meta["rows"]
+    columns["dictionary"] = dictionary
+    return columns
+
+# Function to rebuild the records of the rows start to end (exclusive) in the JSON format of datasets.json
+def read_column_rows(columns, start, end):
+    end = min(end, columns["rows"])
+    if start >= end:
+        return []
+
+    values = {name: columns[name][start:end].tolist() for name in COLUMN_TYPES}
+    dictionary = columns["dictionary"]
+
+    rows = []
+    for i in range(end - start):
+        row = {
+            "prefix": int_to_address(values["family"][i], values["prefix_hi"][i], values["prefix_lo"][i]),
+            "length": values["length"][i],
+            "aspath": get_aspath(dictionary, values["aspath"][i]),
+            "roa1": values["roa1"][i],
+            "aspa1": values["aspa1"][i],
+            "roa2": values["roa2"][i],
+            "aspa2": values["aspa2"][i],
+            "roa3": values["roa3"][i],
+            "aspa3": values["aspa3"][i],
+            "sourceip": get_string_value(dictionary, "sourceip", values["sourceip"][i]),
+            "sourceasn": str(dictionary["sourceasn_values"][values["sourceasn"][i]]),
+            "numberpeers": values["numberpeers"][i],
+            "nexthopip": get_string_value(dictionary, "nexthopip", values["nexthopip"][i]),
+            "timestamp": values["timestamp"][i]
+        }
+
+        for name in OPTIONAL_STATE_KEYS:
+            if row[name] == UINT8_MAX:
+                del row[name]
+        row.update(columns["extras"].get(start + i, {}))
+        rows.append(row)
+
+    return rows
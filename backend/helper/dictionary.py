@@ -0,0 +1,214 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides the dictionary of a data source. Every distinct AS path, source IP, next hop IP and source ASN
+of the data source is stored once in the sub folder 'dictionary' of the root folder, the binary columns of the minute
+folders (see columnar.py) only contain the integer ids of these values. datasets.json is still written in full, because
+the Spark filters and the readers without NumPy read it, so the ids make the binary columns smaller, not the data source.
+It includes the following key functionalities:
+
+1. load_dictionary, add_dictionary_values and save_dictionary Functions:
+   - Used by sort_raw_exabgp_data.py to assign ids to new values. Ids are never changed, new values are appended,
+     so the columns of unchanged minute folders stay valid when records are added to a data source.
+   - Each save increments the dictionary version. Columns written for a newer version than the saved dictionary
+     (e.g. after an aborted run) are not used.
+
+2. load_dictionary_tables Function:
+   - Loads the memory-mapped dictionary of a data source for the backend, cached until the dictionary is saved again.
+
+3. get_aspath, get_string_value and find_aspath_ids Functions:
+   - Expand ids back to their values and find the ids of all AS paths that contain a set of AS numbers by a lookup
+     in the dictionary instead of a scan of every record.
+'''
+
+import os
+import json
+import shutil
+import threading
+import numpy as np
+
+DICTIONARY_FOLDER = 'dictionary'
+
+# Columns of a record that are stored as dictionary ids
+DICTIONARY_COLUMNS = ("aspath", "sourceip", "nexthopip", "sourceasn")
+
+# Loaded dictionaries of the backend (root folder path -> (modification time of meta.json, tables))
+LOADED_DICTIONARY_TABLES = {}
+
+# protects the loaded dictionaries and their lookups, the Flask app and the filter jobs use them in several threads
+LOADED_DICTIONARY_TABLES_LOCK = threading.Lock()
+
+# Function to create an empty dictionary for encoding (values in id order and value -> id for each column)
+def create_dictionary():
+    return {
+        "version": 0,
+        "values": {name: [] for name in DICTIONARY_COLUMNS},
+        "ids": {name: {} for name in DICTIONARY_COLUMNS}
+    }
+
+# Function to load the dictionary of a root folder for encoding, an empty dictionary if there is none
+def load_dictionary(root_folder_path):
+    dictionary = create_dictionary()
+    tables = load_dictionary_tables(root_folder_path)
+
+    if tables is None:
+        return dictionary
+
+    dictionary["version"] = tables["version"]
+    dictionary["values"]["aspath"] = [tuple(tables["aspath_values"][start:end].tolist())
+                                      for start, end in zip(tables["aspath_offsets"][:-1].tolist(), tables["aspath_offsets"][1:].tolist())]
+    dictionary["values"]["sourceip"] = get_string_values(tables, "sourceip")
+    dictionary["values"]["nexthopip"] = get_string_values(tables, "nexthopip")
+    dictionary["values"]["sourceasn"] = tables["sourceasn_values"].tolist()
+
+    for name in DICTIONARY_COLUMNS:
+        dictionary["ids"][name] = {value: value_id for value_id, value in enumerate(dictionary["values"][name])}
+
+    return dictionary
+
+# Function to get the ids of values (AS paths as tuples of integers, IPs as strings, ASNs as integers), new values are added
+def add_dictionary_values(dictionary, name, values):
+    ids = dictionary["ids"][name]
+    dictionary_values = dictionary["values"][name]
+    value_ids = np.empty(len(values), dtype=np.uint32)
+
+    for i, value in enumerate(values):
+        value_id = ids.get(value)
+        if value_id is None:
+            value_id = len(dictionary_values)
+            ids[value] = value_id
+            dictionary_values.append(value)
+        value_ids[i] = value_id
+
+    return value_ids
+
+# Function to store a list of values in the offsets + values layout, value i is values[offsets[i]:offsets[i+1]]
+def build_offsets_and_values(values, dtype):
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(value) for value in values])
+    return offsets, np.array([item for value in values for item in value], dtype=dtype)
+
+# Function to build the arrays of the dictionary tables from the values of each column in id order
+def build_dictionary_arrays(values):
+    arrays = {"sourceasn_values": np.array(values["sourceasn"], dtype=np.uint32)}
+    arrays["aspath_offsets"], arrays["aspath_values"] = build_offsets_and_values(values["aspath"], np.uint32)
+
+    for name in ("sourceip", "nexthopip"):
+        arrays[name + "_offsets"], arrays[name + "_values"] = build_offsets_and_values(
+            [value.encode('utf-8') for value in values[name]], np.uint8)
+
+    return arrays
+
+# Function to create in-memory dictionary tables (same layout as load_dictionary_tables) from the values of each column
+def create_dictionary_tables(values):
+    tables = build_dictionary_arrays(values)
+    tables["version"] = None
+    tables["lookup"] = {}
+    return tables
+
+# Function to write the dictionary into the root folder, the folder is replaced atomically
+def save_dictionary(root_folder_path, dictionary):
+    dictionary_path = os.path.join(root_folder_path, DICTIONARY_FOLDER)
+    temp_path = f'{dictionary_path}.tmp-{os.getpid()}'
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+
+    values = dictionary["values"]
+    arrays = build_dictionary_arrays(values)
+
+    for name, array in arrays.items():
+        np.save(os.path.join(temp_path, name + '.npy'), array)
+
+    with open(os.path.join(temp_path, 'meta.json'), 'w') as f:
+        f.write(json.dumps({"version": dictionary["version"], "sizes": {name: len(values[name]) for name in DICTIONARY_COLUMNS}}))
+
+    old_path = f'{dictionary_path}.old-{os.getpid()}'
+    if os.path.exists(dictionary_path):
+        os.replace(dictionary_path, old_path)
+    os.replace(temp_path, dictionary_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+# Function to load the memory-mapped dictionary of a root folder, None if there is none
+def load_dictionary_tables(root_folder_path):
+    dictionary_path = os.path.join(root_folder_path, DICTIONARY_FOLDER)
+    meta_path = os.path.join(dictionary_path, 'meta.json')
+
+    try:
+        modification_time = os.stat(meta_path).st_mtime_ns
+        with LOADED_DICTIONARY_TABLES_LOCK:
+            loaded = LOADED_DICTIONARY_TABLES.get(root_folder_path)
+        if loaded is not None and loaded[0] == modification_time:
+            return loaded[1]
+
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+
+        tables = {name: np.load(os.path.join(dictionary_path, name + '.npy'), mmap_mode='r')
+                  for name in ("aspath_offsets", "aspath_values", "sourceip_offsets", "sourceip_values",
+                               "nexthopip_offsets", "nexthopip_values", "sourceasn_values")}
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+    tables["version"] = meta["version"]
+    tables["lookup"] = {}
+    with LOADED_DICTIONARY_TABLES_LOCK:
+        LOADED_DICTIONARY_TABLES[root_folder_path] = (modification_time, tables)
+    return tables
+
+# Function to get all values of a string table (source IPs or next hop IPs)
+def get_string_values(tables, name):
+    offsets = tables[name + "_offsets"].tolist()
+    data = tables[name + "_values"].tobytes()
+    return [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])]
+
+# Function to get the AS path with the id path_id as list of strings (format of datasets.json)
+def get_aspath(tables, path_id):
+    offsets = tables["aspath_offsets"]
+    return [str(asn) for asn in tables["aspath_values"][offsets[path_id]:offsets[path_id + 1]].tolist()]
+
+# Function to get the value of an id in a string table (source IPs or next hop IPs)
+def get_string_value(tables, name, value_id):
+    offsets = tables[name + "_offsets"]
+    return tables[name + "_values"][offsets[value_id]:offsets[value_id + 1]].tobytes().decode('utf-8')
+
+# Function to get a lookup of the tables, it is built by build_lookup when it is first used and shared by all threads
+def get_lookup(tables, name, build_lookup):
+    with LOADED_DICTIONARY_TABLES_LOCK:
+        lookup = tables["lookup"].get(name)
+    if lookup is not None:
+        return lookup
+
+    # the lookup is built outside of the lock, if another thread has built it in the meantime its lookup is used
+    lookup = build_lookup()
+    with LOADED_DICTIONARY_TABLES_LOCK:
+        return tables["lookup"].setdefault(name, lookup)
+
+# Function to build the lookup (value -> id) of a column
+def build_value_lookup(tables, name):
+    values = tables["sourceasn_values"].tolist() if name == "sourceasn" else get_string_values(tables, name)
+    return {table_value: value_id for value_id, table_value in enumerate(values)}
+
+# Function to find the id of a value (IP as string, ASN as integer), None if the value isn't in the dictionary
+def find_value_id(tables, name, value):
+    return get_lookup(tables, name, lambda: build_value_lookup(tables, name)).get(value)
+
+# Function to find the sorted ids of all AS paths that contain all of the AS numbers
+def find_aspath_ids(tables, asns):
+    offsets = tables["aspath_offsets"]
+    values = tables["aspath_values"]
+
+    # the AS path id of each value in aspath_values
+    path_ids = get_lookup(tables, "aspath_ids", lambda: np.repeat(np.arange(len(offsets) - 1, dtype=np.uint32), np.diff(offsets)))
+
+    matching_ids = None
+    for asn in asns:
+        ids = np.unique(path_ids[values == asn])
+        matching_ids = ids if matching_ids is None else np.intersect1d(matching_ids, ids, assume_unique=True)
+
+    return matching_ids if matching_ids is not None else np.arange(len(offsets) - 1, dtype=np.uint32)
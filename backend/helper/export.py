@@ -0,0 +1,217 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script reads the records of a data source or of its filtered data sequentially from a position, instead of
+counting the rows of a page from the first record. It includes the following key functionalities:
+
+1. read_cursor_page Function:
+   - Reads a page of records from a cursor and returns the cursor of the next page. The cursor is an opaque string
+     with the minute folder (partition) of the next record, relative to the data source, and its byte offset in
+     datasets.json. For the filtered data of Spark the partition is the file with the filtered data, for a row
+     bitmap (see row_bitmap.py) the offset is the number of the record in its minute folder.
+   - The next page starts at the cursor, so reading all pages reads every record once.
+
+2. stream_export Function:
+   - Returns the records as NDJSON (one JSON record per line) or CSV in chunks of about EXPORT_CHUNK_BYTES bytes
+     (environment variable, default: 65536), so the server only holds one chunk of any export in memory.
+   - The CSV columns are the keys of the records in datasets.json (RECORD_KEYS of hierarchy.py) and the column
+     other_keys with the other keys of a record as JSON object, so the CSV has the same keys as the NDJSON export.
+   - The cache entry of filtered data has to be pinned while it is read (see pin_cached_result of result_cache.py).
+'''
+
+import os
+import io
+import csv
+import json
+import base64
+import bisect
+from helper.hierarchy import RECORD_KEYS
+
+try:
+    from helper import row_bitmap
+except ImportError:
+    # NumPy is not installed, all filtered data is stored in files
+    row_bitmap = None
+
+EXPORT_CHUNK_BYTES = int(os.environ.get('EXPORT_CHUNK_BYTES', 65536))
+
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Columns of the CSV export: the keys of the records in datasets.json and a JSON object with the other keys of a record
+EXPORT_CSV_COLUMNS = RECORD_KEYS + ("other_keys",)
+
+# Number of records of a minute folder that are read at once from a row bitmap by an export
+BITMAP_READ_ROWS = 1000
+
+# Function to encode a cursor: the kind of the records (datasets, file or bitmap), the partition and the offset in it
+def encode_cursor(kind, partition, offset):
+    return base64.urlsafe_b64encode(json.dumps([kind, partition, offset]).encode()).decode().rstrip('=')
+
+# Function to decode a cursor, returns (kind, partition, offset) or None if it isn't a cursor
+def decode_cursor(cursor):
+    try:
+        kind, partition, offset = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (TypeError, ValueError):
+        return None
+
+    if kind not in ("datasets", "file", "bitmap") or not isinstance(partition, str) or type(offset) is not int or offset < 0:
+        return None
+    return kind, partition, offset
+
+# Function to get the minute folders below a folder in time order (paths as lists of folder names), from the folder start_parts on
+def iter_minute_folders(folder_path, start_parts=()):
+    if os.path.isfile(os.path.join(folder_path, 'datasets.json')):
+        yield []
+        return
+
+    for name in sorted(os.listdir(folder_path)):
+        # folders before the start are skipped without listing them
+        if start_parts and name < start_parts[0]:
+            continue
+
+        subfolder_path = os.path.join(folder_path, name)
+        if os.path.isdir(subfolder_path):
+            for parts in iter_minute_folders(subfolder_path, start_parts[1:] if start_parts and name == start_parts[0] else ()):
+                yield [name] + parts
+
+# Function to read the records of a file from a byte offset, returns (offset after the record, record) for each record,
+# with parse False the records are the JSON lines
+def iter_file_lines(file_path, offset, parse):
+    with open(file_path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            offset += len(line)
+            if line.strip():
+                yield offset, json.loads(line) if parse else line.decode().strip()
+
+# Function to read the records of the minute folders of a data source, returns (partition, offset after the record, record) for each record
+def iter_datasets_records(data_source_path, partition, offset, parse):
+    start_parts = partition.split('/') if partition else []
+    for parts in iter_minute_folders(data_source_path, start_parts):
+        folder_partition = '/'.join(parts)
+        datasets_path = os.path.join(data_source_path, folder_partition, 'datasets.json')
+        for next_offset, record in iter_file_lines(datasets_path, offset if parts == start_parts else 0, parse):
+            yield folder_partition, next_offset, record
+
+# Function to read the records of the files with the filtered data of a cache entry
+def iter_filtered_file_records(entry_path, partition, offset, parse):
+    for file_name in sorted(f for f in os.listdir(entry_path) if f.startswith('part-') and f.endswith('.json')):
+        if file_name >= partition:
+            for next_offset, record in iter_file_lines(os.path.join(entry_path, file_name), offset if file_name == partition else 0, parse):
+                yield file_name, next_offset, record
+
+# Function to read the records of the set bits of the row bitmap of a cache entry, the offset is the number of the next record of the minute folder
+def iter_bitmap_records(entry_path, data_source_path, partition, offset, batch_rows):
+    row_space, bitmap, _ = row_bitmap.load_bitmap(entry_path)
+    partitions, offsets = row_space["partitions"], row_space["offsets"]
+
+    # the minute folders are in time order, so the first one of the cursor is found by bisection
+    first_path = os.path.normpath(os.path.join(data_source_path, partition))
+    first_index = bisect.bisect_left(partitions, first_path)
+    prefix_length = len(os.path.normpath(data_source_path)) + 1
+
+    for index in range(first_index, len(partitions)):
+        folder_partition = partitions[index][prefix_length:]
+        first_row = int(offsets[index]) + (offset if partitions[index] == first_path else 0)
+        positions = row_bitmap.get_range_positions(bitmap, first_row, int(offsets[index + 1]))
+
+        # the rows are read in batches, a page only reads the rows it needs
+        for start in range(0, len(positions), batch_rows):
+            batch = positions[start:start + batch_rows]
+            for position, record in zip(batch.tolist(), row_bitmap.read_position_rows(row_space, batch)):
+                yield folder_partition, position + 1 - int(offsets[index]), record
+
+# Function to get the kind of the records of a data source (entry_path None) or a cache entry
+def get_records_kind(entry_path):
+    if entry_path is None:
+        return "datasets"
+    if row_bitmap is not None and os.path.isfile(os.path.join(entry_path, row_bitmap.BITMAP_FILE)):
+        return "bitmap"
+    return "file"
+
+# Function to read the records of a data source or of the filtered data of a cache entry from a partition and offset,
+# with parse False the records read from JSON files are their JSON lines
+def iter_records(data_source_path, entry_path, partition='', offset=0, batch_rows=BITMAP_READ_ROWS, parse=True):
+    kind = get_records_kind(entry_path)
+    if kind == "datasets":
+        records = iter_datasets_records(data_source_path, partition, offset, parse)
+    elif kind == "bitmap":
+        records = iter_bitmap_records(entry_path, data_source_path, partition, offset, batch_rows)
+    else:
+        records = iter_filtered_file_records(entry_path, partition, offset, parse)
+    return records
+
+# Function to read a page of records from a cursor (None for the first page), returns (tableData, cursor of the next page or None)
+# or None if the cursor doesn't belong to the records
+def read_cursor_page(data_source_path, entry_path, cursor, page_size):
+    kind = get_records_kind(entry_path)
+    partition, offset = '', 0
+    if cursor is not None:
+        decoded = decode_cursor(cursor)
+        if decoded is None or decoded[0] != kind:
+            return None
+        _, partition, offset = decoded
+
+    if not os.path.isdir(data_source_path):
+        # time periods without records have no folder
+        return [], None
+
+    # one record more than the page is read to know if there is a next page
+    records = iter_records(data_source_path, entry_path, partition, offset, min(page_size + 1, BITMAP_READ_ROWS))
+    table_data, next_cursor = [], None
+    next_partition, next_page_offset = partition, offset
+    for record_partition, next_offset, record in records:
+        if len(table_data) == page_size:
+            # there is another record, so the page has a next page
+            next_cursor = encode_cursor(kind, next_partition, next_page_offset)
+            break
+        table_data.append(record)
+        next_partition, next_page_offset = record_partition, next_offset
+
+    records.close()
+    return table_data, next_cursor
+
+# Function to convert a record into a row of the CSV export, AS paths are written as AS numbers separated by spaces,
+# missing keys (e.g. the optional validation states) as empty values and the other keys as JSON object
+def get_csv_row(record):
+    row = []
+    for column in RECORD_KEYS:
+        value = record.get(column)
+        if isinstance(value, list):
+            value = ' '.join(str(item) for item in value)
+        row.append('' if value is None else value)
+
+    other_keys = {key: value for key, value in record.items() if key not in RECORD_KEYS}
+    row.append(json.dumps(other_keys) if other_keys else '')
+    return row
+
+# Function to stream the records of a data source or of the filtered data of a cache entry as NDJSON or CSV in chunks
+def stream_export(data_source_path, entry_path, export_format):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if export_format == "csv":
+        writer.writerow(EXPORT_CSV_COLUMNS)
+
+    if os.path.isdir(data_source_path):
+        # NDJSON is written from the JSON lines of the files without parsing them
+        records = iter_records(data_source_path, entry_path, parse=export_format == "csv")
+        for _, _, record in records:
+            if export_format == "csv":
+                writer.writerow(get_csv_row(record))
+            else:
+                buffer.write(record if isinstance(record, str) else json.dumps(record))
+                buffer.write('\n')
+
+            if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+
+    if buffer.tell() > 0:
+        yield buffer.getvalue()
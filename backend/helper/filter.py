@@ -5,115 +5,292 @@ This work is licensed under the terms of the MIT license.
 For a copy, see LICENSE.txt in the project root.
 
 @author: Michael Küchenmeister - Technische Hochschule Ingolstadt (mik6331@thi.de)
-@version: 0.3
-@date: 15.01.2024
+@version: 0.4
+@date: 17.10.2026
 
-This script defines functions to filter datasets using PySpark. It leverages the PySpark SQL module to 
-perform data filtering based on specified criteria. The script includes the following key functionalities:
+This script defines the filter functions used by app.py. Each filter request is handled by one of two backends:
+    - spark_filter.py: filters the datasets with PySpark and writes the filtered data.
+    - local_filter.py: filters the datasets with NumPy inside the app (requires NumPy), the filtered data is a row
+      bitmap over the records of the data source (see row_bitmap.py).
 
-1. recursiveTableDataFilter Function:
-   - Performs recursive or "normal" filtering on JSON files in a specified root folder.
-   - Handles different filter keys, including 'aspath' where array_contains is used.
-   - Writes the filtered data to the './database/filtered_data/' directory using the provided session_id.
-   - Returns the number of rows after filtering.
+The script includes the following key functionalities:
+
+1. filter_table_data Function:
+   - Returns the filtered data of a data source from the cache shared by all sessions (see result_cache.py).
+     Filters that aren't cached are evaluated once and added to the cache.
+   - The local backend is used if the "datasetSum" in the response-data.json of the data source is at most
+     LOCAL_FILTER_MAX_ROWS (environment variable, default: 5000000). The backend can be fixed with the environment
+     variable FILTER_BACKEND (auto, local or spark). Without PySpark all filters run on the local backend.
+   - The local backend caches the bitmap of each filter term, the bitmap of the filters is the AND of the bitmaps
+     of their terms. Adding a filter only evaluates the new term, removing a filter evaluates no term at all.
+   - The Spark backend filters the data of the previous filters of the session again if the new filters only
+     add filters to them, otherwise it filters the data source.
+   - filter_pinned_table_data also pins the cache entry, so it isn't evicted while it is read in several steps.
+
+2. read_filtered_data_lines Function:
+   - Reads a page of filtered data, from the positions of the set bits of a bitmap or from the filtered data file.
+   - Returns None if the cache entry has been removed in the meantime, the filters then have to be evaluated again.
+
+3. read_filtered_chart_data Function:
+   - Returns the graphData and pieData of the filtered data (see chart_data.py). The Spark backend counts them
+     while filtering, the local backend groups the rows of a bitmap once and keeps them in its cache entry.
+
+4. get_filter_error Function:
+   - Checks the operators of the filters: 'prefix' filters can have the operators covered_by, covers or lpm
+     (see prefix_trie.py) with a prefix or an address, the numeric keys the operators gt, ge, lt, le or between
+     (see range_filter.py) with a number or a list [low, high].
+
+5. read_sorted_data_lines Function:
+   - Reads a page of filtered data sorted by prefix or a numeric key (see sort_permutation.py, requires NumPy).
+     The table data of a data source without filters is sorted as the cache entry of all its records
+     (get_data_source_result), so the sort permutations are cached per data source and per filtered data.
+
+The Spark backend is used if the local backend can't evaluate a filter or read a record. Both backends report
+their progress to the job of a filter started by filter_jobs.py.
 '''
 
-import json
-from pyspark.sql import SparkSession
-from pyspark.sql.functions import col, expr
-from functools import reduce
-from operator import and_
+import os
 import shutil
+from helper.spark_engine import is_spark_available
+from helper.pagination import read_data_lines
+from helper.hierarchy import load_response_data_file
+from helper.prefix_trie import PREFIX_OPERATORS, parse_network
+from helper.range_filter import RANGE_OPERATORS, RANGE_KEYS, get_range_bounds
+from helper.job_progress import start_progress
+from helper.chart_data import get_bucket_scope, create_chart_data, write_chart_data, read_chart_data
+from helper.result_cache import (find_cached_result, store_cached_result, get_temp_entry_path, get_data_source_version,
+                                 get_canonical_filters, get_filtered_data_file, get_session_result, set_session_result,
+                                 pin_cached_result)
 
-# Function to filter data recursively based on specified criteria
-def recursive_table_data_filter(root_folder_path, filter_values, session_id):
-    # Create a Spark session
-    spark = SparkSession.builder.appName("DatasetFilter").getOrCreate()
+try:
+    from helper import local_filter, row_bitmap, sort_permutation
+except ImportError:
+    # NumPy is not installed, all filters are evaluated by Spark and the table data can't be sorted
+    local_filter = None
+    row_bitmap = None
+    sort_permutation = None
 
-    # Read JSON files recursively from the specified root folder
-    df = spark.read.option("recursiveFileLookup", "true").json(root_folder_path)
+FILTER_BACKEND = os.environ.get('FILTER_BACKEND', 'auto')
+LOCAL_FILTER_MAX_ROWS = int(os.environ.get('LOCAL_FILTER_MAX_ROWS', 5000000))
 
-    # Initialize an empty list to store filtering conditions
-    filters = []
-    
-    # Iterate over filter values to build filtering conditions
+# Keys the table data can be sorted by: prefixes by address and length, the numeric keys by their value
+SORT_KEYS = ("prefix",) + RANGE_KEYS
+SORT_ORDERS = ("asc", "desc")
+
+# Function to get the number of records below a folder from its response-data.json
+def get_dataset_sum(folder_path):
+    data = load_response_data_file(os.path.join(folder_path, 'response-data.json'))
+    return data.get("datasetSum", 0) if data is not None else 0
+
+# Function to check if the local backend may be used for the filters on a data source
+def is_local_filter_enabled(data_source_path, filter_values):
+    if local_filter is None or not local_filter.is_supported_filter(filter_values):
+        return False
+    # without PySpark every filter the local backend supports is evaluated by it
+    if not is_spark_available():
+        return True
+    if FILTER_BACKEND == 'spark':
+        return False
+    return FILTER_BACKEND == 'local' or get_dataset_sum(data_source_path) <= LOCAL_FILTER_MAX_ROWS
+
+# Function to get the error message for filters with an unsupported operator, None if all operators are supported
+def get_filter_error(filter_values):
     for filter_item in filter_values:
-        if filter_item['key'] == 'aspath':
-            # Handle 'aspath' filter differently by checking for array_contains
-            aspath_values = list(map(str, filter_item['value'].split()))
-            condition = ' AND '.join([f"array_contains(aspath, '{value}')" for value in aspath_values])
-            filters.append(expr(condition))
+        operator = filter_item.get('operator')
+        if operator is None:
+            continue
+
+        if filter_item.get('key') == 'prefix' and operator in PREFIX_OPERATORS:
+            if parse_network(filter_item.get('value')) is None:
+                return f"'{filter_item.get('value')}' is not a valid prefix or address."
+        elif filter_item.get('key') in RANGE_KEYS and operator in RANGE_OPERATORS:
+            if get_range_bounds(operator, filter_item.get('value')) is None:
+                expected = "a list [low, high] of numbers" if operator == "between" else "a number"
+                return f"'{filter_item.get('value')}' is not a valid value for '{operator}', expected {expected}."
         else:
-            # For other keys, create equality filter conditions
-            filters.append(col(filter_item['key']) == filter_item['value'])
+            return f"Operator '{operator}' is not supported for '{filter_item.get('key')}' (supported: prefix with {', '.join(PREFIX_OPERATORS)}; " \
+                   f"{', '.join(RANGE_KEYS)} with {', '.join(RANGE_OPERATORS)})."
 
-    # Combine individual filters using AND operator
-    combined_filter = reduce(and_, filters)
+    return None
 
-    # Apply the combined filter to the DataFrame
-    filtered_df = df.filter(combined_filter)
+# Function to get the error message for an unsupported sort key or order, None if the table data can be sorted by them
+def get_sort_error(sort_by, sort_order):
+    if sort_by is None:
+        return None
+    if sort_by not in SORT_KEYS:
+        return f"Sorting by '{sort_by}' is not supported (supported: {', '.join(SORT_KEYS)})."
+    if sort_order not in SORT_ORDERS:
+        return f"Sort order '{sort_order}' is not supported (supported: {', '.join(SORT_ORDERS)})."
+    if sort_permutation is None:
+        return "Sorting requires NumPy, which is not installed."
+    return None
 
-    # Write the filtered DataFrame to a temporary location
-    filtered_df.coalesce(1).write.mode("overwrite").json("./database/filtered_data/" + session_id)
+# Function to get the term of a filter whose bitmap is cached, the lpm filter selects the longest of the covering prefixes
+def get_bitmap_term(filter_item):
+    if filter_item.get('operator') == 'lpm':
+        return dict(filter_item, operator='covers')
+    return filter_item
 
-    # Count the number of rows after filtering
-    num_filtered_rows = filtered_df.count()
+# Function to filter a data source with the local backend, returns (cache entry, number of filtered rows) or None if it isn't supported
+def filter_table_data_locally(data_source, data_source_path, filter_values, version, progress=None):
+    filters = get_canonical_filters(filter_values)
+    terms = get_canonical_filters([get_bitmap_term(filter_item) for filter_item in filters])
+    term_results = [find_cached_result(data_source, data_source_path, [term]) for term in terms]
+    loaded_bitmaps = [row_bitmap.load_bitmap(result[0]) if result is not None else None for result in term_results]
 
-    # Stop the Spark session
-    spark.stop()
+    # the bitmaps of the terms that aren't cached are created in one pass over the records
+    missing_terms = [i for i, loaded_bitmap in enumerate(loaded_bitmaps) if loaded_bitmap is None]
+    start_progress(progress, "local")
+    if missing_terms:
+        # the job of the filter gets the rows matching all filters while scanning if no term is cached (and lpm
+        # isn't used, its longest prefix is only known after all records are scanned)
+        if progress is not None:
+            start_progress(progress, "local", len(local_filter.get_partition_folders(data_source_path)),
+                           rows_counted=len(missing_terms) == len(terms) and terms == filters)
 
-    # Return the number of filtered rows
-    return num_filtered_rows
+        term_selections = local_filter.select_term_rows(data_source_path, [terms[i] for i in missing_terms], progress)
+        if term_selections is None:
+            return None
 
-# Function to filter data normally (without recursion) based on specified criteria
-def normal_table_data_filter(file_path, filter_values, session_id):
-    # Create a Spark session
-    spark = SparkSession.builder.appName("DatasetFilter").getOrCreate()
+        row_space = row_bitmap.get_row_space(data_source_path)
+        temp_paths = [f'{get_temp_entry_path()}-{i}' for i in missing_terms]
+        num_rows = row_bitmap.write_term_bitmaps(row_space, term_selections, temp_paths)
 
-    # Read JSON file from the specified path
-    df = spark.read.json(file_path)
+        for i, temp_path, term_rows in zip(missing_terms, temp_paths, num_rows):
+            term_results[i] = store_cached_result(data_source, data_source_path, [terms[i]], version, temp_path, term_rows), term_rows
+            loaded_bitmaps[i] = row_bitmap.load_bitmap(term_results[i][0])
 
-    # Initialize an empty list to store filtering conditions
-    filters = []
+    # a term cached as filtered data of the Spark backend has no bitmap
+    if None in loaded_bitmaps:
+        return None
+    if terms == filters and len(terms) == 1:
+        return term_results[0]
 
-    # Iterate over filter values to build filtering conditions
-    for filter_item in filter_values:
-        if filter_item['key'] == 'aspath':
-            # Handle 'aspath' filter differently by checking for array_contains
-            aspath_values = list(map(str, filter_item['value'].split()))
-            condition = ' AND '.join([f"array_contains(aspath, '{value}')" for value in aspath_values])
-            filters.append(expr(condition))
-        else:
-            # For other keys, create equality filter conditions
-            filters.append(col(filter_item['key']) == filter_item['value'])
+    combined = row_bitmap.combine_bitmaps(loaded_bitmaps)
+    if combined is None:
+        return None
+    row_space, bitmap = combined
+
+    if terms != filters:
+        selections = local_filter.select_longest_prefixes(row_bitmap.get_bitmap_selections(row_space, bitmap), filters)
+        if selections is None:
+            return None
+        bitmap = row_bitmap.create_bitmap(row_space, selections)
+
+    temp_path = get_temp_entry_path()
+    row_bitmap.write_bitmap(temp_path, row_space, bitmap)
+    num_filtered_rows = row_bitmap.count_bitmap_rows(bitmap)
+    return store_cached_result(data_source, data_source_path, filters, version, temp_path, num_filtered_rows), num_filtered_rows
+
+# Function to check if the filtered data of a cache entry can be filtered again by Spark to get the data of the filters
+def can_refine_result(entry_path, meta, data_source, version, filter_values):
+    filters = get_canonical_filters(filter_values)
+
+    # the longest prefix match depends on all records of the data source
+    if any(filter_item.get('operator') == 'lpm' for filter_item in filters) or get_filtered_data_file(entry_path) is None:
+        return False
+    return meta["data_source"] == data_source and meta["version"] == version and all(filter_item in filters for filter_item in meta["filters"])
+
+# Function to get the filtered data of a data source for a session, returns (cache entry, number of filtered rows)
+def filter_table_data(data_source, filter_values, session_id, progress=None):
+    data_source_path = './database/' + data_source
+    cached = find_cached_result(data_source, data_source_path, filter_values)
+
+    if cached is not None:
+        # cached filters don't scan any partition
+        start_progress(progress, "cache")
+    else:
+        # the version is read before filtering, so records added in the meantime give a new cache entry
+        version = get_data_source_version(data_source_path)
+        if is_local_filter_enabled(data_source_path, filter_values):
+            cached = filter_table_data_locally(data_source, data_source_path, filter_values, version, progress)
+
+    # The Spark backend is used if the local backend can't evaluate a filter or read a record
+    if cached is None:
+        if not is_spark_available():
+            raise RuntimeError("The filter needs the Spark backend, but PySpark is not installed.")
+
+        # spark_filter imports PySpark, so it is only imported when a filter runs on Spark
+        from helper import spark_filter
+        temp_path = get_temp_entry_path()
+        path_parts = get_bucket_scope(data_source)
+        previous = get_session_result(session_id)
+
+        try:
+            if previous is not None and can_refine_result(previous[0], previous[1], data_source, version, filter_values):
+                num_filtered_rows = spark_filter.normal_table_data_filter(get_filtered_data_file(previous[0]), filter_values, temp_path, path_parts, progress)
+            else:
+                num_filtered_rows = spark_filter.recursive_table_data_filter(data_source_path, filter_values, temp_path, path_parts, progress)
+        except BaseException:
+            # the filtered data of a failed or cancelled filter is not added to the cache
+            shutil.rmtree(temp_path, ignore_errors=True)
+            raise
+
+        cached = store_cached_result(data_source, data_source_path, filter_values, version, temp_path, num_filtered_rows), num_filtered_rows
+
+    set_session_result(session_id, cached[0])
+    return cached
 
-    # Combine individual filters using AND operator
-    combined_filter = reduce(and_, filters)
+# Function to get the filtered data like filter_table_data with the cache entry pinned, it has to be unpinned after reading
+def filter_pinned_table_data(data_source, filter_values, session_id):
+    entry_path, num_filtered_rows = filter_table_data(data_source, filter_values, session_id)
+    while not pin_cached_result(entry_path):
+        # the entry has been removed from the cache since it was found, so the filters are evaluated again
+        entry_path, num_filtered_rows = filter_table_data(data_source, filter_values, session_id)
+    return entry_path, num_filtered_rows
 
-    # Apply the combined filter to the DataFrame
-    filtered_df = df.filter(combined_filter)
+# Function to read a page of the filtered data of a cache entry, None if the entry has been removed from the cache
+# (by its TTL or the size limit of the cache) since it was found
+def read_filtered_data_lines(entry_path, page_number, page_size):
+    if row_bitmap is not None and os.path.isfile(os.path.join(entry_path, row_bitmap.BITMAP_FILE)):
+        return row_bitmap.read_bitmap_rows(entry_path, page_number, page_size)
 
-    # Define temporary and target paths for storing filtered data
-    temp_path = "./database/temp_filtered_data"
-    target_path = f"./database/filtered_data/{session_id}"
+    filtered_data_file = get_filtered_data_file(entry_path)
+    if filtered_data_file is None:
+        return None
+    try:
+        return read_data_lines(filtered_data_file, page_number, page_size)
+    except FileNotFoundError:
+        return None
 
-    # Write the filtered DataFrame to a temporary location
-    filtered_df.coalesce(1).write.mode("overwrite").json(temp_path)
+# Function to get the cache entry with all records of a data source (a bitmap without filters), returns (cache entry, number of rows)
+def get_data_source_result(data_source):
+    data_source_path = './database/' + data_source
+    cached = find_cached_result(data_source, data_source_path, [])
 
-    # Read the filtered DataFrame from the temporary location
-    filtered_df = spark.read.json(temp_path)
+    if cached is None:
+        version = get_data_source_version(data_source_path)
+        row_space = row_bitmap.get_row_space(data_source_path)
+        temp_path = get_temp_entry_path()
+        row_bitmap.write_bitmap(temp_path, row_space, row_bitmap.create_full_bitmap(row_space))
+        num_rows = int(row_space["offsets"][-1])
+        cached = store_cached_result(data_source, data_source_path, [], version, temp_path, num_rows), num_rows
 
-    # Write the final filtered DataFrame to the target location
-    filtered_df.coalesce(1).write.mode("overwrite").json(target_path)
+    return cached
 
-    # Count the number of rows after filtering
-    num_filtered_rows = filtered_df.count()
+# Function to read a page of the filtered data of a cache entry sorted by a key (see sort_permutation.py)
+def read_sorted_data_lines(entry_path, page_number, page_size, sort_by, sort_order):
+    return sort_permutation.read_sorted_rows(entry_path, page_number, page_size, sort_by, sort_order)
 
-    # Remove the temporary folder
-    shutil.rmtree(temp_path)
+# Function to get the graphData and pieData of the filtered data of a cache entry
+def read_filtered_chart_data(entry_path, data_source):
+    chart_data = read_chart_data(entry_path)
+    if chart_data is not None or row_bitmap is None:
+        return chart_data
 
-    # Stop the Spark session
-    spark.stop()
+    # the chart data of a bitmap is created when it is first shown, so the bitmaps of single terms
+    # that are only combined with other terms don't need it
+    loaded_bitmap = row_bitmap.load_bitmap(entry_path)
+    if loaded_bitmap is not None:
+        row_space, bitmap, _ = loaded_bitmap
+        path_parts = get_bucket_scope(data_source)
+        groups = local_filter.count_chart_groups(row_space, row_bitmap.get_set_positions(row_space, bitmap), path_parts)
+        if groups is not None:
+            chart_data = create_chart_data(path_parts, groups)
+            try:
+                write_chart_data(entry_path, chart_data)
+            except FileNotFoundError:
+                # the entry has been evicted in the meantime
+                pass
 
-    # Return the number of filtered rows
-    return num_filtered_rows
+    return chart_data
@@ -0,0 +1,215 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script runs filters as asynchronous jobs, so a filter request doesn't block a thread of the Flask app until
+the filtered data is ready. It includes the following key functionalities:
+
+1. submit_filter_job Function:
+   - Adds a filter job to the queue of its session and returns its id immediately.
+   - The jobs run on a pool of FILTER_JOB_WORKERS threads (environment variable, default: 2). Each session runs
+     at most one job at a time and the sessions take turns, so the jobs of one session can't block the others.
+
+2. get_filter_job Function:
+   - Returns the state (queued, running, done, failed or cancelled) and the progress of a job: the scanned
+     partitions (minute folders, or tasks of the Spark jobs), the rows matched so far and, when done, the
+     number of filtered rows.
+
+3. read_filter_job_page Function:
+   - Returns a page of the filtered data of a job. While the job is running, the first pages are taken from the
+     first matching rows reported by the filter backends (see job_progress.py). The pages of a finished job can
+     be sorted like the filtered data of '/api/data', partial pages are in the order the rows were found.
+
+4. cancel_filter_job Function:
+   - Cancels a queued or running job, running Spark jobs are cancelled by their job group (see spark_engine.py).
+
+Finished jobs are removed FILTER_JOB_TTL seconds (environment variable, default: 3600) after they have finished.
+'''
+
+import os
+import time
+import uuid
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from helper.filter import filter_table_data, read_filtered_data_lines, read_sorted_data_lines, read_filtered_chart_data
+from helper.job_progress import FilterJobCancelled, create_progress
+from helper.spark_engine import get_job_group_progress, cancel_job_group
+
+FILTER_JOB_WORKERS = int(os.environ.get('FILTER_JOB_WORKERS', 2))
+FILTER_JOB_TTL = int(os.environ.get('FILTER_JOB_TTL', 3600))
+
+# Jobs by their id
+FILTER_JOBS = {}
+
+# Queued jobs of each session
+SESSION_QUEUES = {}
+
+# Number of the last job started for each session, the session whose last job started first has the next turn
+SESSION_TURNS = {}
+STARTED_JOBS = 0
+
+# Sessions with a running job
+RUNNING_SESSIONS = set()
+
+JOB_EXECUTOR = ThreadPoolExecutor(max_workers=FILTER_JOB_WORKERS, thread_name_prefix='filter-job')
+
+# protects the jobs and the queues, the Flask app handles requests in several threads
+JOB_LOCK = threading.Lock()
+
+# Function to remove the jobs that have finished more than FILTER_JOB_TTL seconds ago
+def remove_finished_jobs():
+    now = time.time()
+    for job_id in [job_id for job_id, job in FILTER_JOBS.items() if job["finished"] is not None and now - job["finished"] > FILTER_JOB_TTL]:
+        del FILTER_JOBS[job_id]
+
+    sessions = {job["session"] for job in FILTER_JOBS.values()}
+    for session_id in [session_id for session_id in SESSION_TURNS if session_id not in sessions]:
+        del SESSION_TURNS[session_id]
+
+# Function to start the queued jobs of the sessions in turn while a worker of the pool is free
+def dispatch_filter_jobs():
+    global STARTED_JOBS
+
+    with JOB_LOCK:
+        while len(RUNNING_SESSIONS) < FILTER_JOB_WORKERS:
+            # sessions without a running job, sessions that haven't started a job yet come first
+            waiting_sessions = [session_id for session_id in SESSION_QUEUES if session_id not in RUNNING_SESSIONS]
+            if not waiting_sessions:
+                return
+            session_id = min(waiting_sessions, key=lambda session_id: SESSION_TURNS.get(session_id, 0))
+
+            job = FILTER_JOBS[SESSION_QUEUES[session_id].popleft()]
+            if not SESSION_QUEUES[session_id]:
+                del SESSION_QUEUES[session_id]
+
+            STARTED_JOBS += 1
+            SESSION_TURNS[session_id] = STARTED_JOBS
+            job["state"] = "running"
+            job["started"] = time.time()
+            RUNNING_SESSIONS.add(session_id)
+            JOB_EXECUTOR.submit(run_filter_job, job)
+
+# Function to run a job in a worker of the pool
+def run_filter_job(job):
+    result = {"state": "failed"}
+    try:
+        entry_path, num_filtered_rows = filter_table_data(job["data_source"], job["filters"], job["session"], job["progress"])
+        result = {"state": "done", "entry_path": entry_path, "rows": num_filtered_rows}
+    except FilterJobCancelled:
+        result = {"state": "cancelled"}
+    except Exception as error:
+        result = {"state": "failed", "error": str(error)}
+    finally:
+        with JOB_LOCK:
+            # a job cancelled while it was running stays cancelled, also if it finished before the cancellation
+            # was noticed or failed because of it (cancelled Spark jobs fail with an error of Spark)
+            if job["progress"]["cancel_event"].is_set():
+                result = {"state": "cancelled"}
+            job.update(result, finished=time.time())
+            RUNNING_SESSIONS.discard(job["session"])
+        dispatch_filter_jobs()
+
+# Function to add a filter job to the queue of its session, returns the job
+def submit_filter_job(data_source, filter_values, session_id):
+    job_id = uuid.uuid4().hex
+    job = {
+        "id": job_id,
+        "session": session_id,
+        "data_source": data_source,
+        "filters": filter_values,
+        "state": "queued",
+        "submitted": time.time(),
+        "started": None,
+        "finished": None,
+        "entry_path": None,
+        "rows": None,
+        "error": None,
+        "progress": create_progress(job_id)
+    }
+
+    with JOB_LOCK:
+        remove_finished_jobs()
+        FILTER_JOBS[job_id] = job
+        SESSION_QUEUES.setdefault(session_id, deque()).append(job_id)
+
+    dispatch_filter_jobs()
+    return get_filter_job(job_id)
+
+# Function to get the state and progress of a job, None if there is no job with the id
+def get_filter_job(job_id):
+    job = FILTER_JOBS.get(job_id)
+    if job is None:
+        return None
+
+    progress = job["progress"]
+    if job["state"] == "running" and progress["backend"] == "spark":
+        progress["scanned"], progress["partitions"] = get_job_group_progress(job_id)
+
+    return {
+        "job": job_id,
+        "state": job["state"],
+        "data_source": job["data_source"],
+        "table_filter": job["filters"],
+        "backend": progress["backend"],
+        "partitions": progress["partitions"],
+        "scanned": progress["scanned"],
+        "rows": job["rows"] if job["state"] == "done" else progress["rows"],
+        "partialRows": len(progress["partial_rows"]),
+        "error": job["error"],
+        "submitted": job["submitted"],
+        "started": job["started"],
+        "finished": job["finished"]
+    }
+
+# Function to read a page of the filtered data of a finished job, None if its cache entry has been removed
+def read_job_entry_page(job, page_number, page_size, sort_by, sort_order):
+    if sort_by is not None:
+        return read_sorted_data_lines(job["entry_path"], page_number, page_size, sort_by, sort_order)
+    return read_filtered_data_lines(job["entry_path"], page_number, page_size)
+
+# Function to get a page of the filtered data of a job, returns (datasetSum, tableData, chart data or None, partial) or None
+def read_filter_job_page(job_id, page_number, page_size, sort_by=None, sort_order="asc"):
+    job = FILTER_JOBS.get(job_id)
+    if job is None:
+        return None
+
+    if job["state"] == "done":
+        table_data = read_job_entry_page(job, page_number, page_size, sort_by, sort_order)
+        if table_data is None:
+            # the filtered data has been removed from the cache since the job has finished, so it is filtered again
+            job["entry_path"], job["rows"] = filter_table_data(job["data_source"], job["filters"], job["session"])
+            table_data = read_job_entry_page(job, page_number, page_size, sort_by, sort_order) or []
+        return job["rows"], table_data, read_filtered_chart_data(job["entry_path"], job["data_source"]), False
+
+    # the first pages of the filtered data are the first matching rows found so far
+    progress = job["progress"]
+    start_index = (int(page_number) - 1) * page_size
+    return progress["rows"], progress["partial_rows"][start_index:start_index + page_size], None, True
+
+# Function to cancel a queued or running job, returns the job or None if there is no job with the id
+def cancel_filter_job(job_id):
+    with JOB_LOCK:
+        job = FILTER_JOBS.get(job_id)
+        if job is None:
+            return None
+
+        if job["state"] == "queued":
+            SESSION_QUEUES[job["session"]].remove(job_id)
+            if not SESSION_QUEUES[job["session"]]:
+                del SESSION_QUEUES[job["session"]]
+            job.update(state="cancelled", finished=time.time())
+        elif job["state"] == "running":
+            job["progress"]["cancel_event"].set()
+
+        cancel_spark_jobs = job["state"] == "running" and job["progress"]["backend"] == "spark"
+
+    if cancel_spark_jobs:
+        cancel_job_group(job_id)
+
+    return get_filter_job(job_id)
@@ -0,0 +1,242 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.2
+@date: 17.10.2026
+
+This script describes the folder hierarchy of a data source created by sort_raw_exabgp_data.py:
+root folder -> day (2019-06-06) -> two hours (02:00) -> ten minutes (00:10) -> minute (00:01).
+It is used by the sort script and the backend and includes the following key functionalities:
+
+1. Folder names and graphData labels:
+   - Returns the names of the sub folders of a folder together with the label of their graphData dataset
+     in the response-data.json of the parent folder.
+
+2. create_empty_response_data Function:
+   - Creates the response-data.json dataset of a folder without records. Folders are only created when a record
+     is sorted into them, so the backend uses this function to respond to requests for empty time periods.
+
+3. read_response_data Function:
+   - Reads the response-data.json of a data source folder or returns an empty one for a valid time period
+     without records.
+   - Parsed response-data.json files are kept in memory (RESPONSE_DATA_CACHE_SIZE files, environment variable,
+     default: 256) and parsed again when their modification time or size changes, so page flips don't parse them.
+
+4. RECORD_KEYS:
+   - The keys of the records in the datasets.json files of the minute folders, used by the binary columns
+     (columnar.py) and the CSV export (export.py).
+'''
+
+import os
+import re
+import json
+import copy
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+RESPONSE_DATA_CACHE_SIZE = int(os.environ.get('RESPONSE_DATA_CACHE_SIZE', 256))
+
+# Parsed response-data.json files, ordered from least to most recently used (file path -> (modification time, size, data))
+LOADED_RESPONSE_DATA = OrderedDict()
+
+# protects the parsed files, the Flask app handles requests in several threads
+LOADED_RESPONSE_DATA_LOCK = threading.Lock()
+
+# Keys of a record in datasets.json, in the order they are written by exaBGP (roa2, roa3 and aspa3 are optional)
+RECORD_KEYS = ("prefix", "length", "aspath", "roa1", "aspa1", "roa2", "aspa2", "roa3", "aspa3", "sourceip", "sourceasn",
+               "numberpeers", "nexthopip", "timestamp")
+
+graph_data_dataset_format = {
+    "ASPA_AI": {
+        "invalid": 0,
+        "valid": 0,
+        "unknown": 0
+    },
+    "ASPA_CAIDA": {
+        "invalid": 0,
+        "valid": 0,
+        "unknown": 0
+    },
+    "ROA": {
+        "invalid": 0,
+        "valid": 0,
+        "unknown": 0
+    },
+    "label": ""
+}
+
+response_format = {
+    "datasetSum": 0,
+    "graphData": [],
+    "pieData": {
+        "ASPA_AI": {
+            "invalid": 0,
+            "valid": 0,
+            "unknown": 0
+        },
+        "ASPA_CAIDA": {
+            "invalid": 0,
+            "valid": 0,
+            "unknown": 0
+        },
+        "ROA": {
+            "invalid": 0,
+            "valid": 0,
+            "unknown": 0
+        }
+    },
+    "tableData": []
+}
+
+DATE_FOLDER_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}$')
+
+# Function to get the day folder name and its label, e.g. 2019-06-06 and "06.06.2019 - 2019-06-06"
+def get_date_folder(year, month, day):
+    folder_name = "{:04d}-{:02d}-{:02d}".format(year, month, day)
+    return folder_name, "{:02d}.{:02d}.{:04d} - {}".format(day, month, year, folder_name)
+
+# Function to get the graphData label of a second in the response-data.json of a minute folder, e.g. "06.06.2019 - 00:00:01"
+def get_time_label(time_utc):
+    return "{:02d}.{:02d}.{:04d} - {:02d}:{:02d}:{:02d}".format(time_utc.day, time_utc.month, time_utc.year,
+                                                                time_utc.hour, time_utc.minute, time_utc.second)
+
+# Function to get the two hour folders of a day: 02:00, 04:00, ..., 24:00
+def get_two_hour_folders():
+    return [(f'{i:02d}:00', f'{i-2:02d}:00 Uhr - {i:02d}:00 Uhr') for i in range(2, 25, 2)]
+
+# Function to get the ten minute folders of a two hour folder, e.g. 00:10, ..., 00:60, 01:10, ..., 01:60 in 02:00
+def get_ten_minute_folders(two_hour_folder_name):
+    end_hour = int(two_hour_folder_name[:2])
+    folders = []
+
+    for hours in (end_hour - 2, end_hour - 1):
+        for tens in range(1, 7):
+            folders.append((f'{hours:02d}:{tens}0', f'{hours:02d}:{tens-1}0 Uhr - {hours:02d}:{tens}0 Uhr'))
+
+    return folders
+
+# Function to get the minute folders of a ten minute folder, e.g. 00:01, ..., 00:09, 00:10 in 00:10
+def get_minute_folders(ten_minute_folder_name):
+    hours = int(ten_minute_folder_name[:2])
+    tens = int(ten_minute_folder_name[3])
+    folders = []
+
+    for minute in range(1, 10):
+        folders.append((f'{hours:02d}:{tens-1}{minute}', f'{hours:02d}:{tens-1}{minute-1} Uhr - {hours:02d}:{tens-1}{minute} Uhr'))
+    folders.append((f'{hours:02d}:{tens}0', f'{hours:02d}:{tens-1}9 Uhr - {hours:02d}:{tens}0 Uhr'))
+
+    return folders
+
+# Function to get the sub folder names (two hours, ten minutes, minute) of a record by its UTC hours and minutes
+def get_time_folder_names(hours, minutes):
+    two_hour_folder_name = "{:02d}:00".format(hours - hours % 2 + 2)
+    ten_minute_folder_name = "{:02d}:{}0".format(hours, minutes // 10 + 1)
+    minute_folder_name = "{:02d}:{:02d}".format(hours, minutes + 1)
+    return two_hour_folder_name, ten_minute_folder_name, minute_folder_name
+
+# Function to get the sort key of a graphData dataset, the part of the label after ' - ' is the folder name or time
+def get_graph_data_sort_key(dataset):
+    return dataset["label"].split(' - ')[-1]
+
+# Function to check if the path parts below the root folder describe a valid time period
+def is_valid_time_path(path_parts):
+    if len(path_parts) > 4:
+        return False
+
+    if len(path_parts) >= 1:
+        if not DATE_FOLDER_PATTERN.match(path_parts[0]):
+            return False
+        try:
+            datetime.strptime(path_parts[0], '%Y-%m-%d')
+        except ValueError:
+            return False
+
+    sub_folder_lists = [get_two_hour_folders, get_ten_minute_folders, get_minute_folders]
+    for level in range(1, len(path_parts)):
+        parent_folder_name = path_parts[level - 1]
+        sub_folders = sub_folder_lists[level - 1]() if level == 1 else sub_folder_lists[level - 1](parent_folder_name)
+
+        if path_parts[level] not in [folder_name for folder_name, _ in sub_folders]:
+            return False
+
+    return True
+
+# Function to create the graphData datasets of a folder without records
+def get_empty_graph_data(path_parts):
+    if len(path_parts) == 1:
+        sub_folders = get_two_hour_folders()
+    elif len(path_parts) == 2:
+        sub_folders = get_ten_minute_folders(path_parts[1])
+    elif len(path_parts) == 3:
+        sub_folders = get_minute_folders(path_parts[2])
+    else:
+        # the root folder gets a dataset for each day and the minute folders for each second with records
+        return []
+
+    graph_data = []
+    for _, label in sub_folders:
+        dataset = copy.deepcopy(graph_data_dataset_format)
+        dataset["label"] = label
+        graph_data.append(dataset)
+
+    return graph_data
+
+# Function to create the response-data.json dataset of a folder without records
+def create_empty_response_data(path_parts):
+    response_data = copy.deepcopy(response_format)
+    response_data["graphData"] = get_empty_graph_data(path_parts)
+    return response_data
+
+# Function to get the version of a response-data.json file (modification time, size), None if it doesn't exist
+def get_response_data_version(response_data_path):
+    try:
+        stat = os.stat(response_data_path)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+# Function to load a response-data.json file, None if it doesn't exist. The data is shared by all callers and must not be changed
+def load_response_data_file(response_data_path):
+    version = get_response_data_version(response_data_path)
+    if version is None:
+        return None
+
+    with LOADED_RESPONSE_DATA_LOCK:
+        loaded = LOADED_RESPONSE_DATA.get(response_data_path)
+        if loaded is not None and loaded[:2] == version:
+            LOADED_RESPONSE_DATA.move_to_end(response_data_path)
+            return loaded[2]
+
+    try:
+        with open(response_data_path, 'r') as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+
+    with LOADED_RESPONSE_DATA_LOCK:
+        LOADED_RESPONSE_DATA[response_data_path] = (version[0], version[1], data)
+        while len(LOADED_RESPONSE_DATA) > RESPONSE_DATA_CACHE_SIZE:
+            LOADED_RESPONSE_DATA.popitem(last=False)
+
+    return data
+
+# Function to read the response-data.json of a data source folder, e.g. example/2019-06-06/02:00
+def read_response_data(database_path, data_source):
+    response_data_path = os.path.join(database_path, data_source, 'response-data.json')
+
+    data = load_response_data_file(response_data_path)
+    if data is not None:
+        # the callers replace the keys of their copy, the parsed values are shared
+        return dict(data)
+
+    # folders of time periods without records are not created, respond with an empty dataset
+    data_source_parts = [part for part in data_source.split('/') if part]
+    if data_source_parts and os.path.isdir(os.path.join(database_path, data_source_parts[0])):
+        if is_valid_time_path(data_source_parts[1:]):
+            return create_empty_response_data(data_source_parts[1:])
+
+    return None
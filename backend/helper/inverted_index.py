@@ -0,0 +1,261 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides the inverted indexes of a day folder, written by sort_raw_exabgp_data.py with --columnar into
+the sub folder 'index' of the day folder. The records are identified by row ids: the number of their minute folder
+in the day (in time order) shifted by 32 bits plus their row in the datasets.json file. It includes the following
+key functionalities:
+
+1. build_day_index Function:
+   - Builds from the binary columns of the minute folders (see columnar.py) an index from each AS number of the
+     AS paths to the sorted row ids of the records with this AS number in their AS path, and the same for each
+     source ASN, source IP and next hop IP (by their dictionary id) and each prefix.
+   - Builds the radix trie of the prefixes with their length (see prefix_trie.py).
+   - Builds sorted value indexes of length, numberpeers and timestamp (the distinct values in ascending order
+     and the row ids of each value).
+   - Minute folders without columns (records that can't be stored as columns) are not indexed, they are listed
+     as 'unindexed' in the index and the filters read them.
+
+2. load_day_index Function:
+   - Loads the memory-mapped index of a day folder, or None if there is none or records have been added to the
+     day folder after the index was written.
+
+3. find_index_rows and find_range_rows Functions:
+   - Return the sorted row ids of the records with a key or with a value in a range (a binary search for both
+     bounds and the slice of the row ids between them), so filters are answered by intersecting them instead
+     of reading every record.
+'''
+
+import os
+import json
+import shutil
+import threading
+import numpy as np
+from helper.columnar import load_partition_columns
+from helper.dictionary import load_dictionary_tables
+from helper.prefix_trie import mask_prefix_columns, build_trie_parents
+
+INDEX_FOLDER = 'index'
+
+# Number of bits of the row in a row id, the number of the minute folder is stored in the bits above
+PARTITION_SHIFT = 32
+
+# Indexes of a day folder and the columns of their keys, the aspath index contains the AS numbers of the AS paths
+INDEX_KEY_COLUMNS = {
+    "aspath": ("aspath",),
+    "sourceasn": ("sourceasn",),
+    "sourceip": ("sourceip",),
+    "nexthopip": ("nexthopip",),
+    "prefix": ("family", "prefix_hi", "prefix_lo"),
+    "trie": ("family", "prefix_hi", "prefix_lo", "length"),
+    # sorted value indexes of the numeric keys, answering equality and range filters
+    "length": ("length",),
+    "numberpeers": ("numberpeers",),
+    "timestamp": ("timestamp",)
+}
+
+# Loaded indexes (day folder path -> (modification time of meta.json, index))
+LOADED_DAY_INDEXES = {}
+
+# protects the loaded indexes, the Flask app and the filter jobs use them in several threads
+LOADED_DAY_INDEXES_LOCK = threading.Lock()
+
+# Function to get the row ids of rows in the minute folder with the number partition_number
+def get_row_ids(partition_number, rows):
+    return (np.uint64(partition_number) << np.uint64(PARTITION_SHIFT)) | rows.astype(np.uint64)
+
+# Function to split sorted row ids into (number of the minute folder, rows) pairs
+def split_row_ids(row_ids):
+    partition_numbers = (row_ids >> np.uint64(PARTITION_SHIFT)).astype(np.int64)
+    rows = (row_ids & np.uint64(2**PARTITION_SHIFT - 1)).astype(np.uint32)
+
+    boundaries = np.flatnonzero(np.diff(partition_numbers)) + 1
+    starts = np.concatenate(([0], boundaries)) if len(row_ids) else np.zeros(0, dtype=np.int64)
+    return [(int(partition_numbers[start]), part) for start, part in zip(starts.tolist(), np.split(rows, boundaries))]
+
+# Function to build the sorted keys, offsets and row ids of an index from the key columns and row ids of all records
+def build_postings(keys, row_ids):
+    order = np.lexsort([row_ids] + list(reversed(keys)))
+    keys = [key[order] for key in keys]
+    row_ids = row_ids[order]
+
+    # the same key can occur several times in a record (AS path prepending)
+    new_key = np.zeros(len(row_ids), dtype=bool)
+    new_key[:1] = True
+    for key in keys:
+        new_key[1:] |= key[1:] != key[:-1]
+    keep = new_key.copy()
+    keep[1:] |= row_ids[1:] != row_ids[:-1]
+
+    keys = [key[keep] for key in keys]
+    row_ids = row_ids[keep]
+    new_key = new_key[keep]
+
+    key_starts = np.flatnonzero(new_key)
+    offsets = np.append(key_starts, len(row_ids)).astype(np.int64)
+    return [key[key_starts] for key in keys], offsets, row_ids
+
+# Function to get the AS numbers of the AS paths of all records and the row ids they belong to
+def expand_aspaths(path_ids, row_ids, dictionary):
+    path_offsets = dictionary["aspath_offsets"]
+    starts = path_offsets[:-1][path_ids]
+    lengths = (path_offsets[1:][path_ids] - starts).astype(np.int64)
+
+    # position of each AS number in aspath_values: start of its AS path + position in the AS path
+    first = np.repeat(np.cumsum(lengths) - lengths, lengths)
+    positions = np.repeat(starts, lengths) + (np.arange(lengths.sum()) - first)
+    return dictionary["aspath_values"][positions], np.repeat(row_ids, lengths)
+
+# Function to get the minute folders of a day folder in time order, relative to the day folder
+def get_day_partitions(day_folder_path):
+    partitions = []
+
+    for folder_path, folder_names, file_names in os.walk(day_folder_path):
+        folder_names.sort()
+        if 'datasets.json' in file_names:
+            partitions.append(os.path.relpath(folder_path, day_folder_path))
+
+    return partitions
+
+# Function to get the modification time of the response-data.json of a day folder, it changes when records are added
+def get_response_data_time(day_folder_path):
+    return os.stat(os.path.join(day_folder_path, 'response-data.json')).st_mtime_ns
+
+# Function to write the index of the minute folders with columns of a day folder, returns the number of minute folders
+# without columns or None (and removes the index) if no minute folder has columns
+def build_day_index(day_folder_path):
+    index_path = os.path.join(day_folder_path, INDEX_FOLDER)
+    root_folder_path = os.path.dirname(os.path.normpath(day_folder_path))
+    dictionary = load_dictionary_tables(root_folder_path)
+    partitions = get_day_partitions(day_folder_path)
+
+    names = sorted({name for key_columns in INDEX_KEY_COLUMNS.values() for name in key_columns})
+    key_columns = {name: [] for name in names}
+    row_ids = []
+    rows = []
+    unindexed = []
+
+    for partition_number, partition in enumerate(partitions):
+        columns = load_partition_columns(os.path.join(day_folder_path, partition), names) if dictionary is not None else None
+        if columns is None:
+            unindexed.append(partition)
+            rows.append(None)
+            continue
+
+        for name in names:
+            key_columns[name].append(np.asarray(columns[name]))
+        row_ids.append(get_row_ids(partition_number, np.arange(columns["rows"])))
+        rows.append(columns["rows"])
+
+    if dictionary is None or len(unindexed) == len(partitions):
+        shutil.rmtree(index_path, ignore_errors=True)
+        return None
+
+    key_columns = {name: np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.uint32) for name, arrays in key_columns.items()}
+    row_ids = np.concatenate(row_ids) if row_ids else np.zeros(0, dtype=np.uint64)
+
+    temp_path = f'{index_path}.tmp-{os.getpid()}'
+    shutil.rmtree(temp_path, ignore_errors=True)
+    os.makedirs(temp_path)
+
+    for index_name, columns in INDEX_KEY_COLUMNS.items():
+        if index_name == "aspath":
+            asns, asn_row_ids = expand_aspaths(key_columns["aspath"], row_ids, dictionary)
+            keys, offsets, posting_row_ids = build_postings([asns], asn_row_ids)
+        elif index_name == "trie":
+            # the prefixes sorted by family, address (masked to their length) and length are in preorder of the trie
+            prefix_hi, prefix_lo = mask_prefix_columns(key_columns["family"], key_columns["prefix_hi"], key_columns["prefix_lo"], key_columns["length"])
+            keys, offsets, posting_row_ids = build_postings([key_columns["family"], prefix_hi, prefix_lo, key_columns["length"]], row_ids)
+            np.save(os.path.join(temp_path, 'trie_parent.npy'), build_trie_parents(keys))
+        else:
+            keys, offsets, posting_row_ids = build_postings([key_columns[name] for name in columns], row_ids)
+
+        for i, key in enumerate(keys):
+            np.save(os.path.join(temp_path, f'{index_name}_key{i}.npy'), key)
+        np.save(os.path.join(temp_path, f'{index_name}_offsets.npy'), offsets)
+        np.save(os.path.join(temp_path, f'{index_name}_rows.npy'), posting_row_ids)
+
+    with open(os.path.join(temp_path, 'meta.json'), 'w') as f:
+        f.write(json.dumps({
+            "partitions": partitions,
+            "rows": rows,
+            "unindexed": unindexed,
+            "response_data_time": get_response_data_time(day_folder_path),
+            "dictionary_version": dictionary["version"]
+        }))
+
+    old_path = f'{index_path}.old-{os.getpid()}'
+    if os.path.exists(index_path):
+        os.replace(index_path, old_path)
+    os.replace(temp_path, index_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+
+    return len(unindexed)
+
+# Function to load the index of a day folder, None if there is none or it is outdated
+def load_day_index(day_folder_path):
+    index_path = os.path.join(day_folder_path, INDEX_FOLDER)
+    meta_path = os.path.join(index_path, 'meta.json')
+
+    try:
+        modification_time = os.stat(meta_path).st_mtime_ns
+        with LOADED_DAY_INDEXES_LOCK:
+            loaded = LOADED_DAY_INDEXES.get(day_folder_path)
+
+        if loaded is not None and loaded[0] == modification_time:
+            index = loaded[1]
+        else:
+            with open(meta_path, 'r') as f:
+                index = json.load(f)
+
+            for index_name, columns in INDEX_KEY_COLUMNS.items():
+                index[index_name] = {
+                    "keys": [np.load(os.path.join(index_path, f'{index_name}_key{i}.npy'), mmap_mode='r') for i in range(len(columns))],
+                    "offsets": np.load(os.path.join(index_path, f'{index_name}_offsets.npy'), mmap_mode='r'),
+                    "rows": np.load(os.path.join(index_path, f'{index_name}_rows.npy'), mmap_mode='r')
+                }
+            index["trie"]["parent"] = np.load(os.path.join(index_path, 'trie_parent.npy'), mmap_mode='r')
+            with LOADED_DAY_INDEXES_LOCK:
+                LOADED_DAY_INDEXES[day_folder_path] = (modification_time, index)
+
+        # records added to the day folder after the index was written
+        if get_response_data_time(day_folder_path) != index["response_data_time"]:
+            return None
+
+        # index written by a run that was aborted before the dictionary with its ids was saved
+        dictionary = load_dictionary_tables(os.path.dirname(os.path.normpath(day_folder_path)))
+        if dictionary is None or index["dictionary_version"] > dictionary["version"]:
+            return None
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+    return index
+
+# Function to get the sorted row ids of the records with the key (tuple with a value for each key column) in an index
+def find_index_rows(index, index_name, key):
+    postings = index[index_name]
+    start, end = 0, len(postings["offsets"]) - 1
+
+    # the keys are sorted by their first column, then by their second column, ...
+    for key_column, value in zip(postings["keys"], key):
+        column = key_column[start:end]
+        start, end = start + int(np.searchsorted(column, value, 'left')), start + int(np.searchsorted(column, value, 'right'))
+        if start == end:
+            return np.zeros(0, dtype=np.uint64)
+
+    return np.asarray(postings["rows"][postings["offsets"][start]:postings["offsets"][start + 1]])
+
+# Function to get the sorted row ids of the records with a value from low to high (both included) in a sorted value index
+def find_range_rows(index, index_name, low, high):
+    postings = index[index_name]
+    values = postings["keys"][0]
+    start, end = int(np.searchsorted(values, low, 'left')), int(np.searchsorted(values, high, 'right'))
+
+    # the row ids are sorted for each value, the slice of all values in the range is sorted again
+    return np.sort(postings["rows"][postings["offsets"][start]:postings["offsets"][end]])
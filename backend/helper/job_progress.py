@@ -0,0 +1,88 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides the progress of a filter job (see filter_jobs.py). The filter backends report the minute
+folders they have scanned, the rows matched so far and the first matching rows into the progress of the job and
+stop when the job is cancelled. A filter without job has no progress (None), then all functions do nothing.
+It includes the following key functionalities:
+
+1. create_progress Function:
+   - Creates the progress of a job: number of partitions, scanned partitions, matched rows and the first
+     FILTER_JOB_PARTIAL_ROWS (environment variable, default: 100) matching rows, which are the partial pages of the job.
+
+2. check_cancelled Function:
+   - Raises FilterJobCancelled if the job has been cancelled.
+'''
+
+import os
+import threading
+from helper.pagination import read_data_rows
+
+FILTER_JOB_PARTIAL_ROWS = int(os.environ.get('FILTER_JOB_PARTIAL_ROWS', 100))
+
+# Raised by the filter backends when the job of the filter has been cancelled
+class FilterJobCancelled(Exception):
+    pass
+
+# Function to create the progress of a job
+def create_progress(job_id):
+    return {
+        "id": job_id,
+        "backend": None,
+        "partitions": 0,
+        "scanned": 0,
+        "rows": 0,
+        # the matched rows are only counted if the scanned filters are all filters of the job
+        "rows_counted": False,
+        "partial_rows": [],
+        "cancel_event": threading.Event()
+    }
+
+# Function to raise FilterJobCancelled if the job of a progress has been cancelled
+def check_cancelled(progress):
+    if progress is not None and progress["cancel_event"].is_set():
+        raise FilterJobCancelled()
+
+# Function to set the backend and the number of partitions to scan of a progress
+def start_progress(progress, backend, partitions=0, rows_counted=False):
+    if progress is None:
+        return
+    progress.update(backend=backend, partitions=partitions, scanned=0, rows=0, rows_counted=rows_counted, partial_rows=[])
+
+# Function to add scanned partitions to a progress, the job stops here if it has been cancelled
+def add_scanned_partitions(progress, partitions):
+    if progress is None:
+        return
+    progress["scanned"] += partitions
+    check_cancelled(progress)
+
+# Function to add the first matching rows to a progress
+def add_partial_rows(progress, rows):
+    if progress is None:
+        return
+    progress["partial_rows"].extend(rows[:FILTER_JOB_PARTIAL_ROWS - len(progress["partial_rows"])])
+
+# Function to add matching (minute folder, rows) pairs to a progress, the first rows are read as partial rows
+def add_matched_rows(progress, selections):
+    if progress is None or not progress["rows_counted"]:
+        return
+
+    for folder_path, rows in selections:
+        progress["rows"] += len(rows)
+
+        # consecutive rows of a minute folder are read at once
+        runs = []
+        for row in rows[:max(FILTER_JOB_PARTIAL_ROWS - len(progress["partial_rows"]), 0)].tolist():
+            if runs and runs[-1][1] == row:
+                runs[-1][1] = row + 1
+            else:
+                runs.append([row, row + 1])
+
+        for start, end in runs:
+            add_partial_rows(progress, read_data_rows(os.path.join(folder_path, 'datasets.json'), start, end))
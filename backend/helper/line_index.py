@@ -0,0 +1,141 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides a line index for JSON files with one record per line (datasets.json and the filtered data).
+The index is stored next to the file with the extension .idx (e.g. datasets.idx) and contains the byte offset of
+the start of every line followed by the file size, as unsigned 64 bit integers. It includes the following key functionalities:
+
+1. write_line_index and write_folder_line_indexes Functions:
+   - Write the index of a file (or of all .json files in a folder). If the file only got new lines since the index
+     was written (sort_raw_exabgp_data.py with --append), only the new lines are read and added to the index.
+
+2. read_indexed_lines Function:
+   - Reads a range of lines by seeking directly to the first of them, or returns None if the file has no index
+     or the index is outdated.
+'''
+
+import os
+from array import array
+
+LINE_INDEX_EXTENSION = '.idx'
+
+# Size of an offset in the index file in bytes
+LINE_INDEX_ITEM_SIZE = array('Q').itemsize
+
+# Number of bytes read at once when the lines of a file are searched
+LINE_INDEX_CHUNK_SIZE = 1024 * 1024
+
+# Function to get the path of the index of a file, e.g. datasets.idx for datasets.json
+def get_line_index_path(file_path):
+    return os.path.splitext(file_path)[0] + LINE_INDEX_EXTENSION
+
+# Function to read count offsets from an opened index file, starting with the offset of the line first
+def read_line_offsets(index_file, first, count):
+    offsets = array('Q')
+    index_file.seek(first * LINE_INDEX_ITEM_SIZE)
+    offsets.frombytes(index_file.read(count * LINE_INDEX_ITEM_SIZE))
+    return offsets
+
+# Function to get the number of indexed lines of an opened index file, None if it isn't a valid index
+def get_indexed_line_count(index_file):
+    index_size = os.fstat(index_file.fileno()).st_size
+    if index_size == 0 or index_size % LINE_INDEX_ITEM_SIZE != 0:
+        return None
+    return index_size // LINE_INDEX_ITEM_SIZE - 1
+
+# Function to find the start offsets of the lines between position (start of a line) and size in an opened file
+def find_line_starts(f, position, size):
+    line_starts = array('Q', [position] if position < size else [])
+    f.seek(position)
+
+    while position < size:
+        chunk = f.read(min(LINE_INDEX_CHUNK_SIZE, size - position))
+        if not chunk:
+            break
+
+        newline = chunk.find(b'\n')
+        while newline != -1:
+            if position + newline + 1 < size:
+                line_starts.append(position + newline + 1)
+            newline = chunk.find(b'\n', newline + 1)
+
+        position += len(chunk)
+
+    return line_starts
+
+# Function to write the line index of a file
+def write_line_index(file_path):
+    index_path = get_line_index_path(file_path)
+
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        indexed_size = None
+
+        try:
+            with open(index_path, 'rb') as index_file:
+                line_count = get_indexed_line_count(index_file)
+                if line_count is not None:
+                    indexed_size = read_line_offsets(index_file, line_count, 1)[0]
+        except FileNotFoundError:
+            pass
+
+        if indexed_size == size:
+            return
+
+        # lines have been added to the file since the index was written, the last indexed line must be complete
+        if indexed_size is not None and 0 < indexed_size < size:
+            f.seek(indexed_size - 1)
+            if f.read(1) == b'\n':
+                offsets = find_line_starts(f, indexed_size, size)
+                offsets.append(size)
+
+                # replace the file size at the end of the index by the offsets of the new lines
+                with open(index_path, 'r+b') as index_file:
+                    index_file.seek(-LINE_INDEX_ITEM_SIZE, os.SEEK_END)
+                    offsets.tofile(index_file)
+                return
+
+        offsets = find_line_starts(f, 0, size)
+        offsets.append(size)
+
+    # write a new index into a temporary file and replace the existing index afterwards
+    temp_path = f'{index_path}.tmp-{os.getpid()}'
+    with open(temp_path, 'wb') as index_file:
+        offsets.tofile(index_file)
+    os.replace(temp_path, index_path)
+
+# Function to write the line index of every .json file in a folder (e.g. the filtered data of a session)
+def write_folder_line_indexes(folder_path):
+    for file_name in os.listdir(folder_path):
+        if file_name.endswith('.json'):
+            write_line_index(os.path.join(folder_path, file_name))
+
+# Function to read the lines start to end (exclusive, counted from 0) of a file, None if there is no up-to-date index
+def read_indexed_lines(file_path, start, end):
+    try:
+        index_file = open(get_line_index_path(file_path), 'rb')
+    except FileNotFoundError:
+        return None
+
+    with index_file, open(file_path, 'rb') as f:
+        line_count = get_indexed_line_count(index_file)
+
+        # lines have been added to the file after the index was written
+        if line_count is None or read_line_offsets(index_file, line_count, 1)[0] != os.fstat(f.fileno()).st_size:
+            return None
+
+        end = min(end, line_count)
+        if start >= end:
+            return []
+
+        offsets = read_line_offsets(index_file, start, end - start + 1)
+        f.seek(offsets[0])
+        data = f.read(offsets[-1] - offsets[0])
+
+    return [data[offsets[i] - offsets[0]:offsets[i + 1] - offsets[0]] for i in range(end - start)]
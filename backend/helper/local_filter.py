@@ -0,0 +1,500 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script defines functions to filter datasets with NumPy inside the Flask app. It is the local filter backend
+of filter.py and evaluates the same filters as the Spark backend (spark_filter.py) without starting Spark jobs.
+The script includes the following key functionalities:
+
+1. select_term_rows Function:
+   - Returns the matching rows of each minute folder below the root folder for each filter separately, they are
+     combined by row_bitmap.py. The columns of a minute folder are loaded once for all filters.
+   - Loads the minute folders below the root folder as typed columns, from their binary column copy (see columnar.py)
+     or, if there is none, by reading their datasets.json file.
+   - Handles 'aspath' by a lookup of the AS paths that contain all of the AS numbers in the dictionary and
+     the other keys by comparing the columns with the value, converted like Spark compares a string with a column.
+   - Handles 'prefix' filters with an 'operator' (covered_by, covers or lpm, see prefix_trie.py) by comparing the
+     masked prefix columns, for lpm only the matching rows with the longest prefix are kept.
+   - Filters on 'aspath', 'sourceasn', 'sourceip', 'nexthopip' and 'prefix' are answered by intersecting the row ids
+     in the inverted indexes of the day folders (see inverted_index.py), prefix operators by the radix trie of the
+     day folders.
+   - Handles the range operators (gt, ge, lt, le and between, see range_filter.py) on the numeric keys by comparing
+     the column with the bounds of the range. Ranges and equality filters on length, numberpeers and timestamp are
+     answered by the sorted value indexes of the day folders.
+   - Skips the minute folders whose statistics show that no record can match (see partition_stats.py).
+   - Returns None if a filter or a record isn't supported.
+   - Reports the scanned minute folders and the rows matching all filters to the progress of a filter job
+     (see job_progress.py), a cancelled job stops after the current minute folder.
+
+2. select_longest_prefixes Function:
+   - Keeps only the selected rows with the longest prefix for lpm filters.
+
+3. count_chart_groups Function:
+   - Groups the records of a row bitmap by the time bucket of their timestamp and their validation states
+     (vectorized with NumPy), the counts of the groups are the graphData and pieData of the filtered data
+     (see chart_data.py). The timestamps and validation states of the records of a data source are loaded once
+     and kept in memory, so the groups of further filters don't read any minute folder.
+'''
+
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+import numpy as np
+from helper.columnar import COLUMN_TYPES, load_partition_columns, read_partition_columns, address_to_int, asn_to_int
+from helper.dictionary import create_dictionary_tables, load_dictionary_tables, find_value_id, find_aspath_ids
+from helper.inverted_index import INDEX_KEY_COLUMNS, load_day_index, find_index_rows, find_range_rows, get_row_ids, split_row_ids
+from helper.hierarchy import DATE_FOLDER_PATTERN
+from helper.partition_stats import partition_may_match
+from helper.chart_data import get_bucket_width
+from helper.job_progress import add_scanned_partitions, add_matched_rows
+from helper.range_filter import RANGE_OPERATORS, get_range_bounds, clip_range_bounds
+from helper.prefix_trie import PREFIX_OPERATORS, parse_network, mask_prefix_columns, find_covered_rows, find_covering_rows
+
+# Keys compared as 64 bit integers by Spark
+NUMERIC_KEYS = ("length", "roa1", "aspa1", "aspa2", "numberpeers", "timestamp")
+
+# Keys stored as dictionary ids
+ID_KEYS = ("sourceip", "nexthopip", "sourceasn")
+
+# Strings that Spark converts into a 64 bit integer (the digits after the point are dropped)
+SPARK_LONG_PATTERN = re.compile(r'^[+-]?\d+(\.\d*)?$')
+
+INT64_MIN = -2**63
+INT64_MAX = 2**63 - 1
+
+# Function to check if the local backend can evaluate all filters
+def is_supported_filter(filter_values):
+    for filter_item in filter_values:
+        key, value = filter_item.get('key'), filter_item.get('value')
+
+        if filter_item.get('operator') in RANGE_OPERATORS:
+            if key not in NUMERIC_KEYS or get_range_bounds(filter_item['operator'], value) is None:
+                return False
+        elif filter_item.get('operator') is not None:
+            if key != 'prefix' or filter_item['operator'] not in PREFIX_OPERATORS or not isinstance(value, str):
+                return False
+        elif key == 'aspath':
+            if not isinstance(value, str) or not value.split():
+                return False
+        elif key in ("prefix", "sourceip", "nexthopip"):
+            if not isinstance(value, str):
+                return False
+        elif key in NUMERIC_KEYS or key == 'sourceasn':
+            if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+                return False
+        else:
+            return False
+
+    return True
+
+# Function to convert a filter value like Spark does when comparing it with a 64 bit integer column, None matches no row
+def to_spark_long(value):
+    if isinstance(value, str):
+        value = value.strip()
+        if not SPARK_LONG_PATTERN.match(value):
+            return None
+        value = int(value.split('.')[0])
+
+    if isinstance(value, float):
+        return value if value.is_integer() else None
+
+    return value if INT64_MIN <= value <= INT64_MAX else None
+
+# Function to get the names of the columns needed to evaluate the filters
+def get_filter_column_names(filter_values):
+    names = set()
+    for filter_item in filter_values:
+        if filter_item['key'] == 'prefix':
+            names.update(("family", "prefix_hi", "prefix_lo"))
+            if filter_item.get('operator') is not None:
+                names.add("length")
+        else:
+            names.add(filter_item['key'])
+    return sorted(names)
+
+# Function to get the id of a source IP, next hop IP or source ASN filter value in a dictionary, None if no record has the value
+def get_value_id(dictionary, key, value):
+    if key == 'sourceasn':
+        # Spark compares the AS number strings of the records, they are stored as canonical integers
+        value = asn_to_int(value) if isinstance(value, str) else to_spark_long(value)
+    return find_value_id(dictionary, key, value) if value is not None else None
+
+# Function to get the mask of the rows of a minute folder with a prefix matching a prefix operator
+def get_prefix_operator_mask(columns, operator, value):
+    network = parse_network(value)
+    if network is None:
+        return np.zeros(columns["rows"], dtype=bool)
+
+    family, address, length = network
+    families, prefix_hi, prefix_lo, lengths = (np.asarray(columns[name]) for name in ("family", "prefix_hi", "prefix_lo", "length"))
+    network_hi, network_lo = np.uint64(address >> 64), np.uint64(address & (2**64 - 1))
+
+    if operator == "covered_by":
+        # prefixes of the records masked to the length of the network are the network
+        masked_hi, masked_lo = mask_prefix_columns(families, prefix_hi, prefix_lo, np.full(len(lengths), length))
+        return (families == family) & (lengths >= length) & (masked_hi == network_hi) & (masked_lo == network_lo)
+
+    # covers and lpm: the network masked to the length of the prefixes of the records is their prefix
+    masked_hi, masked_lo = mask_prefix_columns(families, np.full(len(lengths), network_hi), np.full(len(lengths), network_lo), lengths)
+    record_hi, record_lo = mask_prefix_columns(families, prefix_hi, prefix_lo, lengths)
+    return (families == family) & (lengths <= length) & (masked_hi == record_hi) & (masked_lo == record_lo)
+
+# Function to get the bounds of a range filter limited to the values of its column, None if no value of the column is in the range
+def get_column_range_bounds(key, operator, value):
+    limits = np.iinfo(COLUMN_TYPES[key])
+    return clip_range_bounds(get_range_bounds(operator, value), int(limits.min), int(limits.max))
+
+# Function to get the mask of the rows of a minute folder that match one filter
+def get_filter_item_mask(columns, key, value, lookups, operator=None):
+    dictionary = columns["dictionary"]
+    no_rows = np.zeros(columns["rows"], dtype=bool)
+
+    if operator in RANGE_OPERATORS:
+        bounds = get_column_range_bounds(key, operator, value)
+        return no_rows if bounds is None else (columns[key] >= bounds[0]) & (columns[key] <= bounds[1])
+
+    if operator is not None:
+        return get_prefix_operator_mask(columns, operator, value)
+
+    if key == 'aspath':
+        # AS paths that contain all AS numbers, found once per dictionary (kept in lookups, so its id isn't reused)
+        lookup_key = (id(dictionary), key, value)
+        if lookup_key not in lookups:
+            asns = [asn_to_int(asn) for asn in value.split()]
+            lookups[lookup_key] = (dictionary, None if None in asns else find_aspath_ids(dictionary, asns))
+
+        path_ids = lookups[lookup_key][1]
+        return no_rows if path_ids is None else np.isin(columns["aspath"], path_ids)
+
+    if key in ID_KEYS:
+        value_id = get_value_id(dictionary, key, value)
+        return no_rows if value_id is None else columns[key] == value_id
+
+    if key == 'prefix':
+        prefix = address_to_int(value)
+        if prefix is None:
+            return no_rows
+        return (columns["family"] == prefix[0]) & (columns["prefix_hi"] == prefix[1]) & (columns["prefix_lo"] == prefix[2])
+
+    number = to_spark_long(value)
+    if number is None:
+        return no_rows
+
+    # values that can't be stored in the column don't match any row
+    limits = np.iinfo(COLUMN_TYPES[key])
+    if not limits.min <= number <= limits.max:
+        return no_rows
+
+    return columns[key] == number
+
+# Function to get the mask of the rows of a minute folder that match all filters
+def get_filter_mask(columns, filter_values, lookups):
+    mask = np.ones(columns["rows"], dtype=bool)
+    for filter_item in filter_values:
+        mask &= get_filter_item_mask(columns, filter_item['key'], filter_item['value'], lookups, filter_item.get('operator'))
+    return mask
+
+# Function to get the name of the index of a day folder that answers a filter, None if there is none
+def get_filter_index_name(filter_item):
+    if filter_item.get('operator') in PREFIX_OPERATORS:
+        return "trie"
+    return filter_item['key'] if filter_item['key'] in INDEX_KEY_COLUMNS else None
+
+# Function to get the sorted row ids of the records matching a prefix operator in the radix trie of a day folder
+def find_prefix_operator_rows(index, operator, value):
+    network = parse_network(value)
+    if network is None:
+        return np.zeros(0, dtype=np.uint64)
+
+    if operator == "covered_by":
+        return find_covered_rows(index["trie"], network)
+    return find_covering_rows(index["trie"], network)
+
+# Function to get the keys of a filter in the inverted indexes of a day folder, None if no record can match
+def get_filter_index_keys(dictionary, key, value):
+    if key == 'aspath':
+        asns = [asn_to_int(asn) for asn in value.split()]
+        return None if None in asns else [(asn,) for asn in asns]
+
+    if key == 'prefix':
+        prefix = address_to_int(value)
+        return None if prefix is None else [prefix]
+
+    if key in NUMERIC_KEYS:
+        number = to_spark_long(value)
+        limits = np.iinfo(COLUMN_TYPES[key])
+        return [(int(number),)] if number is not None and limits.min <= number <= limits.max else None
+
+    value_id = get_value_id(dictionary, key, value)
+    return None if value_id is None else [(value_id,)]
+
+# Function to get the day folders with records below a folder and the path of the folder relative to them
+def get_day_scopes(root_folder_path):
+    parts = os.path.normpath(root_folder_path).split(os.sep)
+
+    # folders in a day folder: day/two hours/ten minutes/minute
+    for depth in range(min(4, len(parts))):
+        if DATE_FOLDER_PATTERN.match(parts[-1 - depth]):
+            return [(os.sep.join(parts[:len(parts) - depth]), os.sep.join(parts[len(parts) - depth:]))]
+
+    return [(os.path.join(root_folder_path, name), '') for name in sorted(os.listdir(root_folder_path))
+            if DATE_FOLDER_PATTERN.match(name) and os.path.isdir(os.path.join(root_folder_path, name))]
+
+# Function to filter the records of a day folder (or of scope in it) by its inverted indexes, returns the matching rows and the minute
+# folders in scope that aren't indexed, or None if it has no up-to-date indexes
+def filter_day_by_index(day_folder_path, scope, filter_values):
+    index = load_day_index(day_folder_path)
+    dictionary = load_dictionary_tables(os.path.dirname(os.path.normpath(day_folder_path)))
+    if index is None or dictionary is None:
+        return None
+
+    # the minute folders in scope are consecutive in the index
+    partitions = index["partitions"]
+    in_scope = [number for number, partition in enumerate(partitions) if not scope or partition == scope or partition.startswith(scope + os.sep)]
+    unindexed = set(index.get("unindexed", []))
+    unindexed_folder_paths = [os.path.join(day_folder_path, partitions[number]) for number in in_scope if partitions[number] in unindexed]
+    if not in_scope:
+        return [], []
+    first_row_id, end_row_id = get_row_ids(in_scope[0], np.zeros(1)), get_row_ids(in_scope[-1] + 1, np.zeros(1))
+
+    # row ids of the records with each key of the indexed filters
+    posting_lists = []
+    for filter_item in filter_values:
+        index_name = get_filter_index_name(filter_item)
+        if index_name == "trie":
+            row_ids = find_prefix_operator_rows(index, filter_item['operator'], filter_item['value'])
+            posting_lists.append(row_ids[np.searchsorted(row_ids, first_row_id[0]):np.searchsorted(row_ids, end_row_id[0])])
+        elif index_name is not None and filter_item.get('operator') in RANGE_OPERATORS:
+            bounds = get_column_range_bounds(filter_item['key'], filter_item['operator'], filter_item['value'])
+            if bounds is None:
+                return [], unindexed_folder_paths
+
+            row_ids = find_range_rows(index, index_name, *bounds)
+            posting_lists.append(row_ids[np.searchsorted(row_ids, first_row_id[0]):np.searchsorted(row_ids, end_row_id[0])])
+        elif index_name is not None:
+            keys = get_filter_index_keys(dictionary, filter_item['key'], filter_item['value'])
+            if keys is None:
+                return [], unindexed_folder_paths
+
+            for key in keys:
+                row_ids = find_index_rows(index, index_name, key)
+                posting_lists.append(row_ids[np.searchsorted(row_ids, first_row_id[0]):np.searchsorted(row_ids, end_row_id[0])])
+
+    # intersect the posting lists, starting with the shortest
+    posting_lists.sort(key=len)
+    row_ids = posting_lists[0]
+    for posting_list in posting_lists[1:]:
+        row_ids = np.intersect1d(row_ids, posting_list, assume_unique=True)
+
+    partition_rows = [(os.path.join(day_folder_path, partitions[number]), rows) for number, rows in split_row_ids(row_ids)]
+    return [(folder_path, rows) for folder_path, rows in partition_rows if len(rows) > 0], unindexed_folder_paths
+
+# Function to get the minute folders (folders with a datasets.json file) below a root folder in time order
+def get_partition_folders(root_folder_path):
+    folder_paths = []
+
+    for folder_path, folder_names, file_names in os.walk(root_folder_path):
+        folder_names.sort()
+        if 'datasets.json' in file_names:
+            folder_paths.append(folder_path)
+
+    return folder_paths
+
+# Function to load the columns of a minute folder, from its binary column copy or its datasets.json file
+def load_filter_columns(folder_path, names):
+    columns = load_partition_columns(folder_path, names)
+    if columns is not None:
+        return columns
+
+    partition = read_partition_columns(folder_path)
+    if partition is None:
+        return None
+
+    arrays, values, _, _ = partition
+    columns = dict(arrays)
+    columns["rows"] = len(arrays["timestamp"])
+    columns["dictionary"] = create_dictionary_tables(values)
+    return columns
+
+# Function to keep the selected rows with the longest prefix if a filter is a longest prefix match (lpm), None if a folder can't be read
+def select_longest_prefixes(selections, filter_values):
+    if selections is None or not any(filter_item.get('operator') == "lpm" for filter_item in filter_values):
+        return selections
+
+    lengths = []
+    for folder_path, rows in selections:
+        columns = load_filter_columns(folder_path, ["length"])
+        if columns is None:
+            return None
+        lengths.append(np.asarray(columns["length"])[rows])
+
+    # all selected rows cover the address of the lpm filters, the longest of their prefixes is the best match
+    longest = max((int(length.max()) for length in lengths), default=0)
+    return [(folder_path, rows[length == longest]) for (folder_path, rows), length in zip(selections, lengths) if np.any(length == longest)]
+
+# Columns of the records counted in the charts
+CHART_COLUMN_NAMES = ("timestamp", "roa1", "aspa1", "aspa2")
+
+# Number of row spaces whose chart columns are kept in memory
+LOADED_CHART_COLUMNS_CACHE_SIZE = 2
+
+# Loaded chart columns, ordered from least to most recently used (row space key -> (timestamps, packed validation states))
+LOADED_CHART_COLUMNS = OrderedDict()
+
+# protects the loaded chart columns, the Flask app and the filter jobs use them in several threads
+LOADED_CHART_COLUMNS_LOCK = threading.Lock()
+
+# Function to load the chart columns of all records of a row space (see row_bitmap.py), None if a folder can't be read
+def load_chart_columns(row_space):
+    # records are only added, so the minute folders and their number of records identify the records of a row space
+    key = hashlib.sha256(json.dumps(row_space["partitions"]).encode('utf-8') + np.asarray(row_space["offsets"]).tobytes()).hexdigest()
+
+    with LOADED_CHART_COLUMNS_LOCK:
+        loaded = LOADED_CHART_COLUMNS.get(key)
+        if loaded is not None:
+            LOADED_CHART_COLUMNS.move_to_end(key)
+            return loaded
+
+    # the columns of all minute folders are loaded outside of the lock
+    timestamps, states = [], []
+    for folder_path in row_space["partitions"]:
+        columns = load_filter_columns(folder_path, CHART_COLUMN_NAMES)
+        if columns is None:
+            return None
+
+        timestamps.append(np.asarray(columns["timestamp"]))
+        # the three 8 bit validation states of a record are packed into one number
+        states.append(((np.asarray(columns["roa1"], dtype=np.int64) << 8) | columns["aspa1"]) << 8 | columns["aspa2"])
+
+    chart_columns = (np.concatenate(timestamps or [np.zeros(0, dtype=np.int64)]), np.concatenate(states or [np.zeros(0, dtype=np.int64)]))
+    if len(chart_columns[0]) != row_space["offsets"][-1]:
+        return None
+
+    with LOADED_CHART_COLUMNS_LOCK:
+        LOADED_CHART_COLUMNS[key] = chart_columns
+        while len(LOADED_CHART_COLUMNS) > LOADED_CHART_COLUMNS_CACHE_SIZE:
+            LOADED_CHART_COLUMNS.popitem(last=False)
+
+    return chart_columns
+
+# Function to group the records at positions of a row space by time bucket and validation states, returns (bucket, roa1, aspa1, aspa2, count) groups or None
+def count_chart_groups(row_space, positions, path_parts):
+    chart_columns = load_chart_columns(row_space)
+    if chart_columns is None:
+        return None
+
+    period, width = get_bucket_width(path_parts)
+    timestamps, states = chart_columns[0][positions], chart_columns[1][positions]
+    buckets = (timestamps % period if period else timestamps) // width
+
+    # the bucket and the validation states are packed into one key, so the groups are counted by one np.unique
+    group_keys, counts = np.unique((buckets << 24) | states, return_counts=True)
+    return zip((group_keys >> 24).tolist(), ((group_keys >> 16) & 255).tolist(), ((group_keys >> 8) & 255).tolist(),
+               (group_keys & 255).tolist(), counts.tolist())
+
+# Function to get the rows matching each filter in a list of minute folders, their columns are loaded once for all filters
+def filter_partition_terms(folder_paths, filter_values, lookups, progress=None, count_rows=False):
+    term_selections = [[] for _ in filter_values]
+
+    for folder_path in folder_paths:
+        add_scanned_partitions(progress, 1)
+
+        # filters whose records can't be in the minute folder by its statistics are not evaluated
+        terms = [i for i, filter_item in enumerate(filter_values) if partition_may_match(folder_path, [filter_item])]
+        if not terms:
+            continue
+
+        columns = load_filter_columns(folder_path, get_filter_column_names([filter_values[i] for i in terms]))
+        if columns is None:
+            return None
+
+        folder_selections = []
+        for i in terms:
+            matching_rows = np.flatnonzero(get_filter_mask(columns, [filter_values[i]], lookups))
+            if len(matching_rows) > 0:
+                folder_selections.append((folder_path, matching_rows.astype(np.uint32)))
+                term_selections[i].append(folder_selections[-1])
+
+        # the rows matching all filters are reported to the job of the filter if these are all of its filters
+        if count_rows and len(folder_selections) == len(filter_values):
+            add_matched_rows(progress, intersect_term_selections([[selection] for selection in folder_selections]))
+
+    return term_selections
+
+# Function to get the rows selected by all filters from the (minute folder, rows) pairs of each filter
+def intersect_term_selections(term_selections):
+    rows_by_folder = [{os.path.normpath(folder_path): rows for folder_path, rows in selections} for selections in term_selections[1:]]
+    selections = []
+
+    for folder_path, rows in term_selections[0] if term_selections else []:
+        for other_rows in rows_by_folder:
+            rows = np.intersect1d(rows, other_rows.get(os.path.normpath(folder_path), rows[:0]), assume_unique=True)
+        if len(rows) > 0:
+            selections.append((folder_path, rows))
+
+    return selections
+
+# Function to get the rows of the minute folders below a root folder that match each filter, None if a filter or a record isn't supported
+def select_term_rows(root_folder_path, filter_values, progress=None):
+    lookups = {}
+    term_selections = [[] for _ in filter_values]
+
+    # folders outside of the day folders have no indexes
+    day_scopes = get_day_scopes(root_folder_path) or [(None, None)]
+
+    for day_folder_path, scope in day_scopes:
+        scope_folder_path = root_folder_path if day_folder_path is None else os.path.join(day_folder_path, scope) if scope else day_folder_path
+        scope_folder_paths = get_partition_folders(scope_folder_path) if progress is not None else None
+        day_starts = [len(selections) for selections in term_selections]
+
+        scanned_terms, indexed_terms, unindexed_folder_paths = [], [], []
+        for i, filter_item in enumerate(filter_values):
+            day_result = None
+            if day_folder_path is not None and get_filter_index_name(filter_item) is not None:
+                day_result = filter_day_by_index(day_folder_path, scope, [filter_item])
+
+            # day folders without up-to-date indexes are filtered by reading the columns of their minute folders
+            if day_result is None:
+                scanned_terms.append(i)
+            else:
+                term_selections[i].extend(day_result[0])
+                indexed_terms.append(i)
+                unindexed_folder_paths = day_result[1]
+
+        # the minute folders of the day folder without columns are read for the filters answered by the indexes
+        if indexed_terms and unindexed_folder_paths:
+            unindexed_selections = filter_partition_terms(unindexed_folder_paths, [filter_values[i] for i in indexed_terms], lookups)
+            if unindexed_selections is None:
+                return None
+
+            for i, selections in zip(indexed_terms, unindexed_selections):
+                term_selections[i].extend(selections)
+
+        # the matching rows are counted while scanning if no filter is answered by the indexes of the day folder
+        count_rows = progress is not None and progress["rows_counted"]
+        scanned_count_rows = count_rows and len(scanned_terms) == len(filter_values)
+
+        if scanned_terms:
+            scanned_selections = filter_partition_terms(scope_folder_paths or get_partition_folders(scope_folder_path),
+                                                        [filter_values[i] for i in scanned_terms], lookups, progress, scanned_count_rows)
+            if scanned_selections is None:
+                return None
+
+            for i, selections in zip(scanned_terms, scanned_selections):
+                term_selections[i].extend(selections)
+        elif progress is not None:
+            add_scanned_partitions(progress, len(scope_folder_paths))
+
+        # otherwise the rows of the day folder that match all filters are reported to the job of the filter
+        if count_rows and not scanned_count_rows:
+            add_matched_rows(progress, intersect_term_selections([selections[start:] for selections, start in zip(term_selections, day_starts)]))
+
+    return term_selections
@@ -5,56 +5,185 @@ This work is licensed under the terms of the MIT license.
 For a copy, see LICENSE.txt in the project root.
 
 @author: Michael Küchenmeister - Technische Hochschule Ingolstadt (mik6331@thi.de)
-@version: 0.2
-@date: 15.01.2024
+@version: 0.3
+@date: 17.10.2026
 
-This script provides functions to retrieve metadata for Autonomous System (AS) numbers 
+This script provides functions to retrieve metadata for Autonomous System (AS) numbers
 from a specified JSON file in /data/nfs/20231012_1697068800/meta/potaroo/asname/metadata
-on node101.
+on node101 (or the file in the environment variable METADATA_FILE). It includes the following key functionalities:
+
+1. load_metadata_index Function:
+   - Reads the metadata file once into an index by AS number, which is shared by all request threads. The index
+     is rebuilt when the modification time or size of the file changes and replaced at once, so a request
+     never sees a partially loaded index.
+   - If the environment variable METADATA_INDEX_FILE is set, the index is a compact file instead of a dict: the
+     sorted AS numbers with the byte offset of their line in the metadata file, as unsigned 64 bit integers. It
+     is memory-mapped and searched by bisection, so the worker processes of the app share it instead of each
+     holding all metadata objects. A worker that finds an up-to-date index file uses it without reading the
+     metadata file.
+
+2. get_metadata and get_metadata_batch Functions:
+   - get_metadata returns the metadata objects of the AS numbers of an AS path, get_metadata_batch the metadata
+     of all AS numbers of the rows of a page at once (AS number -> metadata object).
 '''
 
+import os
 import json
+import mmap
+import threading
+from array import array
+
+METADATA_FILE = os.environ.get('METADATA_FILE', "/data/nfs/20231012_1697068800/meta/potaroo/asname/metadata")
+METADATA_INDEX_FILE = os.environ.get('METADATA_INDEX_FILE', '')
+
+# Header of the compact index file: modification time and size of the metadata file, number of AS numbers
+METADATA_INDEX_HEADER_ITEMS = 3
 
-# Function to find metadata object for a given AS number in a JSON file
-def find_meta_object_for_as_num(file_path, as_num):
+# Loaded index: version of the metadata file (modification time, size) and the metadata objects or the mapped compact index
+METADATA_INDEX = {"version": None, "entries": {}, "offsets": None}
+
+# only one thread reloads the index, the others keep using the loaded one until it is replaced
+METADATA_RELOAD_LOCK = threading.Lock()
+
+# Function to get the version of the metadata file, None if it doesn't exist
+def get_metadata_version(file_path):
     try:
-        # Open the specified file and iterate through each line
-        with open(file_path, 'r') as file:
-            for line in file:
-                # Load each line as a JSON object
-                entry = json.loads(line)
-                
-                # Check if the 'asNumber' attribute matches the specified AS number
-                if entry.get('asNumber') == as_num:
-                    return entry
+        stat = os.stat(file_path)
     except FileNotFoundError:
-        # Handle the case where the specified file is not found
-        print({"error": f"File '{file_path}' not found."})
-        return
-    except json.JSONDecodeError:
-        # Handle JSON decoding errors
-        print(f"Error decoding JSON in file: {file_path}.")
+        return None
+    return stat.st_mtime_ns, stat.st_size
 
-# Function to retrieve metadata for a list of AS numbers
-def get_metadata(as_path):
-    # Define the file path for the metadata file
-    file_path = "/data/nfs/20231012_1697068800/meta/potaroo/asname/metadata"
-    results = []
+# Function to read the lines of the metadata file, returns (AS number, byte offset of the line, metadata object) for each line
+def read_metadata_lines(file_path):
+    lines = []
+    with open(file_path, 'rb') as file:
+        offset = 0
+        for line in file:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                # Handle JSON decoding errors, the other lines are still indexed
+                print(f"Error decoding JSON in file: {file_path}.")
+                entry = None
+
+            as_num = entry.get('asNumber') if isinstance(entry, dict) else None
+            if type(as_num) is int and 0 <= as_num < 2**64:
+                lines.append((as_num, offset, entry))
+            offset += len(line)
+    return lines
 
-    # Iterate through each AS number in the provided list
+# Function to write the compact index of the metadata file, the sorted AS numbers with the offset of their first line
+def write_metadata_index_file(index_path, file_path, version):
+    offsets = {}
+    for as_num, offset, _ in read_metadata_lines(file_path):
+        offsets.setdefault(as_num, offset)
+
+    items = array('Q', [version[0], version[1], len(offsets)])
+    for as_num in sorted(offsets):
+        items.extend((as_num, offsets[as_num]))
+
+    temp_path = f'{index_path}.tmp-{os.getpid()}-{threading.get_ident()}'
+    with open(temp_path, 'wb') as f:
+        items.tofile(f)
+    os.replace(temp_path, index_path)
+
+# Function to map the compact index file, None if it doesn't exist or was written for another version of the metadata file
+def map_metadata_index_file(index_path, version):
+    try:
+        with open(index_path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        # an empty file can't be mapped
+        return None
+
+    items = memoryview(mapped).cast('Q')
+    if len(items) < METADATA_INDEX_HEADER_ITEMS or tuple(items[:2]) != version or \
+            len(items) != METADATA_INDEX_HEADER_ITEMS + 2 * items[2]:
+        return None
+    return items
+
+# Function to get the loaded index of the metadata file, it is (re)loaded if the file has changed
+def load_metadata_index():
+    global METADATA_INDEX
+
+    version = get_metadata_version(METADATA_FILE)
+    if version == METADATA_INDEX["version"]:
+        return METADATA_INDEX
+
+    with METADATA_RELOAD_LOCK:
+        # another thread may have reloaded the index in the meantime
+        if version == METADATA_INDEX["version"]:
+            return METADATA_INDEX
+
+        entries, offsets = {}, None
+        if version is None:
+            # Handle the case where the specified file is not found
+            print({"error": f"File '{METADATA_FILE}' not found."})
+        elif METADATA_INDEX_FILE:
+            offsets = map_metadata_index_file(METADATA_INDEX_FILE, version)
+            if offsets is None:
+                write_metadata_index_file(METADATA_INDEX_FILE, METADATA_FILE, version)
+                offsets = map_metadata_index_file(METADATA_INDEX_FILE, version)
+        else:
+            for as_num, _, entry in read_metadata_lines(METADATA_FILE):
+                # the first line of an AS number is its metadata object
+                entries.setdefault(as_num, entry)
+
+        # the index is replaced at once, requests that already got the old one keep using it
+        METADATA_INDEX = {"version": version, "entries": entries, "offsets": offsets}
+        return METADATA_INDEX
+
+# Function to find the offset of the line of an AS number in the compact index by bisection, None if it isn't there
+def find_metadata_offset(offsets, as_num):
+    low, high = 0, offsets[2]
+    while low < high:
+        middle = (low + high) // 2
+        if offsets[METADATA_INDEX_HEADER_ITEMS + 2 * middle] < as_num:
+            low = middle + 1
+        else:
+            high = middle
+
+    item = METADATA_INDEX_HEADER_ITEMS + 2 * low
+    if low < offsets[2] and offsets[item] == as_num:
+        return offsets[item + 1]
+    return None
+
+# Function to find metadata objects for AS numbers in the loaded index, returns AS number -> metadata object for the found ones
+def find_meta_objects(as_nums):
+    index = load_metadata_index()
+    if index["offsets"] is None:
+        return {as_num: index["entries"][as_num] for as_num in as_nums if as_num in index["entries"]}
+
+    found = {}
+    with open(METADATA_FILE, 'rb') as file:
+        for as_num in sorted(set(as_nums)):
+            offset = find_metadata_offset(index["offsets"], as_num)
+            if offset is not None:
+                file.seek(offset)
+                found[as_num] = json.loads(file.readline())
+    return found
+
+# Function to convert the AS numbers of a list (strings or integers) into integers, AS numbers that aren't integers are skipped
+def parse_as_numbers(as_path):
+    as_nums = []
     for as_num in as_path:
         if as_num:  # Check if as_num is not an empty string
             try:
-                # Attempt to find the metadata object for the current AS number
-                meta = find_meta_object_for_as_num(file_path, int(as_num))
-                
-                # If metadata is found, append it to the results list
-                if meta:
-                    results.append(meta)
-            except ValueError:
+                as_nums.append(int(as_num))
+            except (TypeError, ValueError):
                 # Handle errors when converting AS number to int
                 print(f"Error converting {as_num} to int.")
-                continue
+    return as_nums
+
+# Function to retrieve metadata for a list of AS numbers
+def get_metadata(as_path):
+    as_nums = parse_as_numbers(as_path)
+    found = find_meta_objects(as_nums)
 
     # Return the list of metadata objects for the specified AS numbers
-    return results
+    return [found[as_num] for as_num in as_nums if as_num in found]
+
+# Function to retrieve the metadata of the AS numbers of several AS paths (e.g. the rows of a page) in one lookup
+def get_metadata_batch(as_paths):
+    as_nums = parse_as_numbers([as_num for as_path in as_paths for as_num in as_path])
+    return {str(as_num): meta for as_num, meta in find_meta_objects(as_nums).items()}
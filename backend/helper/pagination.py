@@ -5,8 +5,8 @@ This work is licensed under the terms of the MIT license.
 For a copy, see LICENSE.txt in the project root.
 
 @author: Michael Küchenmeister - Technische Hochschule Ingolstadt (mik6331@thi.de)
-@version: 0.3
-@date: 15.01.2024
+@version: 0.4
+@date: 17.10.2026
 
 
 This script provides functions to paginate through dataset table data stored in JSON files. 
@@ -17,20 +17,32 @@ It includes the following key functionalities:
    - Calculates the start and end indices based on the specified page number and size.
    - Reads the content of the datasets.json file in the given path and extracts lines within the calculated range.
    - Returns a list of paginated table data.
+   - If the minute folder has a binary column copy of datasets.json (see columnar.py), the rows are read from it.
+   - Otherwise, if the file has an up-to-date line index (see line_index.py), only the lines of the page are read.
+
 
 2. paginate_table_data Function:
    - Takes a folder path, page number, and page size as input.
-   - Checks if the folder contains a response-data.json file.
-   - If found, reads the content and checks if "datasetSum" is greater than 0.
-   - If true, calls the read_data_lines function to retrieve paginated table data.
-   - If false, iterates through subfolders recursively, repeating the process.
+   - The page is counted over the records of all minute folders below the folder in time order.
+   - Uses the "datasetSum" of the response-data.json of each sub folder to skip the sub folders before the page
+     without reading their records, and continues in the following minute folders until the page is full.
    - Returns a boolean indicating success (True if data is found) and a list of paginated table data.
+   - Folders of time periods without records are not created by sort_raw_exabgp_data.py, for them no data is found.
 
 '''
 
 import os
 import json
 
+try:
+    from helper.columnar import load_partition_columns, read_column_rows
+except ImportError:
+    # NumPy is not installed, the records are always read from datasets.json
+    load_partition_columns = None
+
+from helper.line_index import read_indexed_lines
+from helper.hierarchy import load_response_data_file
+
 # Function to read a specified range of lines from a file
 def read_data_lines(path_to_file, page_number, page_size):
     # Calculate the start_index based on page_size and page_number
@@ -39,54 +51,79 @@ def read_data_lines(path_to_file, page_number, page_size):
     # Calculate the end_index based on page_size and page_number
     end_index = start_index + page_size
 
-    # Add 1 to start_index if page_number > 1 to avoid responding with duplicates
-    if page_number > 1:
-        start_index += 1
-    
+    return read_data_rows(path_to_file, start_index, end_index)
+
+# Function to read the rows start_index to end_index (exclusive, counted from 0) of a file
+def read_data_rows(path_to_file, start_index, end_index):
+    # Minute folders with a binary column copy of datasets.json are read without parsing JSON
+    if load_partition_columns is not None and os.path.basename(path_to_file) == 'datasets.json':
+        columns = load_partition_columns(os.path.dirname(path_to_file))
+        if columns is not None:
+            return read_column_rows(columns, start_index, end_index)
+
+    # Files with a line index are read from the first line of the page on
+    indexed_lines = read_indexed_lines(path_to_file, start_index, end_index)
+    if indexed_lines is not None:
+        return [json.loads(line) for line in indexed_lines]
+
     # Read the content of datasets.json in path_to_file
     with open(path_to_file, 'r') as f:
-        line_count = 0
-
         # Save response tableData here
         paginated_table_data = []
 
         # Iterate through the datasets.json file
-        for line in f:
-            line_count += 1
+        for line_index, line in enumerate(f):
+            # Stop after the last line of the specified range
+            if line_index >= end_index:
+                break
 
             # Check if the line is within the specified range
-            if start_index <= line_count <= end_index:
+            if line_index >= start_index:
                 paginated_table_data.append(json.loads(line))
 
         return paginated_table_data
 
-# Function to paginate table data from a specified folder
-def paginate_table_data(folder_path, page_number, page_size):
-    # Check if the folder contains response-data.json
+# Function to get the number of records of a folder from its response-data.json, 0 for other folders
+def get_dataset_sum(folder_path):
+    data = load_response_data_file(os.path.join(folder_path, 'response-data.json'))
+    return data.get("datasetSum", 0) if data is not None else 0
+
+# Function to add the rows start_index to end_index (exclusive, counted from the first row of the folder) of a folder to table_data
+def collect_table_data(folder_path, start_index, end_index, table_data):
     datasets_path = os.path.join(folder_path, 'datasets.json')
-    response_data_path = os.path.join(folder_path, 'response-data.json')
-    
+
+    # Minute folders contain their records in datasets.json
     if os.path.isfile(datasets_path):
-        # Read the content of response-data.json
-        with open(response_data_path, 'r') as file:
-            loaded_json = json.load(file)
-            
-            # Check if "datasetSum" is greater than 0
-            if loaded_json.get("datasetSum", 0) > 0:
-                return True, read_data_lines(datasets_path, page_number, page_size)
-            
-    # Iterate through all subfolders using os.listdir
+        table_data.extend(read_data_rows(datasets_path, start_index, end_index))
+        return
+
+    # The sub folders are sorted by time, row_offset is the number of rows in the sub folders before subfolder
+    row_offset = 0
     for subfolder in sorted(os.listdir(folder_path)):
+        if row_offset >= end_index:
+            break
+
         subfolder_path = os.path.join(folder_path, subfolder)
-        
-        # Check if subfolder is a directory
-        if os.path.isdir(subfolder_path):
-            # Recursively call paginate_table_data for each subfolder
-            valid, data_lines = paginate_table_data(subfolder_path, page_number, page_size)
-            
-            # If valid, return the result
-            if valid:
-                return valid, data_lines
+        if not os.path.isdir(subfolder_path):
+            continue
+
+        # Sub folders before the requested rows are skipped without reading their records
+        dataset_sum = get_dataset_sum(subfolder_path)
+        if dataset_sum > 0 and row_offset + dataset_sum > start_index:
+            collect_table_data(subfolder_path, max(start_index - row_offset, 0), end_index - row_offset, table_data)
+
+        row_offset += dataset_sum
+
+# Function to paginate table data from a specified folder
+def paginate_table_data(folder_path, page_number, page_size):
+    # Time periods without records have no folder
+    if not os.path.isdir(folder_path):
+        return False, []
+
+    # The rows of the page are counted over all minute folders of folder_path in time order
+    start_index = (int(page_number) - 1) * page_size
+    table_data = []
+    collect_table_data(folder_path, start_index, start_index + page_size, table_data)
 
     # Return False and an empty list if no data is found
-    return False, []
+    return len(table_data) > 0, table_data
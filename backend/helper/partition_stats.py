@@ -0,0 +1,234 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides the statistics of a minute folder, written by sort_raw_exabgp_data.py into the file stats.json
+next to its datasets.json file. The statistics contain the number of records, the first and last timestamp, the
+validation states (roa and aspa values) present in the records, the smallest and largest length and numberpeers
+and Bloom filters over the AS numbers of the AS paths, the prefixes and the peers (source IP, source ASN and next
+hop IP). It includes the following key functionalities:
+
+1. write_partition_stats Function:
+   - Writes the statistics of a datasets.json file.
+
+2. partition_may_match Function:
+   - Checks by the statistics if records of a minute folder can match the filters of the table, so the filters can
+     skip minute folders without reading their records. A Bloom filter can only prove that a value is missing,
+     minute folders without (up-to-date) statistics are always read.
+'''
+
+import os
+import re
+import json
+import math
+import base64
+import hashlib
+import threading
+from helper.range_filter import RANGE_OPERATORS, get_range_bounds, range_overlaps
+
+STATS_FILE = 'stats.json'
+
+# Keys of the validation states of a record
+VALIDATION_KEYS = ("roa1", "roa2", "roa3", "aspa1", "aspa2", "aspa3")
+
+# Numeric keys whose smallest and largest value are kept (for range filters)
+VALUE_RANGE_KEYS = ("length", "numberpeers")
+
+# Bits per value and number of hash functions of the Bloom filters (about 1% false positives)
+BLOOM_BITS_PER_VALUE = 10
+BLOOM_HASHES = 7
+
+# Strings that are compared as the same integer by Spark and the local filters (other strings are not used to skip folders)
+INTEGER_PATTERN = re.compile(r'^\s*\d+\s*$')
+
+# Loaded statistics (minute folder path -> (modification time of stats.json, statistics))
+LOADED_PARTITION_STATS = {}
+
+# protects the loaded statistics, the Flask app and the filter jobs use them in several threads
+LOADED_PARTITION_STATS_LOCK = threading.Lock()
+
+# Function to get the bit positions of a value in a Bloom filter with size bits
+def get_bloom_positions(value, size, hashes):
+    digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+    first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+    return [(first + i * second) % size for i in range(hashes)]
+
+# Function to create a Bloom filter of a set of string values
+def create_bloom_filter(values):
+    size = max(64, math.ceil(len(values) * BLOOM_BITS_PER_VALUE / 8) * 8)
+    bits = bytearray(size // 8)
+
+    for value in values:
+        for position in get_bloom_positions(value, size, BLOOM_HASHES):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    return {"size": size, "hashes": BLOOM_HASHES, "bits": bits}
+
+# Function to check if a value may be contained in a Bloom filter
+def bloom_filter_contains(bloom_filter, value):
+    bits = bloom_filter["bits"]
+    return all(bits[position >> 3] & (1 << (position & 7)) for position in get_bloom_positions(value, bloom_filter["size"], bloom_filter["hashes"]))
+
+# Function to get the value of a peer in the peer Bloom filter (the key is added, as the same string can be a source and next hop IP)
+def get_peer_value(key, value):
+    return f'{key}:{value}'
+
+# Function to check if a value of a record is an integer
+def is_integer(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+# Function to build the statistics of a datasets.json file
+def build_partition_stats(file_path):
+    rows = 0
+    timestamps = []
+    validation_states = {key: set() for key in VALIDATION_KEYS}
+    value_ranges = {key: [] for key in VALUE_RANGE_KEYS}
+    asns, prefixes, peers = set(), set(), set()
+
+    with open(file_path, 'rb') as f:
+        source_size = os.fstat(f.fileno()).st_size
+
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            rows += 1
+
+            if is_integer(record.get("timestamp")):
+                timestamps.append(record["timestamp"])
+            for key in VALIDATION_KEYS:
+                if key in record:
+                    validation_states[key].add(record[key])
+            for key in VALUE_RANGE_KEYS:
+                if is_integer(record.get(key)):
+                    value_ranges[key].append(record[key])
+
+            asns.update(str(asn) for asn in record.get("aspath") or [])
+            prefixes.add(str(record.get("prefix")))
+            for key in ("sourceip", "sourceasn", "nexthopip"):
+                peers.add(get_peer_value(key, record.get(key)))
+
+    return {
+        "rows": rows,
+        "source_size": source_size,
+        "min_timestamp": min(timestamps) if timestamps else None,
+        "max_timestamp": max(timestamps) if timestamps else None,
+        # records without a valid timestamp can't be skipped by their timestamp
+        "timestamps_complete": len(timestamps) == rows,
+        "validation_states": {key: sorted(values, key=str) for key, values in validation_states.items()},
+        # smallest and largest value, None if a record has no integer value
+        "value_ranges": {key: [min(values), max(values)] if values and len(values) == rows else None for key, values in value_ranges.items()},
+        "bloom_filters": {name: create_bloom_filter(values) for name, values in (("asn", asns), ("prefix", prefixes), ("peer", peers))}
+    }
+
+# Function to write the statistics of a datasets.json file into the stats.json file of its minute folder
+def write_partition_stats(file_path):
+    stats = build_partition_stats(file_path)
+    for bloom_filter in stats["bloom_filters"].values():
+        bloom_filter["bits"] = base64.b64encode(bloom_filter["bits"]).decode('ascii')
+
+    stats_path = os.path.join(os.path.dirname(file_path), STATS_FILE)
+    temp_path = f'{stats_path}.tmp-{os.getpid()}'
+    with open(temp_path, 'w') as f:
+        f.write(json.dumps(stats))
+    os.replace(temp_path, stats_path)
+
+# Function to load the statistics of a minute folder, None if there are none or records have been added since they were written
+def load_partition_stats(folder_path):
+    stats_path = os.path.join(folder_path, STATS_FILE)
+
+    try:
+        modification_time = os.stat(stats_path).st_mtime_ns
+        with LOADED_PARTITION_STATS_LOCK:
+            loaded = LOADED_PARTITION_STATS.get(folder_path)
+
+        if loaded is not None and loaded[0] == modification_time:
+            stats = loaded[1]
+        else:
+            with open(stats_path, 'r') as f:
+                stats = json.load(f)
+            for bloom_filter in stats["bloom_filters"].values():
+                bloom_filter["bits"] = base64.b64decode(bloom_filter["bits"])
+            with LOADED_PARTITION_STATS_LOCK:
+                LOADED_PARTITION_STATS[folder_path] = (modification_time, stats)
+
+        if os.stat(os.path.join(folder_path, 'datasets.json')).st_size != stats["source_size"]:
+            return None
+    except (FileNotFoundError, ValueError, KeyError):
+        return None
+
+    return stats
+
+# Function to get the integer of a filter value compared with an integer column, None if it isn't used to skip folders
+def get_integer_value(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and INTEGER_PATTERN.match(value):
+        return int(value)
+    return None
+
+# Function to check if records with a value of a key in a range can be in a minute folder with the statistics
+def range_may_match(stats, key, bounds):
+    if bounds is None:
+        return True
+
+    if key == 'timestamp' and stats["timestamps_complete"] and stats["rows"] > 0:
+        return range_overlaps(bounds, stats["min_timestamp"], stats["max_timestamp"])
+
+    value_range = stats.get("value_ranges", {}).get(key)
+    if value_range is not None:
+        return range_overlaps(bounds, value_range[0], value_range[1])
+
+    if key in VALIDATION_KEYS and all(is_integer(state) for state in stats["validation_states"][key]):
+        return any(range_overlaps(bounds, state, state) for state in stats["validation_states"][key])
+
+    return True
+
+# Function to check if records with a filter value can be in a minute folder with the statistics
+def filter_item_may_match(stats, filter_item):
+    key, value = filter_item.get('key'), filter_item.get('value')
+
+    if filter_item.get('operator') in RANGE_OPERATORS:
+        return range_may_match(stats, key, get_range_bounds(filter_item['operator'], value))
+
+    # prefix operators match several prefixes
+    if filter_item.get('operator') is not None:
+        return True
+
+    if key == 'aspath' and isinstance(value, str):
+        return all(bloom_filter_contains(stats["bloom_filters"]["asn"], asn) for asn in value.split())
+
+    if key == 'prefix' and isinstance(value, str):
+        return bloom_filter_contains(stats["bloom_filters"]["prefix"], value)
+
+    if key in ("sourceip", "sourceasn", "nexthopip") and isinstance(value, str):
+        return bloom_filter_contains(stats["bloom_filters"]["peer"], get_peer_value(key, value))
+
+    if key == 'timestamp' and stats["timestamps_complete"] and stats["rows"] > 0:
+        number = get_integer_value(value)
+        return number is None or stats["min_timestamp"] <= number <= stats["max_timestamp"]
+
+    if key in VALIDATION_KEYS:
+        states = stats["validation_states"][key]
+        number = get_integer_value(value)
+        # states that aren't integers could be compared differently
+        if number is None or not all(isinstance(state, int) and not isinstance(state, bool) for state in states):
+            return True
+        return number in states
+
+    return True
+
+# Function to check if records of a minute folder can match all filters, True if it has no up-to-date statistics
+def partition_may_match(folder_path, filter_values):
+    stats = load_partition_stats(folder_path)
+    if stats is None:
+        return True
+
+    return stats["rows"] > 0 and all(filter_item_may_match(stats, filter_item) for filter_item in filter_values)
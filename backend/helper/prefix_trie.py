@@ -0,0 +1,158 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides the prefix operators of the table filter and the radix trie of the prefixes of a day folder,
+which is written with the inverted indexes (see inverted_index.py). The trie contains each distinct prefix
+(address masked to its length) of the day folder and is stored in preorder: sorted by family, address and length,
+with the parent of each prefix (its longest covering prefix in the day folder) and the row ids of its records.
+It includes the following key functionalities:
+
+1. Prefix operators ('operator' of a 'prefix' filter, the value is a prefix like 10.0.0.0/8 or an address):
+   - covered_by: records with a prefix that is covered by the value (the prefix itself and its more-specifics).
+   - covers: records with a prefix that covers the value (the prefix itself and its less-specifics).
+   - lpm: records with the longest prefix that covers the value (longest prefix match).
+
+2. build_trie_parents Function:
+   - Finds the parent of each prefix of the trie while the index is built.
+
+3. find_covered_rows and find_covering_rows Functions:
+   - Return the sorted row ids of the records of the prefixes in the subtree of a prefix (a consecutive range of
+     the trie) or on the path from the root to a prefix.
+'''
+
+import ipaddress
+import numpy as np
+
+PREFIX_OPERATORS = ("covered_by", "covers", "lpm")
+
+UINT64_MASK = 2**64 - 1
+
+# Function to get the number of bits of an address of the family 4 or 6
+def get_address_width(family):
+    return 32 if family == 4 else 128
+
+# Function to parse a prefix (10.0.0.0/8) or an address (10.1.2.3) into (family, masked address, length), None if it is invalid
+def parse_network(value):
+    try:
+        network = ipaddress.ip_network(value.strip(), strict=False)
+    except (ValueError, TypeError, AttributeError):
+        return None
+    return network.version, int(network.network_address), network.prefixlen
+
+# Function to mask an address (integer) to its first length bits
+def mask_address(family, address, length):
+    host_bits = max(get_address_width(family) - length, 0)
+    return address >> host_bits << host_bits
+
+# Function to get the network (family, masked address, length) of a record prefix, None if the prefix is invalid
+def get_record_network(prefix, length):
+    try:
+        address = ipaddress.ip_address(prefix)
+    except (ValueError, TypeError):
+        return None
+    return address.version, mask_address(address.version, int(address), length), length
+
+# Function to check if the network outer covers the network inner (both (family, masked address, length))
+def network_covers(outer, inner):
+    return outer[0] == inner[0] and outer[2] <= inner[2] and mask_address(inner[0], inner[1], outer[2]) == outer[1]
+
+# Function to check if a record prefix matches a prefix operator, used by the Spark filter backend
+def record_matches_prefix_operator(operator, network, prefix, length):
+    record_network = get_record_network(prefix, length) if length is not None else None
+    if network is None or record_network is None:
+        return False
+
+    if operator == "covered_by":
+        return network_covers(network, record_network)
+    # lpm: the longest of the covering prefixes is selected afterwards
+    return network_covers(record_network, network)
+
+# Function to mask the prefix columns (upper and lower 64 bit) of records to their length
+def mask_prefix_columns(family, prefix_hi, prefix_lo, length):
+    width = np.where(family == 4, 32, 128).astype(np.int64)
+    host_bits = np.clip(width - length.astype(np.int64), 0, 128)
+
+    # host bits in the lower and the upper 64 bit, a shift by 64 bits is not defined for uint64
+    lo_host_bits = np.minimum(host_bits, 64).astype(np.uint64)
+    hi_host_bits = np.clip(host_bits - 64, 0, 64).astype(np.uint64)
+    all_ones = np.uint64(UINT64_MASK)
+
+    lo_mask = np.where(lo_host_bits == 64, np.uint64(0), all_ones << np.minimum(lo_host_bits, np.uint64(63)))
+    hi_mask = np.where(hi_host_bits == 64, np.uint64(0), all_ones << np.minimum(hi_host_bits, np.uint64(63)))
+    return prefix_hi & hi_mask, prefix_lo & lo_mask
+
+# Function to find the parent of each prefix of the trie, the keys (family, upper 64 bit, lower 64 bit, length) are in preorder
+def build_trie_parents(keys):
+    families, his, los, lengths = [key.tolist() for key in keys]
+    parents = np.full(len(families), -1, dtype=np.int64)
+    path = []
+
+    for i in range(len(families)):
+        network = (families[i], (his[i] << 64) | los[i], lengths[i])
+
+        # the prefixes on the path from the root that don't cover this prefix are in another subtree
+        while path and not network_covers(path[-1][1], network):
+            path.pop()
+
+        if path:
+            parents[i] = path[-1][0]
+        path.append((i, network))
+
+    return parents
+
+# Function to get the key of a prefix of the trie
+def get_trie_key(trie, position):
+    return tuple(int(key[position]) for key in trie["keys"])
+
+# Function to get the number of prefixes of the trie with a key smaller than key
+def find_trie_position(trie, key):
+    start, end = 0, len(trie["offsets"]) - 1
+    while start < end:
+        middle = (start + end) // 2
+        if get_trie_key(trie, middle) < key:
+            start = middle + 1
+        else:
+            end = middle
+    return start
+
+# Function to get the network of a prefix of the trie
+def get_trie_network(trie, position):
+    family, prefix_hi, prefix_lo, length = get_trie_key(trie, position)
+    return family, (prefix_hi << 64) | prefix_lo, length
+
+# Function to get the sorted row ids of the records of the prefixes start to end (exclusive) of the trie
+def get_trie_rows(trie, start, end):
+    offsets = trie["offsets"]
+    return np.sort(np.asarray(trie["rows"][offsets[start]:offsets[end]]))
+
+# Function to find the sorted row ids of the records with a prefix covered by the network
+def find_covered_rows(trie, network):
+    family, address, length = network
+    last_address = address | ((1 << max(get_address_width(family) - length, 0)) - 1)
+
+    # the subtree of the network: from the network itself to the last prefix with an address in the network
+    start = find_trie_position(trie, (family, address >> 64, address & UINT64_MASK, length))
+    end = find_trie_position(trie, (family, last_address >> 64, last_address & UINT64_MASK, 256))
+    return get_trie_rows(trie, start, end)
+
+# Function to find the sorted row ids of the records with a prefix covering the network
+def find_covering_rows(trie, network):
+    family, address, length = network
+
+    # the prefixes covering the network are on the path from the root to the last prefix before it
+    position = find_trie_position(trie, (family, address >> 64, address & UINT64_MASK, length + 1)) - 1
+    while position >= 0 and not network_covers(get_trie_network(trie, position), network):
+        position = int(trie["parent"][position])
+
+    rows = []
+    while position >= 0:
+        rows.append(get_trie_rows(trie, position, position + 1))
+        position = int(trie["parent"][position])
+
+    return np.sort(np.concatenate(rows)) if rows else np.zeros(0, dtype=np.uint64)
@@ -0,0 +1,204 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides the graphData and pieData of any time range of a data source, independent of the fixed
+two hour, ten minute and minute folders. Each day folder has a second-counts.bin written by sort_raw_exabgp_data.py
+with the cumulative counters of the day: row s holds the number of records and of each ROA, ASPA_CAIDA and ASPA_AI
+state (TOP_DATA_FIELDS, see top_data.py) of the seconds before second s of the day, as signed 64 bit integers
+(86401 rows). It includes the following key functionalities:
+
+1. write_second_counts Function:
+   - Adds the counters of the records sorted per second of a day to the cumulative counters of the day folder.
+
+2. create_range_response_data Function:
+   - Returns the datasetSum, graphData and pieData of the time range start to end (exclusive) in buckets of a
+     number of seconds, in the format of response-data.json. The counters of a bucket are the difference of the
+     cumulative counters at its end and its start, so no record is read and the time of a bucket doesn't depend
+     on the number of its records. The files are memory-mapped, only the rows of the bucket limits are read.
+'''
+
+import os
+import mmap
+import threading
+from array import array
+from collections import OrderedDict
+from datetime import datetime, timezone
+from helper.hierarchy import create_empty_response_data, get_date_folder, get_time_label
+from helper.chart_data import SECONDS_PER_DAY, VALIDATION_STATES
+from helper.top_data import TOP_DATA_FIELDS, get_record_fields
+
+SECOND_COUNTS_FILE = 'second-counts.bin'
+
+# Number of counters in a row of second-counts.bin
+SECOND_COUNT_FIELDS = len(TOP_DATA_FIELDS)
+
+# Number of buckets a time range can be divided into
+RANGE_MAX_BUCKETS = 10000
+
+# Number of mapped second-counts.bin files that are kept open
+MAPPED_SECOND_COUNTS_CACHE_SIZE = 32
+
+# Mapped second-counts.bin files, ordered from least to most recently used (file path -> (modification time, size, counters))
+MAPPED_SECOND_COUNTS = OrderedDict()
+
+# protects the mapped files, the Flask app handles requests in several threads
+MAPPED_SECOND_COUNTS_LOCK = threading.Lock()
+
+# Function to convert a time of a range (unix time or ISO 8601, UTC if it has no time zone) into unix time, None if it isn't a time
+def parse_range_time(value):
+    if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        return int(value)
+    try:
+        time_utc = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
+    if time_utc.tzinfo is None:
+        time_utc = time_utc.replace(tzinfo=timezone.utc)
+    return int(time_utc.timestamp())
+
+# Function to count a record for its second of the day (second counts: second of the day -> counters)
+def add_record_second(second_counts, record):
+    second = record["timestamp"] % SECONDS_PER_DAY
+    counter = second_counts.get(second)
+    if counter is None:
+        counter = second_counts[second] = [0] * SECOND_COUNT_FIELDS
+    for field in get_record_fields(record):
+        counter[field] += 1
+
+# Function to add the second counts of source to those of target
+def add_second_counts(target, source):
+    for second, source_counter in source.items():
+        counter = target.get(second)
+        if counter is None:
+            target[second] = list(source_counter)
+        else:
+            for field, count in enumerate(source_counter):
+                counter[field] += count
+
+# Function to add second counts to the cumulative counters of a day folder
+def write_second_counts(day_folder_path, second_counts):
+    file_path = os.path.join(day_folder_path, SECOND_COUNTS_FILE)
+    size = (SECONDS_PER_DAY + 1) * SECOND_COUNT_FIELDS
+
+    cumulative = array('q')
+    try:
+        with open(file_path, 'rb') as f:
+            cumulative.fromfile(f, size)
+    except (FileNotFoundError, EOFError):
+        cumulative = array('q', bytes(size * cumulative.itemsize))
+
+    # the counters of a second are added to the rows of all following seconds
+    running = [0] * SECOND_COUNT_FIELDS
+    for second in range(min(second_counts, default=SECONDS_PER_DAY), SECONDS_PER_DAY):
+        counter = second_counts.get(second)
+        if counter is not None:
+            running = [total + count for total, count in zip(running, counter)]
+        row = (second + 1) * SECOND_COUNT_FIELDS
+        for field, total in enumerate(running):
+            cumulative[row + field] += total
+
+    temp_path = f'{file_path}.tmp-{os.getpid()}'
+    os.makedirs(day_folder_path, exist_ok=True)
+    with open(temp_path, 'wb') as f:
+        cumulative.tofile(f)
+    os.replace(temp_path, file_path)
+
+# Function to map the cumulative counters of a day folder, None if it has no second-counts.bin
+def load_second_counts(day_folder_path):
+    file_path = os.path.join(day_folder_path, SECOND_COUNTS_FILE)
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+
+    with MAPPED_SECOND_COUNTS_LOCK:
+        mapped = MAPPED_SECOND_COUNTS.get(file_path)
+        if mapped is not None and mapped[:2] == (stat.st_mtime_ns, stat.st_size):
+            MAPPED_SECOND_COUNTS.move_to_end(file_path)
+            return mapped[2]
+
+        try:
+            with open(file_path, 'rb') as f:
+                counters = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)).cast('q')
+        except (FileNotFoundError, ValueError):
+            return None
+        if len(counters) != (SECONDS_PER_DAY + 1) * SECOND_COUNT_FIELDS:
+            return None
+
+        MAPPED_SECOND_COUNTS[file_path] = (stat.st_mtime_ns, stat.st_size, counters)
+        while len(MAPPED_SECOND_COUNTS) > MAPPED_SECOND_COUNTS_CACHE_SIZE:
+            MAPPED_SECOND_COUNTS.popitem(last=False)
+        return counters
+
+# Function to get the day folder of a day (number of days since 1970-01-01)
+def get_day_folder_path(root_folder_path, day):
+    time_utc = datetime.fromtimestamp(day * SECONDS_PER_DAY, timezone.utc)
+    return os.path.join(root_folder_path, get_date_folder(time_utc.year, time_utc.month, time_utc.day)[0])
+
+# Function to get the cumulative counters of a day at a second of the day, zeros for days without records
+# and None if the day folder has no second-counts.bin (sorted by an older version of the sort script)
+def get_day_counts(root_folder_path, day, second, loaded_days):
+    if day not in loaded_days:
+        day_folder_path = get_day_folder_path(root_folder_path, day)
+        loaded_days[day] = load_second_counts(day_folder_path) if os.path.isdir(day_folder_path) else False
+
+    counters = loaded_days[day]
+    if counters is None:
+        return None
+    if counters is False:
+        return [0] * SECOND_COUNT_FIELDS
+    return list(counters[second * SECOND_COUNT_FIELDS:(second + 1) * SECOND_COUNT_FIELDS])
+
+# Function to get the cumulative counters at the limits of the buckets (ascending times), counted from the first day of the limits
+def get_cumulative_counts(root_folder_path, limits):
+    loaded_days = {}
+    offset = [0] * SECOND_COUNT_FIELDS
+    current_day = limits[0] // SECONDS_PER_DAY
+    cumulative_counts = []
+
+    for limit in limits:
+        # the counters of the days before the day of the limit are added up
+        while current_day < limit // SECONDS_PER_DAY:
+            day_counts = get_day_counts(root_folder_path, current_day, SECONDS_PER_DAY, loaded_days)
+            if day_counts is None:
+                return None
+            offset = [total + count for total, count in zip(offset, day_counts)]
+            current_day += 1
+
+        day_counts = get_day_counts(root_folder_path, current_day, limit % SECONDS_PER_DAY, loaded_days)
+        if day_counts is None:
+            return None
+        cumulative_counts.append([total + count for total, count in zip(offset, day_counts)])
+
+    return cumulative_counts
+
+# Function to create the response-data.json dataset of a time range (start to end exclusive, unix time) in buckets of width seconds,
+# None if a day folder of the range has no second-counts.bin
+def create_range_response_data(root_folder_path, start, end, width):
+    limits = list(range(start, end, width)) + [end]
+    cumulative_counts = get_cumulative_counts(root_folder_path, limits)
+    if cumulative_counts is None:
+        return None
+
+    response_data = create_empty_response_data([])
+    for bucket_start, first, last in zip(limits, cumulative_counts, cumulative_counts[1:]):
+        counts = [high - low for low, high in zip(first, last)]
+        dataset = create_empty_response_data([])["pieData"]
+        dataset["label"] = get_time_label(datetime.fromtimestamp(bucket_start, timezone.utc))
+
+        for validation in VALIDATION_STATES:
+            for state in ("invalid", "valid", "unknown"):
+                count = counts[TOP_DATA_FIELDS.index(f"{validation}.{state}")]
+                dataset[validation][state] = count
+                response_data["pieData"][validation][state] += count
+
+        response_data["datasetSum"] += counts[0]
+        response_data["graphData"].append(dataset)
+
+    return response_data
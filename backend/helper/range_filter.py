@@ -0,0 +1,85 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides the comparison and range operators of the filters on the numeric keys of the records
+(length, roa1, aspa1, aspa2, numberpeers and timestamp). A filter item with an operator has the form
+{"key": "numberpeers", "operator": "ge", "value": 10}. It includes the following key functionalities:
+
+1. RANGE_OPERATORS:
+   - gt (greater than), ge (greater than or equal), lt (less than), le (less than or equal) and between
+     (value is a list [low, high], both included).
+
+2. get_range_bounds Function:
+   - Converts the operator and value of a filter into the smallest and largest matching integer (None for an open
+     end), so both filter backends compare the integer columns with the same bounds. Values can be numbers or
+     strings of numbers.
+
+3. range_overlaps Function:
+   - Checks if the range of a filter overlaps the smallest and largest value of a minute folder (see partition_stats.py).
+
+The local filter answers the operators on length, numberpeers and timestamp by binary searches in the sorted value
+indexes of the day folders (see inverted_index.py).
+'''
+
+import re
+import math
+
+RANGE_OPERATORS = ("gt", "ge", "lt", "le", "between")
+
+# Keys of the records with integer values that can be filtered by the range operators
+RANGE_KEYS = ("length", "roa1", "aspa1", "aspa2", "numberpeers", "timestamp")
+
+NUMBER_PATTERN = re.compile(r'^[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?$')
+
+# Function to convert a value of a range filter into a number, None if it isn't a number
+def parse_range_value(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        if not NUMBER_PATTERN.match(value):
+            return None
+        value = int(value) if value.lstrip('+-').isdigit() else float(value)
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value if isinstance(value, (int, float)) else None
+
+# Function to get the smallest and largest integer matching a range operator (None for an open end), None if the value is invalid
+def get_range_bounds(operator, value):
+    if operator == "between":
+        if not isinstance(value, (list, tuple)) or len(value) != 2:
+            return None
+        low, high = parse_range_value(value[0]), parse_range_value(value[1])
+        if low is None or high is None:
+            return None
+        return math.ceil(low), math.floor(high)
+
+    number = parse_range_value(value)
+    if number is None:
+        return None
+
+    if operator == "gt":
+        return math.floor(number) + 1, None
+    if operator == "ge":
+        return math.ceil(number), None
+    if operator == "lt":
+        return None, math.ceil(number) - 1
+    if operator == "le":
+        return None, math.floor(number)
+    return None
+
+# Function to limit range bounds to the smallest and largest value of a column, None if no value of the column is in the range
+def clip_range_bounds(bounds, minimum, maximum):
+    low = minimum if bounds[0] is None else max(bounds[0], minimum)
+    high = maximum if bounds[1] is None else min(bounds[1], maximum)
+    return (low, high) if low <= high else None
+
+# Function to check if a range overlaps the values from minimum to maximum
+def range_overlaps(bounds, minimum, maximum):
+    return clip_range_bounds(bounds, minimum, maximum) is not None
@@ -0,0 +1,76 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script prepares the JSON responses of app.py for the transfer to the frontend. It includes the following
+key functionalities:
+
+1. make_conditional_response Function:
+   - Adds an ETag to the responses of GET requests (the hash of the body, if the route hasn't set one) and answers
+     requests whose If-None-Match has the ETag with 304 Not Modified and without a body, so unchanged graphData and
+     pieData are not transferred again.
+
+2. compress_response Function:
+   - Compresses JSON responses of at least COMPRESS_MIN_BYTES bytes (environment variable, default: 1024) with
+     brotli or gzip, whichever the client prefers in its Accept-Encoding. brotli is only used if the brotli package
+     is installed. Streamed responses and files are not compressed.
+'''
+
+import os
+import gzip
+
+try:
+    import brotli
+except ImportError:
+    # The brotli package is not installed, responses are compressed with gzip
+    brotli = None
+
+COMPRESS_MIN_BYTES = int(os.environ.get('COMPRESS_MIN_BYTES', 1024))
+COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+
+# Function to get the content encodings the responses can be compressed with, in the order they are preferred
+def get_supported_encodings():
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+# Function to compress the body of a response with a content encoding
+def compress_body(body, encoding):
+    if encoding == "br":
+        # brotli quality 0 to 11, the gzip levels 1 to 9 are mapped onto the faster qualities
+        return brotli.compress(body, quality=min(COMPRESS_LEVEL, 11))
+    return gzip.compress(body, compresslevel=COMPRESS_LEVEL)
+
+# Function to add an ETag to the response of a GET request and turn it into a 304 response if the client has its body
+def make_conditional_response(request, response):
+    if request.method != 'GET' or response.status_code != 200 or not response.is_json:
+        return response
+
+    if response.get_etag()[0] is None:
+        response.add_etag()
+    return response.make_conditional(request)
+
+# Function to compress a JSON response with the content encoding preferred by the client
+def compress_response(request, response):
+    if response.status_code != 200 or not response.is_json or response.direct_passthrough or response.is_streamed:
+        return response
+    if 'Content-Encoding' in response.headers:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = request.accept_encodings.best_match(get_supported_encodings())
+    body = response.get_data()
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return response
+
+    response.set_data(compress_body(body, encoding))
+    response.headers['Content-Encoding'] = encoding
+
+    # the compressed body isn't byte-identical to the uncompressed one with the same ETag
+    etag, weak = response.get_etag()
+    if etag is not None and not weak:
+        response.set_etag(etag, weak=True)
+    return response
@@ -0,0 +1,286 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides the cache of the filtered data shared by all sessions. A cache entry is a folder in
+'./database/filtered_data/cache' with the filtered data of a data source, identified by the data source, the
+filters (in a canonical order) and the version of the data source (modification time of its response-data.json),
+so identical filters of several sessions are only evaluated once. It includes the following key functionalities:
+
+1. find_cached_result and store_cached_result Functions:
+   - Find the cache entry of filters or add the filtered data written into a temporary folder as a new entry.
+   - The entries are evicted in least recently used order when their size exceeds FILTER_CACHE_MAX_BYTES
+     (environment variable, default: 1 GB).
+   - Files added to an entry later (sort permutations, see sort_permutation.py) are counted by update_entry_size.
+   - pin_cached_result keeps an entry in the cache while it is read in several steps (exports and cursor pages)
+     until unpin_cached_result is called.
+
+2. Session references:
+   - A session references the cache entry of its current filters (in './database/filtered_data/sessions'), so it
+     can be filtered again with additional filters. References unused for FILTER_CACHE_SESSION_TTL seconds
+     (environment variable, default: 3600) are removed, as are entries unused for this time that no session references.
+
+3. get_cache_statistics Function:
+   - Returns the hits, misses and evictions of the cache and the number and size of its entries.
+'''
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import threading
+
+FILTERED_DATA_PATH = './database/filtered_data'
+RESULT_CACHE_PATH = os.path.join(FILTERED_DATA_PATH, 'cache')
+SESSION_REFERENCE_PATH = os.path.join(FILTERED_DATA_PATH, 'sessions')
+
+ENTRY_META_FILE = 'meta.json'
+
+FILTER_CACHE_MAX_BYTES = int(os.environ.get('FILTER_CACHE_MAX_BYTES', 1024**3))
+FILTER_CACHE_SESSION_TTL = int(os.environ.get('FILTER_CACHE_SESSION_TTL', 3600))
+
+CACHE_STATISTICS = {"hits": 0, "misses": 0, "evictions": 0}
+
+# number of reads in progress of each pinned entry (key), pinned entries are not evicted
+PINNED_ENTRIES = {}
+
+# protects the entries, session references and statistics, the Flask app handles requests in several threads
+CACHE_LOCK = threading.Lock()
+
+# Function to get the version of a data source, its response-data.json is rewritten when records are added
+def get_data_source_version(data_source_path):
+    try:
+        return os.stat(os.path.join(data_source_path, 'response-data.json')).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+# Function to get the filters in a canonical form: without duplicates, sorted and with the operator only if it is set
+def get_canonical_filters(filter_values):
+    filters = {}
+    for filter_item in filter_values:
+        canonical_item = {"key": filter_item.get('key'), "value": filter_item.get('value')}
+        if filter_item.get('operator') is not None:
+            canonical_item["operator"] = filter_item['operator']
+        filters[json.dumps(canonical_item, sort_keys=True)] = canonical_item
+    return [filters[item] for item in sorted(filters)]
+
+# Function to get the key of the cache entry of filters on a data source
+def get_cache_key(data_source, filter_values, version):
+    key = json.dumps([os.path.normpath(data_source), get_canonical_filters(filter_values), version], sort_keys=True)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+# Function to get the path of a cache entry
+def get_entry_path(key):
+    return os.path.join(RESULT_CACHE_PATH, key)
+
+# Function to get the file with the filtered data in a folder (written by Spark or the local filter), None if there is none
+def get_filtered_data_file(folder_path):
+    try:
+        file_names = sorted(f for f in os.listdir(folder_path) if f.startswith('part-') and f.endswith('.json'))
+    except FileNotFoundError:
+        return None
+    return os.path.join(folder_path, file_names[0]) if file_names else None
+
+# Function to read the meta data of a cache entry, None if the entry doesn't exist
+def read_entry_meta(key):
+    try:
+        with open(os.path.join(get_entry_path(key), ENTRY_META_FILE), 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+# Function to mark a cache entry as used, the modification time of its meta data is the time of its last use
+def touch_entry(key):
+    try:
+        os.utime(os.path.join(get_entry_path(key), ENTRY_META_FILE))
+    except FileNotFoundError:
+        pass
+
+# Function to get the size of the files in a folder in bytes
+def get_folder_size(folder_path):
+    return sum(os.path.getsize(os.path.join(folder_path, f)) for f in os.listdir(folder_path))
+
+# Function to find the cache entry of filters, returns (entry path, number of filtered rows) or None
+def find_cached_result(data_source, data_source_path, filter_values):
+    key = get_cache_key(data_source, filter_values, get_data_source_version(data_source_path))
+
+    with CACHE_LOCK:
+        meta = read_entry_meta(key)
+        if meta is None:
+            CACHE_STATISTICS["misses"] += 1
+            return None
+
+        CACHE_STATISTICS["hits"] += 1
+        touch_entry(key)
+
+    return get_entry_path(key), meta["rows"]
+
+# Function to get a temporary folder for the filtered data of a new cache entry
+def get_temp_entry_path():
+    os.makedirs(RESULT_CACHE_PATH, exist_ok=True)
+    return os.path.join(RESULT_CACHE_PATH, f'tmp-{os.getpid()}-{threading.get_ident()}-{time.time_ns()}')
+
+# Function to add the filtered data in a temporary folder as cache entry, returns the path of the entry
+def store_cached_result(data_source, data_source_path, filter_values, version, temp_path, rows):
+    key = get_cache_key(data_source, filter_values, version)
+    entry_path = get_entry_path(key)
+
+    with open(os.path.join(temp_path, ENTRY_META_FILE), 'w') as f:
+        f.write(json.dumps({
+            "data_source": data_source,
+            "filters": get_canonical_filters(filter_values),
+            "version": version,
+            "rows": rows,
+            "size": get_folder_size(temp_path)
+        }))
+
+    with CACHE_LOCK:
+        try:
+            os.replace(temp_path, entry_path)
+        except OSError:
+            # the same filters have been evaluated by another request at the same time
+            shutil.rmtree(temp_path, ignore_errors=True)
+
+        evict_cached_results(keep=key)
+
+    return entry_path
+
+# Function to update the size of a cache entry after files were added to it (e.g. sort permutations)
+def update_entry_size(entry_path):
+    key = os.path.basename(entry_path)
+    meta_path = os.path.join(entry_path, ENTRY_META_FILE)
+
+    with CACHE_LOCK:
+        meta = read_entry_meta(key)
+        if meta is None:
+            return
+
+        try:
+            meta["size"] = get_folder_size(entry_path)
+        except FileNotFoundError:
+            # a temporary file of another request has been moved in the meantime, the next update counts it
+            return
+        temp_path = f'{meta_path}.tmp-{os.getpid()}-{threading.get_ident()}'
+        with open(temp_path, 'w') as f:
+            f.write(json.dumps(meta))
+        os.replace(temp_path, meta_path)
+
+        evict_cached_results(keep=key)
+
+# Function to get the cache entries (key -> meta data with the time of their last use), oldest first
+def get_cache_entries():
+    entries = {}
+    try:
+        keys = os.listdir(RESULT_CACHE_PATH)
+    except FileNotFoundError:
+        return entries
+
+    for key in keys:
+        try:
+            meta_path = os.path.join(get_entry_path(key), ENTRY_META_FILE)
+            with open(meta_path, 'r') as f:
+                meta = json.load(f)
+            meta["last_used"] = os.stat(meta_path).st_mtime
+            entries[key] = meta
+        except (FileNotFoundError, NotADirectoryError, ValueError):
+            continue
+
+    return dict(sorted(entries.items(), key=lambda entry: entry[1]["last_used"]))
+
+# Function to get the keys of the cache entries referenced by a session used within the TTL, older references are removed
+def get_session_references():
+    references = set()
+    try:
+        session_ids = os.listdir(SESSION_REFERENCE_PATH)
+    except FileNotFoundError:
+        return references
+
+    for session_id in session_ids:
+        reference_path = os.path.join(SESSION_REFERENCE_PATH, session_id)
+        try:
+            if time.time() - os.stat(reference_path).st_mtime > FILTER_CACHE_SESSION_TTL:
+                os.remove(reference_path)
+                continue
+            with open(reference_path, 'r') as f:
+                references.add(f.read().strip())
+        except FileNotFoundError:
+            continue
+
+    return references
+
+# Function to remove the entries unused for the TTL without session reference and the least recently used entries above the size limit
+def evict_cached_results(keep=None):
+    entries = get_cache_entries()
+    references = get_session_references()
+    now = time.time()
+    size = sum(meta["size"] for meta in entries.values())
+
+    for key, meta in entries.items():
+        expired = now - meta["last_used"] > FILTER_CACHE_SESSION_TTL and key not in references
+        if key != keep and key not in PINNED_ENTRIES and (expired or size > FILTER_CACHE_MAX_BYTES):
+            shutil.rmtree(get_entry_path(key), ignore_errors=True)
+            size -= meta["size"]
+            CACHE_STATISTICS["evictions"] += 1
+
+    # temporary folders of aborted filters and per-session folders of earlier versions of the app
+    for folder_path in [os.path.join(RESULT_CACHE_PATH, f) for f in os.listdir(RESULT_CACHE_PATH) if f.startswith('tmp-')] + \
+                       [os.path.join(FILTERED_DATA_PATH, f) for f in os.listdir(FILTERED_DATA_PATH) if f not in ('cache', 'sessions')]:
+        if os.path.isdir(folder_path) and now - os.stat(folder_path).st_mtime > FILTER_CACHE_SESSION_TTL:
+            shutil.rmtree(folder_path, ignore_errors=True)
+
+# Function to keep a cache entry in the cache until it is unpinned, returns False if it has already been evicted
+def pin_cached_result(entry_path):
+    key = os.path.basename(entry_path)
+    with CACHE_LOCK:
+        if read_entry_meta(key) is None:
+            return False
+        PINNED_ENTRIES[key] = PINNED_ENTRIES.get(key, 0) + 1
+    return True
+
+# Function to unpin a cache entry, it can be evicted again when no other read has pinned it
+def unpin_cached_result(entry_path):
+    key = os.path.basename(entry_path)
+    with CACHE_LOCK:
+        PINNED_ENTRIES[key] -= 1
+        if PINNED_ENTRIES[key] == 0:
+            del PINNED_ENTRIES[key]
+
+# Function to let a session reference a cache entry
+def set_session_result(session_id, entry_path):
+    os.makedirs(SESSION_REFERENCE_PATH, exist_ok=True)
+    reference_path = os.path.join(SESSION_REFERENCE_PATH, session_id)
+    temp_path = f'{reference_path}.tmp-{os.getpid()}-{threading.get_ident()}'
+
+    with open(temp_path, 'w') as f:
+        f.write(os.path.basename(entry_path))
+    os.replace(temp_path, reference_path)
+
+# Function to get the cache entry referenced by a session, returns (entry path, meta data of the entry) or None
+def get_session_result(session_id):
+    try:
+        with open(os.path.join(SESSION_REFERENCE_PATH, session_id), 'r') as f:
+            key = f.read().strip()
+    except FileNotFoundError:
+        return None
+
+    meta = read_entry_meta(key)
+    return (get_entry_path(key), meta) if meta is not None else None
+
+# Function to remove the reference of a session, the entry stays in the cache for other sessions
+def release_session_result(session_id):
+    try:
+        os.remove(os.path.join(SESSION_REFERENCE_PATH, session_id))
+    except FileNotFoundError:
+        pass
+
+# Function to get the statistics of the cache
+def get_cache_statistics():
+    with CACHE_LOCK:
+        entries = get_cache_entries()
+        return dict(CACHE_STATISTICS, entries=len(entries), bytes=sum(meta["size"] for meta in entries.values()), max_bytes=FILTER_CACHE_MAX_BYTES)
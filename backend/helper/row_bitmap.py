@@ -0,0 +1,242 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides the row bitmaps of the local filter backend. The records of a data source are numbered over
+its minute folders in time order, the filtered data is a bitmap with one bit per record (packed with NumPy and
+stored compressed as bitmap.npz in an entry of the filtered data cache, see result_cache.py). It includes the
+following key functionalities:
+
+1. write_term_bitmaps and combine_bitmaps Functions:
+   - Write the bitmap of each filter (term) separately, so filters with the same terms reuse them. The bitmap of
+     several filters is the AND of the bitmaps of their terms, so adding or removing a filter doesn't read any record.
+
+2. get_row_space Function:
+   - Numbers the records of a data source over its minute folders. The row space is kept in memory
+     (ROW_SPACE_CACHE_SIZE data sources) until the response-data.json of the data source changes.
+
+3. read_bitmap_rows Function:
+   - Reads the rows of a page directly from the minute folders of the set bits, without writing the filtered data.
+'''
+
+import os
+import json
+import threading
+from collections import OrderedDict
+import numpy as np
+from helper.partition_stats import load_partition_stats
+from helper.hierarchy import get_response_data_version
+from helper.pagination import read_data_rows
+
+BITMAP_FILE = 'bitmap.npz'
+
+# Number of set bits of each byte
+BYTE_BIT_COUNTS = np.array([bin(value).count('1') for value in range(256)], dtype=np.int64)
+
+# Number of loaded bitmaps that are kept in memory
+LOADED_BITMAP_CACHE_SIZE = 16
+
+# Loaded bitmaps, ordered from least to most recently used (bitmap path -> bitmap)
+LOADED_BITMAPS = OrderedDict()
+
+# protects the loaded bitmaps, the Flask app and the filter jobs use them in several threads
+LOADED_BITMAPS_LOCK = threading.Lock()
+
+# Number of row spaces of data sources that are kept in memory
+ROW_SPACE_CACHE_SIZE = 16
+
+# Row spaces of the data sources, ordered from least to most recently used
+# (data source path -> (modification time and size of its response-data.json, row space))
+ROW_SPACES = OrderedDict()
+
+# The row spaces are shared by the threads of the server
+ROW_SPACES_LOCK = threading.Lock()
+
+# Function to get the number of records of a minute folder
+def get_partition_row_count(folder_path):
+    stats = load_partition_stats(folder_path)
+    if stats is not None:
+        return stats["rows"]
+
+    with open(os.path.join(folder_path, 'datasets.json'), 'rb') as f:
+        return sum(1 for line in f if line.strip())
+
+# Function to list the minute folders below a data source folder in time order and the number of the first record of each of them
+def read_row_space(data_source_path):
+    partitions = []
+    for folder_path, folder_names, file_names in os.walk(data_source_path):
+        folder_names.sort()
+        if 'datasets.json' in file_names:
+            partitions.append(os.path.normpath(folder_path))
+
+    offsets = np.zeros(len(partitions) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([get_partition_row_count(folder_path) for folder_path in partitions])
+
+    # the row space is shared by all filters of the data source and must not be changed
+    offsets.flags.writeable = False
+    return {"partitions": partitions, "offsets": offsets}
+
+# Function to get the row space of a data source folder, it is read again when its response-data.json has changed
+# (sort_raw_exabgp_data.py rewrites it whenever records are added)
+def get_row_space(data_source_path):
+    data_source_path = os.path.normpath(data_source_path)
+    version = get_response_data_version(os.path.join(data_source_path, 'response-data.json'))
+
+    with ROW_SPACES_LOCK:
+        cached = ROW_SPACES.get(data_source_path)
+        if cached is not None and cached[0] == version:
+            ROW_SPACES.move_to_end(data_source_path)
+            return cached[1]
+
+    # listing the minute folders reads the whole data source, so it is done outside of the lock
+    row_space = read_row_space(data_source_path)
+    if version is None:
+        return row_space
+
+    with ROW_SPACES_LOCK:
+        ROW_SPACES[data_source_path] = (version, row_space)
+        ROW_SPACES.move_to_end(data_source_path)
+        while len(ROW_SPACES) > ROW_SPACE_CACHE_SIZE:
+            ROW_SPACES.popitem(last=False)
+
+    return row_space
+
+# Function to create the bitmap of selected rows ((minute folder, rows) pairs) in a row space
+def create_bitmap(row_space, selections):
+    partition_numbers = {folder_path: number for number, folder_path in enumerate(row_space["partitions"])}
+    bits = np.zeros(int(row_space["offsets"][-1]), dtype=bool)
+
+    for folder_path, rows in selections:
+        bits[row_space["offsets"][partition_numbers[os.path.normpath(folder_path)]] + rows.astype(np.int64)] = True
+
+    return np.packbits(bits)
+
+# Function to get the (minute folder, rows) pairs of positions (sorted numbers of records) in a row space
+def get_position_selections(row_space, positions):
+    offsets = row_space["offsets"]
+    partition_numbers = np.searchsorted(offsets, positions, 'right') - 1
+    boundaries = np.flatnonzero(np.diff(partition_numbers)) + 1
+
+    selections = []
+    for part in np.split(np.arange(len(positions)), boundaries) if len(positions) else []:
+        number = int(partition_numbers[part[0]])
+        selections.append((row_space["partitions"][number], (positions[part] - offsets[number]).astype(np.uint32)))
+    return selections
+
+# Function to get the positions of all set bits of a bitmap in a row space
+def get_set_positions(row_space, bitmap):
+    return np.flatnonzero(np.unpackbits(bitmap, count=int(row_space["offsets"][-1])))
+
+# Function to get the (minute folder, rows) pairs of all set bits of a bitmap
+def get_bitmap_selections(row_space, bitmap):
+    return get_position_selections(row_space, get_set_positions(row_space, bitmap))
+
+# Function to create the bitmap of all records of a row space
+def create_full_bitmap(row_space):
+    return np.packbits(np.ones(int(row_space["offsets"][-1]), dtype=bool))
+
+# Function to get the number of set bits of a bitmap
+def count_bitmap_rows(bitmap):
+    return int(BYTE_BIT_COUNTS[bitmap].sum())
+
+# Function to write a bitmap into a (cache entry) folder
+def write_bitmap(folder_path, row_space, bitmap):
+    os.makedirs(folder_path, exist_ok=True)
+    np.savez_compressed(os.path.join(folder_path, BITMAP_FILE), bitmap=bitmap, offsets=row_space["offsets"],
+                        partitions=np.array(json.dumps(row_space["partitions"])))
+
+# Function to load the bitmap of a (cache entry) folder, returns (row space, bitmap, cumulative number of set bits per byte) or None
+def load_bitmap(folder_path):
+    bitmap_path = os.path.join(folder_path, BITMAP_FILE)
+
+    with LOADED_BITMAPS_LOCK:
+        loaded = LOADED_BITMAPS.get(bitmap_path)
+        if loaded is not None:
+            LOADED_BITMAPS.move_to_end(bitmap_path)
+            return loaded
+
+    # reading and decompressing the bitmap is done outside of the lock
+    try:
+        with np.load(bitmap_path) as data:
+            row_space = {"partitions": json.loads(str(data["partitions"])), "offsets": data["offsets"]}
+            bitmap = data["bitmap"]
+    except FileNotFoundError:
+        return None
+
+    loaded = (row_space, bitmap, np.cumsum(BYTE_BIT_COUNTS[bitmap]))
+    with LOADED_BITMAPS_LOCK:
+        LOADED_BITMAPS[bitmap_path] = loaded
+        while len(LOADED_BITMAPS) > LOADED_BITMAP_CACHE_SIZE:
+            LOADED_BITMAPS.popitem(last=False)
+
+    return loaded
+
+# Function to write the bitmap of each filter into a folder (folder_paths[i] for filter_values[i]), returns the number of their rows
+def write_term_bitmaps(row_space, term_selections, folder_paths):
+    num_rows = []
+    for selections, folder_path in zip(term_selections, folder_paths):
+        bitmap = create_bitmap(row_space, selections)
+        write_bitmap(folder_path, row_space, bitmap)
+        num_rows.append(count_bitmap_rows(bitmap))
+    return num_rows
+
+# Function to combine the bitmaps of the terms of filters by AND, returns (row space, bitmap) or None if they have different row spaces
+def combine_bitmaps(loaded_bitmaps):
+    row_space, bitmap, _ = loaded_bitmaps[0]
+
+    for other_row_space, other_bitmap, _ in loaded_bitmaps[1:]:
+        if other_row_space["partitions"] != row_space["partitions"] or not np.array_equal(other_row_space["offsets"], row_space["offsets"]):
+            return None
+        bitmap = bitmap & other_bitmap
+
+    return row_space, bitmap
+
+# Function to get the positions (numbers of the records) of the set bits start to end (exclusive, counted from 0) of a bitmap
+def get_bitmap_positions(bitmap, bit_counts, start, end):
+    end = min(end, int(bit_counts[-1]) if len(bit_counts) else 0)
+    if start >= end:
+        return np.zeros(0, dtype=np.int64)
+
+    # bytes with the first and the last set bit of the range
+    first_byte = int(np.searchsorted(bit_counts, start, 'right'))
+    last_byte = int(np.searchsorted(bit_counts, end, 'left'))
+    bits_before = int(bit_counts[first_byte - 1]) if first_byte > 0 else 0
+
+    positions = np.flatnonzero(np.unpackbits(bitmap[first_byte:last_byte + 1])) + first_byte * 8
+    return positions[start - bits_before:end - bits_before]
+
+# Function to get the positions of the set bits between the positions start and end (exclusive) of a bitmap
+def get_range_positions(bitmap, start, end):
+    if start >= end:
+        return np.zeros(0, dtype=np.int64)
+
+    first_byte = start // 8
+    positions = np.flatnonzero(np.unpackbits(bitmap[first_byte:(end + 7) // 8])) + first_byte * 8
+    return positions[(positions >= start) & (positions < end)]
+
+# Function to read the rows of a page of the filtered data of a (cache entry) folder with a bitmap,
+# None if the entry has been removed from the cache (see result_cache.py)
+def read_bitmap_rows(folder_path, page_number, page_size):
+    loaded_bitmap = load_bitmap(folder_path)
+    if loaded_bitmap is None:
+        return None
+
+    row_space, bitmap, bit_counts = loaded_bitmap
+    start_index = (int(page_number) - 1) * page_size
+    return read_position_rows(row_space, get_bitmap_positions(bitmap, bit_counts, start_index, start_index + page_size))
+
+# Function to read the rows at positions (sorted numbers of records) of a row space from their minute folders
+def read_position_rows(row_space, positions):
+    table_data = []
+    for partition_path, rows in get_position_selections(row_space, positions):
+        # consecutive rows of a minute folder are read at once
+        runs = np.split(rows, np.flatnonzero(np.diff(rows) != 1) + 1)
+        for run in runs:
+            table_data.extend(read_data_rows(os.path.join(partition_path, 'datasets.json'), int(run[0]), int(run[-1]) + 1))
+
+    return table_data
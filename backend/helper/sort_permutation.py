@@ -0,0 +1,173 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script sorts the table data on the server. The records of an entry of the filtered data cache (see
+result_cache.py) are sorted once per key, the sort permutation (the numbers of the records in sorted order) is
+stored in the entry as sort-<key>.npy, so the page of a sort order is a slice of the permutation. It includes the
+following key functionalities:
+
+1. create_sort_permutation Function:
+   - Sorts the records of a row bitmap (see row_bitmap.py) or of a filtered data file of the Spark backend by a key.
+   - Prefixes are sorted by IP version, address and length, the numeric keys by their value. Records with the same
+     value keep their order in time.
+   - The columns of the records are loaded from the binary column copies of the minute folders (see columnar.py)
+     if possible, otherwise they are read from the JSON records.
+
+2. read_sorted_rows Function:
+   - Reads a page of the records of a cache entry in ascending or descending order of a key, the permutation of
+     the key is created when it is first requested. In descending order records with the same value are in
+     reverse time order.
+   - Returns None if the entry has been removed from the cache in the meantime.
+'''
+
+import os
+import json
+import ipaddress
+import numpy as np
+from helper.columnar import UINT32_MAX
+from helper.local_filter import load_filter_columns
+from helper.pagination import read_data_rows
+from helper.result_cache import get_filtered_data_file, get_temp_entry_path, update_entry_size
+from helper import row_bitmap
+
+# Columns sorted for a key, the first column is compared first
+SORT_COLUMNS = {
+    "prefix": ("family", "prefix_hi", "prefix_lo", "length"),
+    "length": ("length",),
+    "roa1": ("roa1",),
+    "aspa1": ("aspa1",),
+    "aspa2": ("aspa2",),
+    "numberpeers": ("numberpeers",),
+    "timestamp": ("timestamp",)
+}
+
+# Function to get the path of the sort permutation of a key in a (cache entry) folder
+def get_sort_permutation_path(folder_path, sort_by):
+    return os.path.join(folder_path, f'sort-{sort_by}.npy')
+
+# Function to get the sort columns of records parsed from JSON, values that aren't integers are sorted first
+def get_record_sort_columns(records, sort_by):
+    values = {name: [] for name in SORT_COLUMNS[sort_by]}
+
+    for record in records:
+        if sort_by == "prefix":
+            try:
+                ip = ipaddress.ip_address(record.get("prefix"))
+                address = (ip.version, int(ip) >> 64, int(ip) & 0xFFFFFFFFFFFFFFFF)
+            except ValueError:
+                address = (0, 0, 0)
+            for name, value in zip(("family", "prefix_hi", "prefix_lo"), address):
+                values[name].append(value)
+
+        value = record.get(SORT_COLUMNS[sort_by][-1])
+        values[SORT_COLUMNS[sort_by][-1]].append(value if type(value) is int else -1)
+
+    return {name: np.array(column, dtype=np.uint64 if name.startswith("prefix_") else np.int64) for name, column in values.items()}
+
+# Function to get the sort columns of the records at positions (sorted numbers of records) of a row space
+def get_row_space_sort_columns(row_space, positions, sort_by):
+    names = SORT_COLUMNS[sort_by]
+    parts = {name: [] for name in names}
+
+    for folder_path, rows in row_bitmap.get_position_selections(row_space, positions):
+        columns = load_filter_columns(folder_path, names)
+        if columns is None:
+            # minute folders with records that can't be stored as columns
+            columns = get_record_sort_columns(read_data_rows(os.path.join(folder_path, 'datasets.json'), 0, int(rows[-1]) + 1), sort_by)
+
+        for name in names:
+            parts[name].append(np.asarray(columns[name])[rows])
+
+    return {name: np.concatenate(parts[name]) if parts[name] else np.zeros(0, dtype=np.int64) for name in names}
+
+# Function to create the sort permutation of a key for a (cache entry) folder, returns the numbers of its records in ascending order
+# or None if the entry has been removed from the cache
+def create_sort_permutation(folder_path, sort_by):
+    loaded_bitmap = row_bitmap.load_bitmap(folder_path)
+
+    if loaded_bitmap is not None:
+        row_space, bitmap, _ = loaded_bitmap
+        positions = row_bitmap.get_set_positions(row_space, bitmap)
+        columns = get_row_space_sort_columns(row_space, positions, sort_by)
+    else:
+        filtered_data_file = get_filtered_data_file(folder_path)
+        if filtered_data_file is None:
+            return None
+
+        # the records of a filtered data file are numbered by their line
+        with open(filtered_data_file, 'r') as f:
+            columns = get_record_sort_columns([json.loads(line) for line in f if line.strip()], sort_by)
+        positions = np.arange(len(columns[SORT_COLUMNS[sort_by][-1]]))
+
+    # np.lexsort sorts by the last key first and keeps the order of equal records
+    order = np.lexsort([columns[name] for name in reversed(SORT_COLUMNS[sort_by])])
+    return positions[order].astype(np.uint32 if len(positions) == 0 or positions[-1] <= UINT32_MAX else np.int64)
+
+# Function to load the sort permutation of a key of a (cache entry) folder, it is created and stored if it doesn't exist yet
+def load_sort_permutation(folder_path, sort_by):
+    permutation_path = get_sort_permutation_path(folder_path, sort_by)
+    try:
+        return np.load(permutation_path, mmap_mode='r')
+    except FileNotFoundError:
+        pass
+
+    permutation = create_sort_permutation(folder_path, sort_by)
+    if permutation is None:
+        return None
+
+    # the permutation is written next to the entry and moved into it, so other requests never read a partial file
+    temp_path = get_temp_entry_path() + '.npy'
+    np.save(temp_path, permutation)
+    try:
+        os.replace(temp_path, permutation_path)
+    except FileNotFoundError:
+        # the entry has been evicted in the meantime
+        os.remove(temp_path)
+        return permutation
+
+    update_entry_size(folder_path)
+    return permutation
+
+# Function to read the rows of a filtered data file at line numbers (sorted)
+def read_file_lines(file_path, lines):
+    table_data = []
+    # consecutive lines are read at once
+    for run in np.split(lines, np.flatnonzero(np.diff(lines) != 1) + 1) if len(lines) else []:
+        table_data.extend(read_data_rows(file_path, int(run[0]), int(run[-1]) + 1))
+    return table_data
+
+# Function to read a page of the records of a (cache entry) folder in the order of a key (sort_order asc or desc),
+# None if the entry has been removed from the cache
+def read_sorted_rows(folder_path, page_number, page_size, sort_by, sort_order):
+    permutation = load_sort_permutation(folder_path, sort_by)
+    if permutation is None:
+        return None
+    start_index = (int(page_number) - 1) * page_size
+
+    if sort_order == "desc":
+        end_index = max(len(permutation) - start_index, 0)
+        positions = np.asarray(permutation[max(end_index - page_size, 0):end_index])[::-1]
+    else:
+        positions = np.asarray(permutation[start_index:start_index + page_size])
+
+    # the rows are read in the order of their positions and put into the order of the page
+    order = np.argsort(positions, kind='stable')
+    loaded_bitmap = row_bitmap.load_bitmap(folder_path)
+    if loaded_bitmap is not None:
+        rows = row_bitmap.read_position_rows(loaded_bitmap[0], positions[order])
+    else:
+        filtered_data_file = get_filtered_data_file(folder_path)
+        if filtered_data_file is None:
+            return None
+        rows = read_file_lines(filtered_data_file, positions[order])
+
+    table_data = [None] * len(rows)
+    for index, row in zip(order.tolist(), rows):
+        table_data[index] = row
+    return table_data
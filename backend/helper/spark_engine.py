@@ -0,0 +1,175 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides the Spark session used by the filters (see filter.py). The session is started once with the
+Flask app and shared by all request threads instead of starting and stopping a session for every filter request.
+It includes the following key functionalities:
+
+1. start_spark_engine and get_spark_session Functions:
+   - Start the shared Spark session (if it isn't running yet) with the resources configured by environment variables:
+     SPARK_MASTER (default: local[*]), SPARK_DRIVER_MEMORY, SPARK_EXECUTOR_MEMORY, SPARK_EXECUTOR_CORES,
+     SPARK_EXECUTOR_INSTANCES and SPARK_SHUFFLE_PARTITIONS.
+
+2. get_data_source_frame Function:
+   - Returns the DataFrame of the datasets.json files of a folder. The DataFrames (and with them their schema, which
+     otherwise requires reading all records) are cached until the response-data.json of the folder changes.
+   - SPARK_DATA_FRAME_CACHE_SIZE sets the number of cached DataFrames (default: 8), SPARK_PERSIST_DATA_FRAMES=1
+     additionally keeps their records in the memory of Spark.
+
+3. Job groups:
+   - The Spark jobs of a filter job (see filter_jobs.py) run in a job group named by the id of the filter job,
+     so their progress (completed tasks) can be reported and they can be cancelled.
+
+4. is_spark_available Function:
+   - PySpark is optional if NumPy is installed: without it the app starts without the Spark session and all
+     filters run on the local backend (see filter.py).
+
+5. stop_spark_engine Function:
+   - Stops the shared Spark session, registered to run when the app exits.
+'''
+
+import os
+import atexit
+import threading
+from collections import OrderedDict
+
+try:
+    from pyspark.sql import SparkSession
+except ImportError:
+    # PySpark is not installed, the filters only run on the local backend (see filter.py)
+    SparkSession = None
+
+SPARK_MASTER = os.environ.get('SPARK_MASTER', 'local[*]')
+
+# Spark options that can be set by environment variables (environment variable -> Spark option)
+SPARK_CONFIG_ENVIRONMENT = {
+    'SPARK_DRIVER_MEMORY': 'spark.driver.memory',
+    'SPARK_EXECUTOR_MEMORY': 'spark.executor.memory',
+    'SPARK_EXECUTOR_CORES': 'spark.executor.cores',
+    'SPARK_EXECUTOR_INSTANCES': 'spark.executor.instances',
+    'SPARK_SHUFFLE_PARTITIONS': 'spark.sql.shuffle.partitions'
+}
+
+DATA_FRAME_CACHE_SIZE = int(os.environ.get('SPARK_DATA_FRAME_CACHE_SIZE', 8))
+PERSIST_DATA_FRAMES = os.environ.get('SPARK_PERSIST_DATA_FRAMES', '0') == '1'
+
+SPARK_SESSION = None
+
+# cached DataFrames, ordered from least to most recently used (folder path -> (version, DataFrame))
+DATA_FRAME_CACHE = OrderedDict()
+
+# protects SPARK_SESSION and DATA_FRAME_CACHE, the Flask app handles requests in several threads
+ENGINE_LOCK = threading.Lock()
+
+# Function to check if PySpark is installed
+def is_spark_available():
+    return SparkSession is not None
+
+# Function to start the shared Spark session, returns the running session if it has already been started
+def start_spark_engine():
+    global SPARK_SESSION
+
+    if SparkSession is None:
+        raise RuntimeError("PySpark is not installed, filters that need the Spark backend can't be evaluated.")
+
+    with ENGINE_LOCK:
+        if SPARK_SESSION is None:
+            builder = SparkSession.builder.appName("DatasetFilter").master(SPARK_MASTER)
+
+            for environment_variable, option in SPARK_CONFIG_ENVIRONMENT.items():
+                if os.environ.get(environment_variable):
+                    builder = builder.config(option, os.environ[environment_variable])
+
+            SPARK_SESSION = builder.getOrCreate()
+            print("Spark engine started (master: " + SPARK_MASTER + ")")
+
+        return SPARK_SESSION
+
+# Function to get the shared Spark session, it is started on first use if the app didn't start it
+def get_spark_session():
+    return SPARK_SESSION or start_spark_engine()
+
+# Function to get the version of the records of a folder, the response-data.json is rewritten by every sort run
+def get_data_source_version(folder_path):
+    try:
+        return os.stat(os.path.join(folder_path, 'response-data.json')).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+# Function to get the DataFrame of all datasets.json files below a folder
+def get_data_source_frame(folder_path):
+    folder_path = os.path.normpath(folder_path)
+    version = get_data_source_version(folder_path)
+
+    with ENGINE_LOCK:
+        cached = DATA_FRAME_CACHE.get(folder_path)
+        if cached is not None and cached[0] == version:
+            DATA_FRAME_CACHE.move_to_end(folder_path)
+            return cached[1]
+
+    # reading the folder infers the schema, so it is done outside of the lock
+    spark = get_spark_session()
+    # Read the datasets.json files recursively (minute folders also contain binary columns and line indexes)
+    df = spark.read.option("recursiveFileLookup", "true").option("pathGlobFilter", "datasets.json").json(folder_path)
+    if PERSIST_DATA_FRAMES:
+        df = df.cache()
+
+    with ENGINE_LOCK:
+        replaced = DATA_FRAME_CACHE.pop(folder_path, None)
+        DATA_FRAME_CACHE[folder_path] = (version, df)
+
+        evicted = [replaced] if replaced is not None else []
+        while len(DATA_FRAME_CACHE) > DATA_FRAME_CACHE_SIZE:
+            evicted.append(DATA_FRAME_CACHE.popitem(last=False)[1])
+
+    # free the memory of persisted DataFrames that are no longer cached
+    if PERSIST_DATA_FRAMES:
+        for _, evicted_df in evicted:
+            evicted_df.unpersist()
+
+    return df
+
+# Function to run the Spark jobs started by the current thread in a job group, so they can be cancelled together
+def set_job_group(group_id):
+    get_spark_session().sparkContext.setJobGroup(group_id, "filter job " + group_id, interruptOnCancel=True)
+
+# Function to cancel the running Spark jobs of a job group
+def cancel_job_group(group_id):
+    if SPARK_SESSION is not None:
+        SPARK_SESSION.sparkContext.cancelJobGroup(group_id)
+
+# Function to get the progress of the Spark jobs of a job group, returns (completed tasks, tasks)
+def get_job_group_progress(group_id):
+    if SPARK_SESSION is None:
+        return 0, 0
+
+    tracker = SPARK_SESSION.sparkContext.statusTracker()
+    completed_tasks, tasks = 0, 0
+    for job_id in tracker.getJobIdsForGroup(group_id):
+        job_info = tracker.getJobInfo(job_id)
+        for stage_id in job_info.stageIds if job_info is not None else []:
+            stage_info = tracker.getStageInfo(stage_id)
+            if stage_info is not None:
+                completed_tasks += stage_info.numCompletedTasks
+                tasks += stage_info.numTasks
+
+    return completed_tasks, tasks
+
+# Function to stop the shared Spark session
+def stop_spark_engine():
+    global SPARK_SESSION
+
+    with ENGINE_LOCK:
+        DATA_FRAME_CACHE.clear()
+        if SPARK_SESSION is not None:
+            SPARK_SESSION.stop()
+            SPARK_SESSION = None
+            print("Spark engine stopped")
+
+atexit.register(stop_spark_engine)
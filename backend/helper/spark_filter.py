@@ -0,0 +1,185 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@author: Michael Küchenmeister - Technische Hochschule Ingolstadt (mik6331@thi.de)
+@version: 0.3
+@date: 15.01.2024
+
+This script defines functions to filter datasets using PySpark. It leverages the PySpark SQL module to 
+perform data filtering based on specified criteria. It is the Spark filter backend of filter.py.
+The script includes the following key functionalities:
+
+1. recursiveTableDataFilter Function:
+   - Performs recursive or "normal" filtering on JSON files in a specified root folder.
+   - Handles different filter keys, including 'aspath' where array_contains is used.
+   - Handles 'prefix' filters with an 'operator' (covered_by, covers or lpm, see prefix_trie.py) by a UDF,
+     for lpm only the matching rows with the longest prefix are kept.
+   - Handles the range operators (gt, ge, lt, le and between, see range_filter.py) on the numeric keys by
+     comparing the column with the integer bounds of the range.
+   - Writes the filtered data to the target folder (an entry of the filtered data cache, see result_cache.py).
+   - Returns the number of rows after filtering.
+   - Counts the filtered rows grouped by time bucket and validation states, so the graphData and pieData of the
+     filtered data (see chart_data.py) are written with it. The filtered DataFrame is persisted until both are
+     written, so the records are only read and filtered once.
+   - Writes a line index for the filtered data files (see line_index.py), so their pages can be read directly.
+   - Uses the shared Spark session and the cached DataFrames of the data sources (see spark_engine.py).
+   - Only reads the datasets.json files of the minute folders whose statistics don't show that no record can
+     match the filters (see partition_stats.py).
+   - For a filter job (see filter_jobs.py), runs the Spark jobs in its job group and first collects the first
+     matching rows, so the job has a partial first page before all records are filtered.
+'''
+
+import os
+import json
+from pyspark.sql.functions import col, expr, udf, floor, max as spark_max
+from pyspark.sql.types import BooleanType
+from functools import reduce
+from operator import and_
+from helper.line_index import write_folder_line_indexes
+from helper.spark_engine import get_spark_session, get_data_source_frame, set_job_group
+from helper.prefix_trie import parse_network, record_matches_prefix_operator
+from helper.range_filter import RANGE_OPERATORS, get_range_bounds
+from helper.partition_stats import partition_may_match
+from helper.chart_data import get_bucket_width, create_chart_data, write_chart_data
+from helper.job_progress import FILTER_JOB_PARTIAL_ROWS, start_progress, add_partial_rows, check_cancelled
+
+# Function to build the filtering condition of a filter item
+def get_filter_condition(filter_item):
+    if filter_item.get('operator') in RANGE_OPERATORS:
+        # Handle range operators by comparing the column with the integer bounds of the range
+        low, high = get_range_bounds(filter_item['operator'], filter_item['value'])
+        if low is not None and high is not None:
+            return col(filter_item['key']).between(low, high)
+        return col(filter_item['key']) >= low if low is not None else col(filter_item['key']) <= high
+
+    if filter_item.get('operator') is not None:
+        # Handle prefix operators by comparing the prefix and length of each record with the network
+        operator, network = filter_item['operator'], parse_network(filter_item['value'])
+        matches = udf(lambda prefix, length: record_matches_prefix_operator(operator, network, prefix, length), BooleanType())
+        return matches(col('prefix'), col('length'))
+
+    if filter_item['key'] == 'aspath':
+        # Handle 'aspath' filter differently by checking for array_contains
+        aspath_values = list(map(str, filter_item['value'].split()))
+        condition = ' AND '.join([f"array_contains(aspath, '{value}')" for value in aspath_values])
+        return expr(condition)
+
+    # For other keys, create equality filter conditions
+    return col(filter_item['key']) == filter_item['value']
+
+# Function to apply the combined filtering conditions of the filter items to a DataFrame
+def apply_filter_conditions(df, filter_values):
+    # Combine individual filters using AND operator
+    combined_filter = reduce(and_, [get_filter_condition(filter_item) for filter_item in filter_values])
+
+    # Apply the combined filter to the DataFrame
+    filtered_df = df.filter(combined_filter)
+
+    # For a longest prefix match, keep only the matching rows with the longest prefix
+    if any(filter_item.get('operator') == 'lpm' for filter_item in filter_values):
+        longest = filtered_df.agg(spark_max('length')).collect()[0][0]
+        filtered_df = filtered_df.filter(col('length') == longest)
+
+    return filtered_df
+
+# Function to write the graphData and pieData of a filtered DataFrame, returns the number of its rows
+def write_filtered_chart_data(filtered_df, path_parts, target_folder_path):
+    # Group the rows by time bucket and validation states, this job replaces counting the rows
+    period, width = get_bucket_width(path_parts)
+    timestamp = col('timestamp') % period if period else col('timestamp')
+    groups = filtered_df.groupBy(floor(timestamp / width).alias('bucket'), 'roa1', 'aspa1', 'aspa2').count().collect()
+
+    chart_data = create_chart_data(path_parts, [(row['bucket'], row['roa1'], row['aspa1'], row['aspa2'], row['count']) for row in groups])
+    write_chart_data(target_folder_path, chart_data)
+    return chart_data["datasetSum"]
+
+# Function to write a filtered DataFrame with a line index and its graphData and pieData, returns the number of its rows
+def write_filtered_data(filtered_df, path_parts, target_folder_path):
+    # Writing the rows and counting them are two Spark jobs, the persisted DataFrame lets the second one
+    # read the filtered rows instead of reading and filtering the records again
+    filtered_df = filtered_df.persist()
+    try:
+        filtered_df.coalesce(1).write.mode("overwrite").json(target_folder_path)
+        write_folder_line_indexes(target_folder_path)
+        return write_filtered_chart_data(filtered_df, path_parts, target_folder_path)
+    finally:
+        filtered_df.unpersist()
+
+# Function to run the Spark jobs started by the current thread in the job group of a filter job
+def start_filter_job(progress):
+    if progress is not None:
+        start_progress(progress, "spark")
+        set_job_group(progress["id"])
+        check_cancelled(progress)
+
+# Function to report the first rows of a filtered DataFrame to a filter job before all records are filtered
+def report_first_rows(filtered_df, progress):
+    if progress is None:
+        return
+
+    # Spark stops reading the records when the first rows are found
+    add_partial_rows(progress, [json.loads(line) for line in filtered_df.limit(FILTER_JOB_PARTIAL_ROWS).toJSON().collect()])
+    progress["rows"] = len(progress["partial_rows"])
+    check_cancelled(progress)
+
+# Function to get the datasets.json files below a root folder and the files of them that can contain matching records
+def get_candidate_dataset_files(root_folder_path, filter_values):
+    dataset_files, candidate_files = [], []
+
+    for folder_path, folder_names, file_names in os.walk(root_folder_path):
+        folder_names.sort()
+        if 'datasets.json' in file_names:
+            dataset_files.append(os.path.join(folder_path, 'datasets.json'))
+            if partition_may_match(folder_path, filter_values):
+                candidate_files.append(os.path.join(folder_path, 'datasets.json'))
+
+    return dataset_files, candidate_files
+
+# Function to filter data recursively based on specified criteria
+def recursive_table_data_filter(root_folder_path, filter_values, target_folder_path, path_parts, progress=None):
+    # Run the Spark jobs in the job group of the filter job
+    start_filter_job(progress)
+
+    # Get the (cached) DataFrame of the datasets.json files of the specified root folder
+    df = get_data_source_frame(root_folder_path)
+
+    # Skip the minute folders that can't contain matching records, their schema is taken from the cached DataFrame
+    # (if no folder can contain matching records, all are filtered, so the empty result is still written as a file)
+    dataset_files, candidate_files = get_candidate_dataset_files(root_folder_path, filter_values)
+    if candidate_files and len(candidate_files) < len(dataset_files):
+        df = get_spark_session().read.schema(df.schema).json(candidate_files)
+
+    # Apply the filtering conditions to the DataFrame
+    filtered_df = apply_filter_conditions(df, filter_values)
+    report_first_rows(filtered_df, progress)
+
+    # Write the filtered DataFrame to a temporary location and count its rows by the groups of the chart data
+    num_filtered_rows = write_filtered_data(filtered_df, path_parts, target_folder_path)
+
+    # Return the number of filtered rows
+    return num_filtered_rows
+
+# Function to filter data normally (without recursion) based on specified criteria
+def normal_table_data_filter(file_path, filter_values, target_folder_path, path_parts, progress=None):
+    # Run the Spark jobs in the job group of the filter job
+    start_filter_job(progress)
+
+    # Get the shared Spark session
+    spark = get_spark_session()
+
+    # Read JSON file from the specified path
+    df = spark.read.json(file_path)
+
+    # Apply the filtering conditions to the DataFrame
+    filtered_df = apply_filter_conditions(df, filter_values)
+    report_first_rows(filtered_df, progress)
+
+    # Write the filtered DataFrame to the target location (the filtered data is read from another cache entry)
+    # and count its rows by the groups of the chart data
+    num_filtered_rows = write_filtered_data(filtered_df, path_parts, target_folder_path)
+
+    # Return the number of filtered rows
+    return num_filtered_rows
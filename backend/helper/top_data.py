@@ -0,0 +1,161 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script provides the validation counters per AS number of the folders of a data source. Next to its
+response-data.json, each folder has a top-data.json written by sort_raw_exabgp_data.py with the counters of the
+origin ASNs (last ASN of the AS path), the transit ASNs (the other ASNs of the AS path) and the peers (sourceasn)
+of its records. It includes the following key functionalities:
+
+1. add_record_counts Function:
+   - Counts a record for its origin ASN, transit ASNs and peer: the number of records and the ROA, ASPA_CAIDA
+     and ASPA_AI states (TOP_DATA_FIELDS). An ASN that occurs several times in an AS path is counted once.
+   - The sort script counts the records of the minute folders and adds the counters up to the folders above
+     them (add_top_data), so a record only updates the counters of its minute folder.
+
+2. get_top_ranking Function:
+   - Returns the ASNs with the highest counter (e.g. "ROA.invalid") of a folder from its top-data.json, without
+     reading any record. Loaded top-data.json files are kept in memory until they change.
+'''
+
+import os
+import json
+import heapq
+import threading
+from collections import OrderedDict
+from helper.chart_data import VALIDATION_STATES
+
+TOP_DATA_FILE = 'top-data.json'
+
+TOP_DATA_KINDS = ("origin", "transit", "peer")
+
+# Counters of an ASN in the order of their list in top-data.json
+TOP_DATA_FIELDS = ["records"] + [f"{validation}.{state}" for validation in VALIDATION_STATES for state in ("invalid", "valid", "unknown")]
+
+# Position of the counter of each validation state: record key -> {value of the record: position}
+STATE_FIELD_INDEXES = {
+    key: {value: TOP_DATA_FIELDS.index(f"{validation}.{state}") for value, state in states.items()}
+    for validation, (key, states) in VALIDATION_STATES.items()
+}
+
+# Number of loaded top-data.json files that are kept in memory
+LOADED_TOP_DATA_CACHE_SIZE = 16
+
+# Loaded top-data.json files, ordered from least to most recently used (file path -> (modification time, size, top data))
+LOADED_TOP_DATA = OrderedDict()
+
+# protects the loaded files, the Flask app handles requests in several threads
+LOADED_TOP_DATA_LOCK = threading.Lock()
+
+# Function to create the counters of a folder without records
+def create_empty_top_data():
+    return {kind: {} for kind in TOP_DATA_KINDS}
+
+# Function to get the positions of the counters of a record: the number of records and its validation states
+def get_record_fields(record):
+    fields = [0]
+    for key, indexes in STATE_FIELD_INDEXES.items():
+        if record.get(key) in indexes:
+            fields.append(indexes[record[key]])
+    return fields
+
+# Function to count a record in top data, returns the number of ASNs that got new counters
+def add_record_counts(top_data, record):
+    fields = get_record_fields(record)
+
+    aspath = record.get("aspath") or []
+    origin = aspath[-1] if aspath else None
+    asns = {
+        "origin": [origin] if origin is not None else [],
+        "transit": [asn for asn in dict.fromkeys(aspath[:-1]) if asn != origin],
+        "peer": [record["sourceasn"]] if record.get("sourceasn") is not None else []
+    }
+
+    new_counters = 0
+    for kind, kind_asns in asns.items():
+        counters = top_data[kind]
+        for asn in kind_asns:
+            counter = counters.get(str(asn))
+            if counter is None:
+                counter = counters[str(asn)] = [0] * len(TOP_DATA_FIELDS)
+                new_counters += 1
+            for field in fields:
+                counter[field] += 1
+
+    return new_counters
+
+# Function to add the counters of source to the counters of target
+def add_top_data(target, source):
+    for kind in TOP_DATA_KINDS:
+        counters = target[kind]
+        for asn, source_counter in source[kind].items():
+            counter = counters.get(asn)
+            if counter is None:
+                counters[asn] = list(source_counter)
+            else:
+                for field, count in enumerate(source_counter):
+                    counter[field] += count
+
+# Function to read a top-data.json file, None if it doesn't exist or has other counters
+def load_top_data_file(file_path):
+    try:
+        with open(file_path, 'r') as f:
+            data = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+    if data.get("fields") != TOP_DATA_FIELDS:
+        return None
+    return {kind: data[kind] for kind in TOP_DATA_KINDS}
+
+# Function to write the counters of a folder into its top-data.json (or top-data.json<suffix> of a worker process)
+def write_top_data(folder_path, top_data, suffix=''):
+    file_path = os.path.join(folder_path, TOP_DATA_FILE + suffix)
+    temp_path = f'{file_path}.tmp-{os.getpid()}'
+    os.makedirs(folder_path, exist_ok=True)
+
+    with open(temp_path, 'w') as f:
+        f.write(json.dumps(dict(fields=TOP_DATA_FIELDS, **top_data)))
+    os.replace(temp_path, file_path)
+
+# Function to get the counters of a folder, None if it has no top-data.json
+def read_top_data(folder_path):
+    file_path = os.path.join(folder_path, TOP_DATA_FILE)
+    try:
+        stat = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+
+    with LOADED_TOP_DATA_LOCK:
+        loaded = LOADED_TOP_DATA.get(file_path)
+        if loaded is not None and loaded[:2] == (stat.st_mtime_ns, stat.st_size):
+            LOADED_TOP_DATA.move_to_end(file_path)
+            return loaded[2]
+
+    top_data = load_top_data_file(file_path)
+    if top_data is not None:
+        with LOADED_TOP_DATA_LOCK:
+            LOADED_TOP_DATA[file_path] = (stat.st_mtime_ns, stat.st_size, top_data)
+            while len(LOADED_TOP_DATA) > LOADED_TOP_DATA_CACHE_SIZE:
+                LOADED_TOP_DATA.popitem(last=False)
+
+    return top_data
+
+# Function to get the limit ASNs of a kind with the highest counter (a field of TOP_DATA_FIELDS), equal counters are ordered by ASN
+def get_top_ranking(top_data, kind, field, limit):
+    index = TOP_DATA_FIELDS.index(field)
+    counters = [(asn, counter) for asn, counter in top_data[kind].items() if counter[index] > 0]
+    top = heapq.nsmallest(limit, counters, key=lambda item: (-item[1][index], len(item[0]), item[0]))
+
+    ranking = []
+    for asn, counter in top:
+        entry = {"asn": asn, "count": counter[index], "records": counter[0]}
+        for validation, (key, states) in VALIDATION_STATES.items():
+            entry[validation] = {state: counter[TOP_DATA_FIELDS.index(f"{validation}.{state}")] for state in ("invalid", "valid", "unknown")}
+        ranking.append(entry)
+    return ranking
@@ -35,31 +35,59 @@ Example JSON dataobject:
 Run with:
 python3 sort_raw_exabgp_data <place_your_foldername_here> <place_your_raw_dataset_file_here>
 
+Optional arguments:
+--buffer-size       memory ceiling in MB for records buffered before they are written to the datasets.json files (default: 64)
+--max-open-files    maximum number of datasets.json files that are kept open at the same time (default: 256)
+--workers           number of worker processes that sort the raw file in parallel (default: 1)
+--append            add the records to an existing folder instead of overwriting it
+--columnar          additionally write a binary column copy of each datasets.json file (see helper/columnar.py),
+                    AS paths, source IPs, next hop IPs and source ASNs are stored once in the folder 'dictionary'
+                    of the root folder (see helper/dictionary.py), and each day folder gets inverted indexes
+                    for the filters and sorted value indexes for the range filters in its folder 'index'
+                    (see helper/inverted_index.py)
+
+The byte offset up to which a raw file has been sorted is kept as a watermark in ingest-state.json in the root folder.
+Running the script again with --append on the same (growing) raw file only sorts the records that were added since then.
+
 
 Folder structure:
 - root folder
-    - 02:00
-        - 00:10
-            - 00:01
-                - datasets.json
+    - 2019-06-06
+        - 02:00
+            - 00:10
+                - 00:01
+                    - datasets.json
+                    - datasets.idx (line index of datasets.json, see helper/line_index.py)
+                    - stats.json (statistics and Bloom filters used to skip the folder when filtering, see helper/partition_stats.py)
+                    - response-data.json
+                    - top-data.json (counters of the origin ASNs, transit ASNs and peers, see helper/top_data.py)
+                - 00:02
+                - ...
+                - 00:10
                 - response-data.json
-            - 00:02
+            - 00:20
             - ...
-            - 00:10
+            - 01:60
             - response-data.json
-        - 00:20
+        - 04:00
+            - ...
         - ...
-        - 01:60
+        - 24:00
+            - ...
         - response-data.json
-    - 04:00
-        - ...
-    - 06:00
-        - ...
-    - ...
-    - 24:00
+        - second-counts.bin (cumulative validation counters per second of the day, see helper/range_counts.py)
+    - 2019-06-07
         - ...
     - response-data.json
 
+Every folder with a response-data.json also has a top-data.json with the validation counters of the origin ASNs,
+transit ASNs and peers of its records, they are served as top-N rankings by '/api/top' of app.py. The
+second-counts.bin of the day folders gives the charts of any time range ('/api/range' of app.py).
+
+The records are partitioned by day (UTC), so a folder can hold the records of several days. Folders and their
+response-data.json files are only created when a record is sorted into them, the backend responds with empty
+datasets for time periods without records (see helper/hierarchy.py).
+
 The folder structure, along with the response-data.json files it encompasses, serves the purpose of transforming raw data
 records from exaBGP into the necessary format for the frontend. As the frontend graphics visualize the datasets according
 to their validation status and timestamp, the relevant data is organized based on the established folder structure and its
@@ -69,170 +97,156 @@ frontend requests, contributing to enhanced server response efficiency.
 
 import os
 import json
-import copy
 from datetime import datetime, timezone
 import sys
 import shutil
+import hashlib
+import time
+import argparse
+import multiprocessing
+from collections import OrderedDict
+from helper.hierarchy import graph_data_dataset_format, create_empty_response_data, get_date_folder, get_time_folder_names, get_graph_data_sort_key, get_time_label
+from helper.line_index import write_line_index
+from helper.partition_stats import write_partition_stats
+from helper.top_data import TOP_DATA_FILE, create_empty_top_data, add_record_counts, add_top_data, load_top_data_file, write_top_data
+from helper.range_counts import add_record_second, add_second_counts, write_second_counts
 
 OPEND_FILES_TO_WRITE = {}
 
-graph_data_dataset_format = {
-    "ASPA_AI": {
-        "invalid": 0,
-        "valid": 0,
-        "unknown": 0
-    },
-    "ASPA_CAIDA": {
-        "invalid": 0,
-        "valid": 0,
-        "unknown": 0
-    },
-    "ROA": {
-        "invalid": 0,
-        "valid": 0,
-        "unknown": 0
-    },
-    "label": ""
-}
+# open datasets.json files, ordered from least to most recently used
+OPEND_DATASET_WRITERS = OrderedDict()
 
-response_format = {
-    "datasetSum": 0,
-    "graphData": [],
-    "pieData": {
-        "ASPA_AI": {
-            "invalid": 0,
-            "valid": 0,
-            "unknown": 0
-        },
-        "ASPA_CAIDA": {
-            "invalid": 0,
-            "valid": 0,
-            "unknown": 0
-        },
-        "ROA": {
-            "invalid": 0,
-            "valid": 0,
-            "unknown": 0
-        }
-    },
-    "tableData": []
-}
+# records that are not yet written to their datasets.json file (file path -> list of json lines)
+BUFFERED_DATASET_LINES = {}
+BUFFERED_DATASET_BYTES = 0
+
+# suffix for the datasets.json files written by a worker process, e.g. datasets.json.part-0
+DATASET_PART_SUFFIX = ''
+WRITTEN_DATASET_FILES = set()
+
+# graphData datasets of the opened response-data.json files by label (file path -> {label: dataset})
+GRAPH_DATA_BY_LABEL = {}
+
+# response-data.json files with new graphData labels, their graphData is sorted by label when the file is written
+UNSORTED_GRAPH_DATA = set()
+
+# set in worker processes: the counters of loaded response-data.json files start at 0, the parent adds them up
+LOAD_EMPTY_RESPONSE_DATA = False
+
+# byte offset in the raw file up to which the records have been sorted
+SORTED_RAW_OFFSET = 0
 
-def write_response_data(folder_path, graph_data):
-    # creates the file response-data.json in folder_path
-    response_format["graphData"] = graph_data
+INGEST_STATE_FILE = 'ingest-state.json'
 
-    with open(os.path.join(folder_path, 'response-data.json'), 'w') as f:
-        f.write(json.dumps(response_format, indent=2, ensure_ascii=False))
+# top-data.json counters of the records sorted since the last flush, by minute folder (folder path -> top data)
+TOP_DATA_DELTAS = {}
+TOP_DATA_DELTA_COUNTERS = 0
 
-def write_empty_dataset_file(folder_path):
-    # creates the file datasets.json in folder_path
-    with open(os.path.join(folder_path, 'datasets.json'), 'w') as f:
-        f.write("")
+# folders whose top-data.json has been written, by a worker process its top-data.json.part-<n>
+WRITTEN_TOP_DATA_FOLDERS = set()
+
+# number of ASN counters kept in TOP_DATA_DELTAS before they are added to the top-data.json files
+MAX_TOP_DATA_DELTA_COUNTERS = 1000000
+
+# counters of the records sorted per second of a day, added to second-counts.bin at the end (day folder path -> second counts)
+SECOND_COUNT_DELTAS = {}
+
+# limits of the buffered writers, can be changed with --max-open-files and --buffer-size
+MAX_OPEN_DATASET_WRITERS = 256
+MAX_BUFFERED_DATASET_BYTES = 64 * 1024 * 1024
 
 def generate_folder_structure(root_folder_name):
-    # create time-numbered subfolders in main folder
-    sub_folder_group_1_response = []
-    sub_folder_group_2_response = []
-    sub_folder_group_3_response = []
-
-    # create subfolders group 1: 02:00, 04:00, 06:00, ... (by two hours)
-    for i in range(2, 25, 2):
-        # create subfoldername
-        sub_folder_group_1 = os.path.join(root_folder_name, f'{i:02d}:00')
-        # create folder with subfoldername
-        os.makedirs(sub_folder_group_1)
-
-        # create the empty graphData datasets with time periods as label in the parent response-data.json
-        current_graph_data = copy.deepcopy(graph_data_dataset_format)
-        current_graph_data["label"] = f'{i-2:02d}:00 Uhr - {i:02d}:00 Uhr'
-        sub_folder_group_1_response.append(current_graph_data)
-
-        # create subfolders group 2: 00:10, 00:20, 00:30, ... (by 10 minutes in the two hours)
-        for j in range(1, 13, 1):
-            # create empty graphData dataset
-            current_sub_graph_data = copy.deepcopy(graph_data_dataset_format)
-
-            # create subfoldername and the time periods label for graphData datasets in the parent respnse-data.json
-            if j < 7:
-                # we are now in the first hour of the two hour time block
-                sub_folder_group_2 = os.path.join(sub_folder_group_1, f'{i-2:02d}:{j}0')
-                current_sub_graph_data["label"] = f'{i-2:02d}:{j-1}0 Uhr - {i-2:02d}:{j}0 Uhr'
-            else:
-                # we are now in the second hour of the two hour time block => subtract 60min
-                sub_folder_group_2 = os.path.join(sub_folder_group_1, f'{i-1:02d}:{j-6}0')
-                current_sub_graph_data["label"] = f'{i-1:02d}:{j-7}0 Uhr - {i-1:02d}:{j-6}0 Uhr'
-
-            # create the folder with subfoldername
-            os.makedirs(sub_folder_group_2)
-
-            # create new graphData dataset with the specific label
-            sub_folder_group_2_response.append(current_sub_graph_data)
-
-            # create subfolders group 3: 00:01, 00:02, 00:03, ... (by minute in the 10 minutes)
-            for k in range(1, 11, 1):
-                # create empty graphData dataset
-                current_sub_sub_graph_data = copy.deepcopy(graph_data_dataset_format)
-
-                # create subfoldername and the time periods label for graphData datasets in the parent respnse-data.json
-                if k == 10:
-                    if j < 7:
-                        # we are now in the first hour of the two hour time block
-                        sub_folder_group_3 = os.path.join(sub_folder_group_2, f'{i-2:02d}:{j}0')
-                        current_sub_sub_graph_data["label"] = f'{i-2:02d}:{j-1}{k-1} Uhr - {i-2:02d}:{j}0 Uhr'
-                    else:
-                        # we are now in the second hour of the two hour time block => subtract 60min
-                        sub_folder_group_3 = os.path.join(sub_folder_group_2, f'{i-1:02d}:{j-6}0')
-                        current_sub_sub_graph_data["label"] = f'{i-1:02d}:{j-7}{k-1} Uhr - {i-1:02d}:{j-6}0 Uhr'
-                else:
-                    if j < 7:
-                        # we are now in the first hour of the two hour time block
-                        sub_folder_group_3 = os.path.join(sub_folder_group_2, f'{i-2:02d}:{j-1}{k}')
-                        current_sub_sub_graph_data["label"] = f'{i-2:02d}:{j-1}{k-1} Uhr - {i-2:02d}:{j-1}{k} Uhr'
-                    else:
-                        # we are now in the second hour of the two hour time block => subtract 60min
-                        sub_folder_group_3 = os.path.join(sub_folder_group_2, f'{i-1:02d}:{j-7}{k}')
-                        current_sub_sub_graph_data["label"] = f'{i-1:02d}:{j-7}{k-1} Uhr - {i-1:02d}:{j-7}{k} Uhr'
-
-                # create the folder with subfoldername
-                os.makedirs(sub_folder_group_3)
-
-                # create new graphData dataset with the specific label
-                sub_folder_group_3_response.append(current_sub_sub_graph_data)
-
-                # create response-data.json in each folder of subfolders group 3
-                write_response_data(sub_folder_group_3, [])
-
-                # create additionally datasets.json in each folder of subfolders group 3
-                write_empty_dataset_file(sub_folder_group_3)
-
-            # create response-data.json in each folder of subfolders group 2
-            write_response_data(sub_folder_group_2, sub_folder_group_3_response)
-            sub_folder_group_3_response = []
-
-        # create response-data.json in subfolders group 1
-        write_response_data(sub_folder_group_1, sub_folder_group_2_response)
-        sub_folder_group_2_response = []
-
-    # create response-data.json in subfolders group 0 (root)
-    write_response_data(root_folder_name, sub_folder_group_1_response)
-    sub_folder_group_1_response = []
-
-    print('The subfolders have been sucessfully created.')
+    # create the response-data.json in the root folder, the sub folders for days, two hours, ten minutes and minutes
+    # are only created when a record is sorted into them
+    with open(os.path.join(root_folder_name, 'response-data.json'), 'w') as f:
+        f.write(json.dumps(create_empty_response_data([]), indent=2, ensure_ascii=False))
+
+    print('The root folder has been sucessfully prepared.')
     print('\n')
 
-def open_file(file_path):
+def open_file(file_path, path_parts=None):
     # check if data is already
     if not file_path in OPEND_FILES_TO_WRITE:
+        if path_parts is not None and not os.path.isfile(file_path):
+            # the folder has no records yet, start with an empty response-data.json dataset
+            OPEND_FILES_TO_WRITE[file_path] = create_empty_response_data(path_parts)
+            return
+
         with open(file_path, 'r') as f:
             data = json.load(f)
+
+        if LOAD_EMPTY_RESPONSE_DATA:
+            clear_response_data(data)
         OPEND_FILES_TO_WRITE[file_path] = data
 
+def clear_response_data(data):
+    # set all counters of a response-data.json dataset to 0, the graphData labels are kept
+    data["datasetSum"] = 0
+
+    for dataset in [data["pieData"]] + data["graphData"]:
+        for validation in ("ROA", "ASPA_CAIDA", "ASPA_AI"):
+            for state in ("invalid", "valid", "unknown"):
+                dataset[validation][state] = 0
+
+def open_response_data(folder_path, path_parts):
+    # open the response-data.json in folder_path (path_parts are the folder names below the root folder)
+    file_path = folder_path + '/response-data.json'
+    open_file(file_path, path_parts)
+    return file_path
+
 def write_opend_files():
     for key, data in OPEND_FILES_TO_WRITE.items():
+        if key in UNSORTED_GRAPH_DATA:
+            data["graphData"] = sorted(data["graphData"], key=get_graph_data_sort_key)
+
+        os.makedirs(os.path.dirname(key), exist_ok=True)
+
         with open(key, 'w') as f:
             f.write(json.dumps(data, indent=2, ensure_ascii=False))
 
+def add_validation_results(data_to_update, partial_data):
+    # add the ROA, ASPA_CAIDA and ASPA_AI counters of partial_data to data_to_update
+    for validation in ("ROA", "ASPA_CAIDA", "ASPA_AI"):
+        for state in ("invalid", "valid", "unknown"):
+            data_to_update[validation][state] += partial_data[validation][state]
+
+def get_graph_data_dataset(file_path, label):
+    # find the graphData dataset with the label in the opened response-data.json, add a new one if there is none
+    graph_data_by_label = GRAPH_DATA_BY_LABEL.get(file_path)
+
+    if graph_data_by_label is None:
+        graph_data_by_label = {dataset["label"]: dataset for dataset in OPEND_FILES_TO_WRITE[file_path]["graphData"]}
+        GRAPH_DATA_BY_LABEL[file_path] = graph_data_by_label
+
+    dataset = graph_data_by_label.get(label)
+
+    if dataset is None:
+        dataset = {validation: dict(states) for validation, states in graph_data_dataset_format.items() if validation != "label"}
+        dataset["label"] = label
+        OPEND_FILES_TO_WRITE[file_path]["graphData"].append(dataset)
+        graph_data_by_label[label] = dataset
+        UNSORTED_GRAPH_DATA.add(file_path)
+
+    return dataset
+
+def merge_response_data(file_path, partial_data):
+    # add the counters of a partial response-data.json dataset (created by a worker process) to the opened file
+    if file_path not in OPEND_FILES_TO_WRITE and not os.path.isfile(file_path):
+        # the folder has no records yet, so the partial dataset is the complete dataset
+        OPEND_FILES_TO_WRITE[file_path] = partial_data
+        UNSORTED_GRAPH_DATA.add(file_path)
+        return
+
+    open_file(file_path)
+    data_to_update = OPEND_FILES_TO_WRITE[file_path]
+
+    data_to_update["datasetSum"] += partial_data["datasetSum"]
+    add_validation_results(data_to_update["pieData"], partial_data["pieData"])
+
+    # graphData datasets are matched by their label, new labels (timestamps of the minute folders) are added
+    for partial_dataset in partial_data["graphData"]:
+        add_validation_results(get_graph_data_dataset(file_path, partial_dataset["label"]), partial_dataset)
+
 def update_validation_results(graph_data_to_update, pie_data_to_update, data):
     # ROA
     if data["roa1"] == 2:
@@ -285,97 +299,104 @@ def update_response_data(file_path, data, index, time_formatted):
         update_validation_results(graph_data_to_update, pie_data_to_update, data)
     else:
         # index = None, so we don't have any ready-made empty data sets with corresponding labels in graphData
-        # this means the label is the timestamp from data itself in hh:mm:ss format
-        graph_data_to_update = data_to_update["graphData"]
+        # this means the label is the timestamp from data itself in hh:mm:ss format, the dataset is looked up by label
+        # and new datasets are appended unsorted (sorted once in write_opend_files)
+        update_graph_data_dataset = get_graph_data_dataset(file_path, time_formatted)
 
-        # check if a dataset with the same timestamp (time_formatted) is already in graph_data_to_update
-        update_graph_data_dataset = {}
+        # update the validation results for the graphData dataset
+        update_validation_results(update_graph_data_dataset, pie_data_to_update, data)
 
-        for dataset in graph_data_to_update:
-            if dataset["label"] == time_formatted:
-                update_graph_data_dataset = dataset
-                break
+def get_dataset_writer(file_path):
+    # reuse an already opened datasets.json file and mark it as most recently used
+    if file_path in OPEND_DATASET_WRITERS:
+        OPEND_DATASET_WRITERS.move_to_end(file_path)
+        return OPEND_DATASET_WRITERS[file_path]
 
-        if update_graph_data_dataset == {}:
-            update_graph_data_dataset = copy.deepcopy(graph_data_dataset_format)
-            update_graph_data_dataset["label"] = time_formatted
-            graph_data_to_update.append(update_graph_data_dataset)
-            sorted_graph_data = sorted(graph_data_to_update, key=lambda x: x['label'])
-            data_to_update["graphData"] = sorted_graph_data
+    # close the least recently used file if the pool of open files is full
+    if len(OPEND_DATASET_WRITERS) >= MAX_OPEN_DATASET_WRITERS:
+        _, writer = OPEND_DATASET_WRITERS.popitem(last=False)
+        writer.close()
 
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    writer = open(file_path + DATASET_PART_SUFFIX, 'a')
+    OPEND_DATASET_WRITERS[file_path] = writer
+    WRITTEN_DATASET_FILES.add(file_path)
+    return writer
 
-        # update the validation results for the graphData dataset
-        update_validation_results(update_graph_data_dataset, pie_data_to_update, data)
+def flush_dataset_buffers():
+    # write all buffered records in one batch per datasets.json file
+    global BUFFERED_DATASET_BYTES
+
+    for file_path, lines in BUFFERED_DATASET_LINES.items():
+        get_dataset_writer(file_path).write(''.join(lines))
+
+    BUFFERED_DATASET_LINES.clear()
+    BUFFERED_DATASET_BYTES = 0
+
+def close_dataset_writers():
+    # write the remaining buffered records and close all open datasets.json files
+    flush_dataset_buffers()
+
+    for writer in OPEND_DATASET_WRITERS.values():
+        writer.close()
+    OPEND_DATASET_WRITERS.clear()
 
 def update_time_sorted_datasets(file_path, data):
-    # write the datasets to datasets.json files
-    with open(file_path, 'a') as dump_file:
-        dump_file.write(json.dumps(data) + '\n')
-        dump_file.flush()
-
-def get_index_for_sub_folder_graph_data(start_index, minutes):
-    # calulate the index for the array graphData in sub folder response-data.json
-    if minutes >= 0 and minutes < 10:
-        return start_index
-    elif minutes >= 10 and minutes < 20:
-        return start_index + 1
-    elif minutes >= 20 and minutes < 30:
-        return start_index + 2
-    elif minutes >= 30 and minutes < 40:
-        return start_index + 3
-    elif minutes >= 40 and minutes < 50:
-        return start_index + 4
-    elif minutes >= 50 and minutes < 60:
-        return start_index + 5
-
-def get_sub_sub_foldername(hours, minutes):
-    # calculate the sub sub folername by given hours and minutes of the raw dataset
-    if minutes >= 0 and minutes < 10:
-        return "{:02d}:10".format(hours)
-    elif minutes >= 10 and minutes < 20:
-        return "{:02d}:20".format(hours)
-    elif minutes >= 20 and minutes < 30:
-        return "{:02d}:30".format(hours)
-    elif minutes >= 30 and minutes < 40:
-        return "{:02d}:40".format(hours)
-    elif minutes >= 40 and minutes < 50:
-        return "{:02d}:50".format(hours)
-    elif minutes >= 50 and minutes < 60:
-        return "{:02d}:60".format(hours)
-
-def update_all_response_data_files_by_dataset(root_folder_name, data, index, hours, minutes, time_formatted):
-    # update response-data.json in root folder
-    file_path = root_folder_name
-    update_response_data(file_path + "/response-data.json", data, index, "")
-
-    # update response-data.json in sub folder
-    if hours % 2 == 0:
-        sub_folder_name = "{:02d}:00".format(hours+2)
-        sub_index = get_index_for_sub_folder_graph_data(0, minutes)
-    else:
-        sub_folder_name = "{:02d}:00".format(hours+1)
-        sub_index = get_index_for_sub_folder_graph_data(6, minutes)
-
-    file_path = root_folder_name + "/" + sub_folder_name
-    open_file(file_path + '/response-data.json')
-    update_response_data(file_path + '/response-data.json', data, sub_index, "")
-
-    # update response-data.json in sub sub folder
-    sub_sub_folder_name = get_sub_sub_foldername(hours, minutes)
-    sub_sub_index = int(str(minutes)[1]) if minutes >= 10 else minutes
-    file_path = file_path + "/" + sub_sub_folder_name
-    open_file(file_path + '/response-data.json')
-    update_response_data(file_path + '/response-data.json', data, sub_sub_index, "")
-
-    # update response-data.json in sub sub sub folder
-    sub_sub_sub_folder_name = "{:02d}:{:02d}".format(hours, minutes+1)
-    file_path = file_path + "/" + sub_sub_sub_folder_name
-    open_file(file_path + '/response-data.json')
-    update_response_data(file_path + '/response-data.json', data, None, time_formatted)
-    update_time_sorted_datasets(file_path + '/datasets.json', data)
+    # buffer the datasets for the datasets.json files, they are written when the memory ceiling is reached
+    global BUFFERED_DATASET_BYTES
+
+    line = json.dumps(data) + '\n'
+    BUFFERED_DATASET_LINES.setdefault(file_path, []).append(line)
+    BUFFERED_DATASET_BYTES += len(line)
+
+    if BUFFERED_DATASET_BYTES >= MAX_BUFFERED_DATASET_BYTES:
+        flush_dataset_buffers()
+
+def update_top_data_counters(folder_path, data):
+    # count the record for the minute folder, the folders above it get the counters when they are flushed
+    global TOP_DATA_DELTA_COUNTERS
+
+    top_data = TOP_DATA_DELTAS.get(folder_path)
+    if top_data is None:
+        top_data = TOP_DATA_DELTAS[folder_path] = create_empty_top_data()
+    TOP_DATA_DELTA_COUNTERS += add_record_counts(top_data, data)
+
+    if TOP_DATA_DELTA_COUNTERS >= MAX_TOP_DATA_DELTA_COUNTERS:
+        flush_top_data()
+
+def flush_top_data():
+    # add the counters of the minute folders to their top-data.json files and those of the folders above them
+    global TOP_DATA_DELTA_COUNTERS
+
+    folder_deltas = {}
+    for minute_folder_path, top_data in TOP_DATA_DELTAS.items():
+        # minute, ten minute, two hour, day and root folder
+        folder_path = minute_folder_path
+        for _ in range(5):
+            if folder_path not in folder_deltas:
+                folder_deltas[folder_path] = create_empty_top_data()
+            add_top_data(folder_deltas[folder_path], top_data)
+            folder_path = os.path.dirname(folder_path)
+
+    for folder_path, top_data in folder_deltas.items():
+        # worker processes add the counters to their own top-data.json.part-<n> files
+        saved = load_top_data_file(os.path.join(folder_path, TOP_DATA_FILE + DATASET_PART_SUFFIX))
+        if saved is not None:
+            add_top_data(saved, top_data)
+        write_top_data(folder_path, saved if saved is not None else top_data, DATASET_PART_SUFFIX)
+        WRITTEN_TOP_DATA_FOLDERS.add(folder_path)
+
+    TOP_DATA_DELTAS.clear()
+    TOP_DATA_DELTA_COUNTERS = 0
+
+def write_second_count_files():
+    # add the counters per second to the cumulative counters of the day folders
+    for day_folder_path, second_counts in SECOND_COUNT_DELTAS.items():
+        write_second_counts(day_folder_path, second_counts)
+    SECOND_COUNT_DELTAS.clear()
 
 def update_response_data_files(data, root_folder_name):
-    # get hours, minutes and seconds in UTC-Format from data timestamp
+    # get date, hours, minutes and seconds in UTC-Format from data timestamp
     timestamp = data["timestamp"]
     time_utc = datetime.utcfromtimestamp(timestamp).replace(tzinfo=timezone.utc)
     day = time_utc.day
@@ -383,52 +404,373 @@ def update_response_data_files(data, root_folder_name):
     year = time_utc.year
     hours = time_utc.hour
     minutes = time_utc.minute
-    seconds = time_utc.second
-    time_formatted = "{:02d}.{:02d}.{:04d} - {:02d}:{:02d}:{:02d}".format(day, month, year, hours, minutes, seconds)
-
-    if hours >= 0 and hours < 2:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 0, hours, minutes, time_formatted)
-    elif hours >= 2 and hours < 4:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 1, hours, minutes, time_formatted)
-    elif hours >= 4 and hours < 6:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 2, hours, minutes, time_formatted)
-    elif hours >= 6 and hours < 8:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 3, hours, minutes, time_formatted)
-    elif hours >= 8 and hours < 10:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 4, hours, minutes, time_formatted)
-    elif hours >= 10 and hours < 12:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 5, hours, minutes, time_formatted)
-    elif hours >= 12 and hours < 14:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 6, hours, minutes, time_formatted)
-    elif hours >= 14 and hours < 16:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 7, hours, minutes, time_formatted)
-    elif hours >= 16 and hours < 18:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 8, hours, minutes, time_formatted)
-    elif hours >= 18 and hours < 20:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 9, hours, minutes, time_formatted)
-    elif hours >= 20 and hours < 22:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 10, hours, minutes, time_formatted)
-    elif hours >= 22 and hours < 24:
-        update_all_response_data_files_by_dataset(root_folder_name, data, 11, hours, minutes, time_formatted)
-
-def read_raw_datasets_from_file(root_folder_name, raw_dataset_path):
-    # open the root response-data.json file to fill it with data
-    open_file(root_folder_name + "/response-data.json")
+    time_formatted = get_time_label(time_utc)
+
+    date_folder_name, date_label = get_date_folder(year, month, day)
+    two_hour_folder_name, ten_minute_folder_name, minute_folder_name = get_time_folder_names(hours, minutes)
+
+    # update response-data.json in root folder, its graphData has a dataset for each day
+    folder_path = root_folder_name
+    file_path = open_response_data(folder_path, [])
+    update_response_data(file_path, data, None, date_label)
+
+    # update response-data.json in day folder
+    path_parts = [date_folder_name]
+    folder_path = folder_path + "/" + date_folder_name
+    file_path = open_response_data(folder_path, path_parts)
+    update_response_data(file_path, data, hours // 2, "")
+    add_record_second(SECOND_COUNT_DELTAS.setdefault(folder_path, {}), data)
+
+    # update response-data.json in two hour folder
+    path_parts = path_parts + [two_hour_folder_name]
+    folder_path = folder_path + "/" + two_hour_folder_name
+    file_path = open_response_data(folder_path, path_parts)
+    update_response_data(file_path, data, (hours % 2) * 6 + minutes // 10, "")
+
+    # update response-data.json in ten minute folder
+    path_parts = path_parts + [ten_minute_folder_name]
+    folder_path = folder_path + "/" + ten_minute_folder_name
+    file_path = open_response_data(folder_path, path_parts)
+    update_response_data(file_path, data, minutes % 10, "")
+
+    # update response-data.json and datasets.json in minute folder
+    path_parts = path_parts + [minute_folder_name]
+    folder_path = folder_path + "/" + minute_folder_name
+    file_path = open_response_data(folder_path, path_parts)
+    update_response_data(file_path, data, None, time_formatted)
+    update_time_sorted_datasets(folder_path + '/datasets.json', data)
+    update_top_data_counters(folder_path, data)
+
+def sort_raw_dataset_range(root_folder_name, raw_dataset_path, start_offset, end_offset):
+    # read the json objects between the byte offsets line by line and update the specific response-data.json files
+    global SORTED_RAW_OFFSET
+    record_count = 0
+    SORTED_RAW_OFFSET = start_offset
+
+    with open(raw_dataset_path, 'rb') as f:
+        f.seek(start_offset)
+        position = start_offset
 
-    # open the raw data file, read the json object line by line and update the specific response-data.json files
-    print("The sorting process has started ...")
-    with open(raw_dataset_path, 'r') as f:
         for data_line in f:
+            if position >= end_offset:
+                break
+            position += len(data_line)
+
             data_object = json.loads(data_line)
             update_response_data_files(data_object, root_folder_name)
+            record_count += 1
+            SORTED_RAW_OFFSET = position
+
+    return record_count
+
+def split_raw_dataset_file(raw_dataset_path, start_offset, end_offset, parts):
+    # split the byte range of the raw file into ranges of similar size which start and end at line boundaries
+    offsets = [start_offset]
+
+    with open(raw_dataset_path, 'rb') as f:
+        for i in range(1, parts):
+            split_offset = start_offset + (end_offset - start_offset) * i // parts
+            if split_offset <= offsets[-1]:
+                continue
+
+            # move the split offset to the beginning of the next line
+            f.seek(split_offset - 1)
+            f.readline()
+            offsets.append(min(f.tell(), end_offset))
+
+    offsets.append(end_offset)
+    return [(start, end) for start, end in zip(offsets, offsets[1:]) if start < end]
+
+def get_raw_dataset_end_offset(raw_dataset_path):
+    # the raw file may still be written (e.g. by exaBGP), so only complete lines are sorted
+    file_size = os.path.getsize(raw_dataset_path)
+
+    with open(raw_dataset_path, 'rb') as f:
+        position = file_size
+        while position > 0:
+            block_start = max(0, position - 65536)
+            f.seek(block_start)
+            block = f.read(position - block_start)
+            newline_index = block.rfind(b'\n')
+
+            if newline_index != -1:
+                line_end = block_start + newline_index + 1
+                break
+            position = block_start
+        else:
+            line_end = 0
+
+        # a last line without a line break is sorted too if it already is a complete json object
+        if line_end < file_size:
+            f.seek(line_end)
+            try:
+                json.loads(f.read())
+                return file_size
+            except ValueError:
+                pass
+
+    return line_end
+
+def get_raw_dataset_fingerprint(raw_dataset_path, size):
+    # hash of the first bytes of the raw file, used to detect a raw file that has been replaced
+    with open(raw_dataset_path, 'rb') as f:
+        return hashlib.sha1(f.read(size)).hexdigest()
+
+def load_ingest_state(root_folder_name):
+    # ingest-state.json contains the watermark of each raw file sorted into the root folder
+    state_path = os.path.join(root_folder_name, INGEST_STATE_FILE)
+
+    if not os.path.isfile(state_path):
+        return {}
+
+    with open(state_path, 'r') as f:
+        return json.load(f)
+
+def get_watermark(root_folder_name, raw_dataset_path):
+    # byte offset up to which the raw file has already been sorted into the root folder
+    watermark = load_ingest_state(root_folder_name).get(os.path.abspath(raw_dataset_path))
+
+    if watermark is None or watermark["offset"] > os.path.getsize(raw_dataset_path):
+        return 0
+
+    # start from the beginning if the raw file is not the one the watermark was created for
+    if get_raw_dataset_fingerprint(raw_dataset_path, watermark["fingerprint_size"]) != watermark["fingerprint"]:
+        return 0
+
+    return watermark["offset"]
+
+def write_watermark(root_folder_name, raw_dataset_path, offset):
+    # save the watermark after the records have been written, the file is replaced atomically
+    ingest_state = load_ingest_state(root_folder_name)
+    fingerprint_size = min(offset, 4096)
+
+    ingest_state[os.path.abspath(raw_dataset_path)] = {
+        "offset": offset,
+        "fingerprint": get_raw_dataset_fingerprint(raw_dataset_path, fingerprint_size),
+        "fingerprint_size": fingerprint_size
+    }
+
+    state_path = os.path.join(root_folder_name, INGEST_STATE_FILE)
+    with open(state_path + '.tmp', 'w') as f:
+        f.write(json.dumps(ingest_state, indent=2))
+    os.replace(state_path + '.tmp', state_path)
+
+def sort_raw_dataset_part(root_folder_name, raw_dataset_path, start_offset, end_offset, part_number, max_open_writers, max_buffered_bytes):
+    # runs in a worker process: sorts one byte range of the raw file into datasets.json.part-<part_number> files
+    # and returns the partial response-data.json datasets, which are merged by the parent process
+    global DATASET_PART_SUFFIX, MAX_OPEN_DATASET_WRITERS, MAX_BUFFERED_DATASET_BYTES, LOAD_EMPTY_RESPONSE_DATA
+
+    LOAD_EMPTY_RESPONSE_DATA = True
+    OPEND_FILES_TO_WRITE.clear()
+    WRITTEN_DATASET_FILES.clear()
+    GRAPH_DATA_BY_LABEL.clear()
+    UNSORTED_GRAPH_DATA.clear()
+    TOP_DATA_DELTAS.clear()
+    WRITTEN_TOP_DATA_FOLDERS.clear()
+    SECOND_COUNT_DELTAS.clear()
+
+    DATASET_PART_SUFFIX = f'.part-{part_number}'
+    MAX_OPEN_DATASET_WRITERS = max_open_writers
+    MAX_BUFFERED_DATASET_BYTES = max_buffered_bytes
+
+    open_response_data(root_folder_name, [])
+    try:
+        record_count = sort_raw_dataset_range(root_folder_name, raw_dataset_path, start_offset, end_offset)
+    finally:
+        close_dataset_writers()
+        flush_top_data()
+
+    return OPEND_FILES_TO_WRITE, sorted(WRITTEN_DATASET_FILES), sorted(WRITTEN_TOP_DATA_FOLDERS), SECOND_COUNT_DELTAS, record_count
+
+def join_dataset_parts(dataset_files, parts):
+    # append the datasets.json.part-<n> files of the worker processes in the order of the raw file
+    for file_path in dataset_files:
+        with open(file_path, 'ab') as dataset_file:
+            for part_number in range(parts):
+                part_path = f'{file_path}.part-{part_number}'
+
+                if os.path.exists(part_path):
+                    with open(part_path, 'rb') as part_file:
+                        shutil.copyfileobj(part_file, dataset_file)
+                    os.remove(part_path)
+
+def join_top_data_parts(folder_paths, parts):
+    # add the counters of the top-data.json.part-<n> files of the worker processes to the top-data.json files
+    for folder_path in folder_paths:
+        file_path = os.path.join(folder_path, TOP_DATA_FILE)
+        top_data = load_top_data_file(file_path) or create_empty_top_data()
+
+        for part_number in range(parts):
+            part_data = load_top_data_file(f'{file_path}.part-{part_number}')
+            if part_data is not None:
+                add_top_data(top_data, part_data)
+
+        write_top_data(folder_path, top_data)
+        for part_number in range(parts):
+            if os.path.exists(f'{file_path}.part-{part_number}'):
+                os.remove(f'{file_path}.part-{part_number}')
+
+def remove_dataset_parts(root_folder_name):
+    # remove datasets.json.part-<n> and top-data.json.part-<n> files which are left behind by failed worker processes
+    for folder_path, _, file_names in os.walk(root_folder_name):
+        for file_name in file_names:
+            if file_name.startswith('datasets.json.part-') or file_name.startswith(TOP_DATA_FILE + '.part-'):
+                os.remove(os.path.join(folder_path, file_name))
+
+def read_raw_datasets_in_parallel(root_folder_name, raw_dataset_path, start_offset, end_offset, workers):
+    # sort byte ranges of the raw file in worker processes and merge their partial results
+    global SORTED_RAW_OFFSET
+
+    byte_ranges = split_raw_dataset_file(raw_dataset_path, start_offset, end_offset, workers)
+    arguments = [(root_folder_name, raw_dataset_path, start, end, part_number, MAX_OPEN_DATASET_WRITERS, MAX_BUFFERED_DATASET_BYTES)
+                 for part_number, (start, end) in enumerate(byte_ranges)]
+
+    try:
+        with multiprocessing.Pool(max(1, len(byte_ranges))) as pool:
+            results = pool.starmap(sort_raw_dataset_part, arguments)
+
+        # sum up the counters of the partial response-data.json datasets
+        dataset_files = set()
+        top_data_folders = set()
+        record_count = 0
+        for partial_files, partial_dataset_files, partial_top_data_folders, partial_second_counts, partial_record_count in results:
+            for file_path, partial_data in partial_files.items():
+                merge_response_data(file_path, partial_data)
+            for day_folder_path, second_counts in partial_second_counts.items():
+                add_second_counts(SECOND_COUNT_DELTAS.setdefault(day_folder_path, {}), second_counts)
+            dataset_files.update(partial_dataset_files)
+            top_data_folders.update(partial_top_data_folders)
+            WRITTEN_DATASET_FILES.update(partial_dataset_files)
+            record_count += partial_record_count
+
+        join_dataset_parts(sorted(dataset_files), len(byte_ranges))
+        join_top_data_parts(sorted(top_data_folders), len(byte_ranges))
+        SORTED_RAW_OFFSET = end_offset
+    except BaseException:
+        remove_dataset_parts(root_folder_name)
+        raise
+
+    return record_count
+
+def write_line_indexes(dataset_files, workers):
+    # write or extend the line index (datasets.idx) of the changed datasets.json files
+    dataset_files = sorted(dataset_files)
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            pool.map(write_line_index, dataset_files)
+    else:
+        for file_path in dataset_files:
+            write_line_index(file_path)
+
+def write_partition_statistics(dataset_files, workers):
+    # write the statistics (stats.json) of the changed datasets.json files
+    dataset_files = sorted(dataset_files)
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            pool.map(write_partition_stats, dataset_files)
+    else:
+        for file_path in dataset_files:
+            write_partition_stats(file_path)
+
+def write_columnar_partitions(root_folder_name, dataset_files, workers):
+    # write the binary column copy of the changed datasets.json files
+    from helper.columnar import read_partition_columns, write_partition_columns, remove_partition_columns
+    from helper.dictionary import load_dictionary, add_dictionary_values, save_dictionary
+    from helper.inverted_index import build_day_index
+
+    # columns written in this run are only used after the dictionary with their ids has been saved
+    dictionary = load_dictionary(root_folder_name)
+    dictionary_version = dictionary["version"] + 1
+    folder_paths = sorted(os.path.dirname(file_path) for file_path in dataset_files)
+    written = 0
+
+    # the datasets.json files are parsed by the workers, the ids of the dictionary are assigned in sorted folder order
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        partitions = pool.imap(read_partition_columns, folder_paths) if pool else map(read_partition_columns, folder_paths)
+
+        for folder_path, partition in zip(folder_paths, partitions):
+            if partition is None:
+                # the filters and pages of the folder read its datasets.json
+                print(f"Warning: {folder_path} has records that can't be stored as binary columns, it keeps no columns.")
+                remove_partition_columns(folder_path)
+                continue
+
+            arrays, local_values, extras, source_size = partition
+            for name, values in local_values.items():
+                arrays[name] = add_dictionary_values(dictionary, name, values)[arrays[name]]
+
+            write_partition_columns(folder_path, arrays, extras, source_size, dictionary_version)
+            written += 1
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    dictionary["version"] = dictionary_version
+    save_dictionary(root_folder_name, dictionary)
+
+    print(f"Binary columns have been written for {written} of {len(folder_paths)} minute folders.")
+
+    # rebuild the inverted indexes of the day folders with changed minute folders (day/two hours/ten minutes/minute)
+    day_folder_paths = sorted({os.path.dirname(os.path.dirname(os.path.dirname(folder_path))) for folder_path in folder_paths})
+    unindexed_counts = [build_day_index(day_folder_path) for day_folder_path in day_folder_paths]
+    indexed = [count for count in unindexed_counts if count is not None]
+    print(f"Inverted indexes have been written for {len(indexed)} of {len(day_folder_paths)} day folders.")
+    if sum(indexed) > 0:
+        print(f"Warning: {sum(indexed)} minute folders without binary columns are not indexed, the filters read their datasets.json.")
+
+def read_raw_datasets_from_file(root_folder_name, raw_dataset_path, workers=1, columnar=False):
+    # open the root response-data.json file to fill it with data
+    open_response_data(root_folder_name, [])
+
+    # only the records after the watermark of a previous run are sorted
+    global SORTED_RAW_OFFSET
+    start_offset = get_watermark(root_folder_name, raw_dataset_path)
+    end_offset = get_raw_dataset_end_offset(raw_dataset_path)
+    SORTED_RAW_OFFSET = start_offset
 
-    # write the updated data of all response-data.json files
-    write_opend_files()
+    if start_offset > 0:
+        print(f"The records up to byte {start_offset} of {raw_dataset_path} have already been sorted.")
+
+    # open the raw data file, read the json object line by line and update the specific response-data.json files
+    print("The sorting process has started ...")
+    start_time = time.perf_counter()
+    record_count = 0
+
+    try:
+        if workers > 1:
+            record_count = read_raw_datasets_in_parallel(root_folder_name, raw_dataset_path, start_offset, end_offset, workers)
+        elif start_offset < end_offset:
+            record_count = sort_raw_dataset_range(root_folder_name, raw_dataset_path, start_offset, end_offset)
+    finally:
+        # write the buffered records and the updated data of all response-data.json and top-data.json files, also if the sorting was aborted
+        close_dataset_writers()
+        write_opend_files()
+        flush_top_data()
+        write_second_count_files()
+
+        # move the watermark behind the last record that has been written
+        if SORTED_RAW_OFFSET > start_offset:
+            write_watermark(root_folder_name, raw_dataset_path, SORTED_RAW_OFFSET)
+
+    # the line index of a datasets.json file is used to read a page without reading the lines before it
+    write_line_indexes(WRITTEN_DATASET_FILES, workers)
+
+    # the statistics of a minute folder are used to skip it when its records can't match the filters
+    write_partition_statistics(WRITTEN_DATASET_FILES, workers)
+
+    if columnar:
+        write_columnar_partitions(root_folder_name, WRITTEN_DATASET_FILES, workers)
 
     # finished!
+    elapsed_time = time.perf_counter() - start_time
+    records_per_second = record_count / elapsed_time if elapsed_time > 0 else 0
     print(f"All records from {raw_dataset_path} have been sorted by timestamp and saved in {root_folder_name}")
+    print(f"{record_count} records sorted in {elapsed_time:.2f}s ({records_per_second:.0f} records/sec)")
 
-def create_root_folder(root_folder_name):
+def create_root_folder(root_folder_name, append=False):
+    # returns True if a new (empty) folder has been created
     current_dir = os.getcwd()
 
     # check if the database folder exists, create if not
@@ -438,7 +780,12 @@ def create_root_folder(root_folder_name):
 
     # check if root_folder_name already exists in the database
     root_folder_path = os.path.join(database_folder_path, root_folder_name)
-    if os.path.exists(root_folder_path):
+    if os.path.exists(root_folder_path) and append:
+        # keep the existing folder and add the new records to it
+        print(f"The records are added to the existing folder '{root_folder_name}'.")
+        print('\n')
+        return False
+    elif os.path.exists(root_folder_path):
         # if folder already exists, promt the user for action
         user_input = input('The folder already exists in the database. Do you want to overwrite the folder? (yes/no):')
 
@@ -454,25 +801,47 @@ def create_root_folder(root_folder_name):
     os.makedirs(root_folder_path)
     print(f"Folder '{root_folder_name}' has been successfully created or overwritten.")
     print('\n')
+    return True
 
 
 def main():
+    global MAX_OPEN_DATASET_WRITERS, MAX_BUFFERED_DATASET_BYTES
+
     print("Specify a folder name and a path to the exabgp raw output file.")
     print("Example: python3 sort_raw_exabgp_data.py foldername /path/to/rawdata/file")
     print('\n')
 
-    if len(sys.argv) != 3:
-        print('\n\n')
-        print("Error: specify a folder name and a path to the exabgp raw output file.")
-        print("Example: python3 sort_raw_exabgp_data.py foldername /path/to/rawdata/file")
+    parser = argparse.ArgumentParser()
+    parser.add_argument('root_folder_name', help='name of the data source folder in ./database')
+    parser.add_argument('raw_dataset_path', help='path to the exabgp raw output file')
+    parser.add_argument('--buffer-size', type=int, default=64,
+                        help='memory ceiling in MB for buffered records before they are written (default: 64)')
+    parser.add_argument('--max-open-files', type=int, default=256,
+                        help='maximum number of datasets.json files kept open at the same time (default: 256)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of worker processes that sort the raw file in parallel (default: 1)')
+    parser.add_argument('--append', action='store_true',
+                        help='add the records to an existing folder instead of overwriting it')
+    parser.add_argument('--columnar', action='store_true',
+                        help='additionally write a binary column copy of each datasets.json file (requires NumPy)')
+    args = parser.parse_args()
+
+    root_folder_name = args.root_folder_name
+    raw_dataset_path = args.raw_dataset_path
+    MAX_BUFFERED_DATASET_BYTES = args.buffer_size * 1024 * 1024
+    MAX_OPEN_DATASET_WRITERS = max(1, args.max_open_files)
+
+    # data sources of older versions of this script have no day folders and can't be extended
+    if args.append and os.path.isdir(os.path.join('./database', root_folder_name, '02:00')):
+        print("Error: the folder has been created by an older version of this script without day folders.")
         sys.exit(1)
 
-    root_folder_name = sys.argv[1]
-    raw_dataset_path = sys.argv[2]
+    if create_root_folder(root_folder_name, args.append):
+        generate_folder_structure('./database/' + root_folder_name)
+
+    read_raw_datasets_from_file('./database/' + root_folder_name, raw_dataset_path, args.workers, args.columnar)
+
 
-    create_root_folder(root_folder_name)
-    generate_folder_structure('./database/' + root_folder_name)
-    read_raw_datasets_from_file('./database/' + root_folder_name, raw_dataset_path)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,70 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script defines the fixtures shared by the tests of the Flask app. It includes the following key functionalities:
+
+1. work_folder Fixture:
+   - Sorts the fixture fixtures/exabgp_sample.jsons into the data sources 'plain' (only datasets.json) and
+     'columnar' (with --columnar) of ./database in a temporary folder, the working directory of the tests of
+     the Flask app.
+
+2. client Fixture:
+   - Imports app.py in the work folder and returns a test client of the Flask app.
+
+3. read_records Function:
+   - Returns the records of a data source in the order of its minute folders, the order of the table data.
+'''
+
+import os
+import sys
+import json
+import shutil
+import subprocess
+import pytest
+
+BACKEND_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_PATH = os.path.join(BACKEND_FOLDER, 'sort_raw_exabgp_data.py')
+FIXTURE_PATH = os.path.join(BACKEND_FOLDER, 'tests', 'fixtures', 'exabgp_sample.jsons')
+
+sys.path.insert(0, BACKEND_FOLDER)
+
+# Data sources sorted from the fixture and the options of sort_raw_exabgp_data.py they are sorted with
+DATA_SOURCES = {'plain': [], 'columnar': ['--columnar']}
+
+@pytest.fixture(scope='session')
+def work_folder(tmp_path_factory):
+    folder_path = str(tmp_path_factory.mktemp('work'))
+    raw_dataset_path = os.path.join(folder_path, 'raw.jsons')
+    shutil.copyfile(FIXTURE_PATH, raw_dataset_path)
+
+    for data_source, options in DATA_SOURCES.items():
+        subprocess.run([sys.executable, SCRIPT_PATH, data_source, raw_dataset_path, *options],
+                       cwd=folder_path, check=True, stdout=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+
+    # the Flask app reads ./database, so the tests of the app run in the work folder
+    current_folder_path = os.getcwd()
+    os.chdir(folder_path)
+    yield folder_path
+    os.chdir(current_folder_path)
+
+@pytest.fixture(scope='session')
+def client(work_folder):
+    import app
+    app.app.config['TESTING'] = True
+    return app.app.test_client()
+
+# Function to read the records of a data source, minute folder by minute folder
+def read_records(data_source):
+    records = []
+    for current_path, folder_names, file_names in os.walk(os.path.join('database', data_source)):
+        folder_names.sort()
+        if 'datasets.json' in file_names:
+            with open(os.path.join(current_path, 'datasets.json'), 'r') as f:
+                records.extend(json.loads(line) for line in f if line.strip())
+    return records
@@ -0,0 +1,114 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script tests the pages read with a cursor and the exports of '/api/export' (see export.py) against the records
+of the data sources of conftest.py. It includes the following key functionalities:
+
+1. test_cursor_pages_read_every_record Function:
+   - Reads all pages of a data source and of its filtered data with a cursor, with pages that end within and at the
+     end of the minute folders, and compares them with the records. test_invalid_cursor checks the error of a
+     cursor that can't be decoded.
+
+2. test_ndjson_export and test_csv_export Functions:
+   - Compare the lines of the NDJSON export and the rows of the CSV export (columns of the record format and
+     other_keys) with the records.
+
+3. test_export_unpins_entry Function:
+   - Checks that the cache entry of a filtered export is pinned while it is sent and unpinned afterwards.
+
+Run from the backend folder with: python -m pytest tests
+'''
+
+import io
+import csv
+import json
+import uuid
+import pytest
+from conftest import read_records
+from helper.hierarchy import RECORD_KEYS
+from helper import result_cache
+
+# Filters of the tested pages, the records of the filter have to be selected by select_records
+TABLE_FILTERS = [[], [{"key": "aspath", "value": "174"}]]
+
+# Function to select the records of a data source matching a filter of TABLE_FILTERS
+def select_records(data_source, table_filter):
+    records = read_records(data_source)
+    if table_filter:
+        records = [record for record in records if table_filter[0]["value"] in record["aspath"]]
+    return records
+
+# Function to read all pages of a data source with a cursor
+def read_cursor_pages(client, data_source, table_filter, page_size):
+    pages, cursor = [], ""
+    session_id = str(uuid.uuid4())
+    while cursor is not None:
+        response = client.post(f'/api/data?page_size={page_size}', json={
+            "data_source": data_source, "table_filter": table_filter, "uuid": [session_id],
+            "pagination_req": cursor != "", "cursor": cursor
+        })
+        assert response.status_code == 200, response.json
+        pages.append(response.json["tableData"])
+        cursor = response.json["cursor"]
+    return pages
+
+# Function to export a data source, returns the text of the export (the response is closed like by the server)
+def request_export(client, data_source, table_filter, export_format):
+    with client.post('/api/export', json={
+        "data_source": data_source, "table_filter": table_filter, "uuid": [str(uuid.uuid4())], "format": export_format
+    }) as response:
+        assert response.status_code == 200
+        return response.get_data(as_text=True)
+
+@pytest.mark.parametrize('data_source', ['plain', 'columnar'])
+@pytest.mark.parametrize('table_filter', TABLE_FILTERS)
+@pytest.mark.parametrize('page_size', [1, 7, 100])
+def test_cursor_pages_read_every_record(client, data_source, table_filter, page_size):
+    records = select_records(data_source, table_filter)
+    pages = read_cursor_pages(client, data_source, table_filter, page_size)
+
+    assert all(len(page) == page_size for page in pages[:-1])
+    assert [record for page in pages for record in page] == records
+
+def test_invalid_cursor(client):
+    response = client.post('/api/data', json={"data_source": "plain", "table_filter": [], "uuid": ["session"], "cursor": "x"})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('data_source', ['plain', 'columnar'])
+@pytest.mark.parametrize('table_filter', TABLE_FILTERS)
+def test_ndjson_export(client, data_source, table_filter):
+    export = request_export(client, data_source, table_filter, 'ndjson')
+    assert [json.loads(line) for line in export.splitlines()] == select_records(data_source, table_filter)
+
+@pytest.mark.parametrize('table_filter', TABLE_FILTERS)
+def test_csv_export(client, table_filter):
+    reader = csv.reader(io.StringIO(request_export(client, 'columnar', table_filter, 'csv')))
+    assert next(reader) == list(RECORD_KEYS) + ["other_keys"]
+
+    rows = list(reader)
+    records = select_records('columnar', table_filter)
+    assert len(rows) == len(records)
+    for row, record in zip(rows, records):
+        values = dict(zip(RECORD_KEYS, row))
+        assert values["prefix"] == record["prefix"]
+        assert values["aspath"] == ' '.join(str(asn) for asn in record["aspath"])
+        assert int(values["timestamp"]) == record["timestamp"]
+        other_keys = {key: value for key, value in record.items() if key not in RECORD_KEYS}
+        assert (json.loads(row[-1]) if row[-1] else {}) == other_keys
+
+def test_export_unpins_entry(client):
+    response = client.post('/api/export', json={
+        "data_source": "columnar", "table_filter": TABLE_FILTERS[1], "uuid": [str(uuid.uuid4())], "format": "ndjson"
+    }, buffered=False)
+    assert response.status_code == 200
+    assert result_cache.PINNED_ENTRIES
+
+    response.get_data()
+    response.close()
+    assert not result_cache.PINNED_ENTRIES
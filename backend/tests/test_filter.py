@@ -0,0 +1,175 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script tests that both filter backends of filter.py (local_filter.py and spark_filter.py) return the same
+records as a plain Python evaluation of the filters on the records of the fixture. It includes the following key
+functionalities:
+
+1. test_local_filter_matches_reference Function:
+   - Filters the data sources 'plain' and 'columnar' (see conftest.py) with the local backend through /api/data and
+     compares the table data and datasetSum with the records selected by matches_filter.
+
+2. test_spark_filter_matches_local_filter Function:
+   - Filters the data source 'plain' with the Spark backend and compares the records with the local backend, the
+     test is skipped if PySpark isn't installed.
+
+3. test_evicted_entry_is_filtered_again Function:
+   - Removes the cache entry of a filter and checks that its page isn't read from the removed entry and that the
+     next request filters the records again.
+
+Run from the backend folder with: python -m pytest tests
+'''
+
+import re
+import uuid
+import shutil
+import ipaddress
+import pytest
+from conftest import read_records
+
+# Filter sets that are tested, each one alone and together with a filter on aspa2
+FILTER_SETS = [
+    [{"key": "aspath", "value": "174"}],
+    [{"key": "aspath", "value": "174 56203"}],
+    [{"key": "aspath", "value": "0174"}],
+    [{"key": "prefix", "value": "172.10.4.0"}],
+    [{"key": "sourceip", "value": "80.249.208.17"}],
+    [{"key": "nexthopip", "value": "80.249.209.15"}, {"key": "numberpeers", "value": " 17.9 "}],
+    [{"key": "sourceasn", "value": "6939"}, {"key": "roa1", "value": 1}],
+    [{"key": "sourceasn", "value": 174}],
+    [{"key": "aspa1", "value": "x"}],
+    [{"key": "length", "value": "24"}, {"key": "timestamp", "value": 1559794024}],
+    [{"key": "prefix", "operator": "covered_by", "value": "172.13.0.0/16"}],
+    [{"key": "prefix", "operator": "covered_by", "value": "2001:db8::/32"}],
+    [{"key": "prefix", "operator": "covers", "value": "172.16.6.5"}],
+    [{"key": "prefix", "operator": "lpm", "value": "172.16.6.5"}],
+    [{"key": "prefix", "operator": "lpm", "value": "172.13.7.9"}, {"key": "aspa1", "value": 2}],
+    [{"key": "numberpeers", "operator": "gt", "value": 17}],
+    [{"key": "numberpeers", "operator": "ge", "value": "17.5"}, {"key": "roa1", "operator": "lt", "value": 2}],
+    [{"key": "length", "operator": "le", "value": 20.5}],
+    [{"key": "timestamp", "operator": "between", "value": [1559780000, "1559790000"]}],
+    [{"key": "aspa1", "operator": "between", "value": [2, 1]}],
+]
+
+EXTRA_FILTER = {"key": "aspa2", "value": "2"}
+
+# Comparisons of the range operators
+RANGE_COMPARISONS = {
+    "gt": lambda number, value: number > value,
+    "ge": lambda number, value: number >= value,
+    "lt": lambda number, value: number < value,
+    "le": lambda number, value: number <= value,
+    "between": lambda number, value: value[0] <= number <= value[1]
+}
+
+# Keys of the records with string values, the other keys are compared as 64 bit integers like Spark does
+STRING_KEYS = ("prefix", "sourceip", "nexthopip", "sourceasn")
+
+# Strings that Spark converts into a 64 bit integer (the digits after the point are dropped)
+SPARK_LONG_PATTERN = re.compile(r'^[+-]?\d+(\.\d*)?$')
+
+# Function to check if a record matches a filter the way Spark compares the values
+def matches_filter(record, filter_item):
+    key, value = filter_item["key"], filter_item["value"]
+
+    if filter_item.get("operator") in RANGE_COMPARISONS:
+        bounds = [float(bound) for bound in value] if isinstance(value, list) else float(value)
+        return RANGE_COMPARISONS[filter_item["operator"]](record[key], bounds)
+
+    if filter_item.get("operator") is not None:
+        network = ipaddress.ip_network(value, strict=False)
+        record_network = ipaddress.ip_network(f"{record['prefix']}/{record['length']}", strict=False)
+        if network.version != record_network.version:
+            return False
+        if filter_item["operator"] == "covered_by":
+            return record_network.subnet_of(network)
+        # covers and lpm, lpm only keeps the longest of the covering prefixes
+        return network.subnet_of(record_network)
+
+    if key == "aspath":
+        return all(asn in record["aspath"] for asn in value.split())
+    if key in STRING_KEYS:
+        if isinstance(value, str):
+            return record[key] == value
+        return record[key].isdigit() and int(record[key]) == value
+
+    if isinstance(value, str):
+        value = value.strip()
+        if not SPARK_LONG_PATTERN.match(value):
+            return False
+        value = int(value.split('.')[0])
+    return record[key] == value
+
+# Function to filter the records of a data source with Python
+def filter_records(data_source, filter_values):
+    records = [record for record in read_records(data_source) if all(matches_filter(record, f) for f in filter_values)]
+
+    # lpm keeps the records with the longest prefix among the records matching all filters
+    if records and any(filter_item.get("operator") == "lpm" for filter_item in filter_values):
+        longest_length = max(record["length"] for record in records)
+        records = [record for record in records if record["length"] == longest_length]
+    return records
+
+# Function to get all filtered records of a data source and their number from /api/data
+def request_filtered_data(client, data_source, filter_values):
+    response = client.post('/api/data?page_size=1000&page_number=1', json={
+        "data_source": data_source, "table_filter": filter_values, "uuid": [str(uuid.uuid4())], "pagination_req": False
+    })
+    assert response.status_code == 200, response.json
+    return response.json["tableData"], response.json["datasetSum"]
+
+def get_filter_sets():
+    return FILTER_SETS + [filter_values + [EXTRA_FILTER] for filter_values in FILTER_SETS]
+
+@pytest.fixture
+def local_backend(client, monkeypatch):
+    from helper import filter
+    monkeypatch.setattr(filter, 'FILTER_BACKEND', 'local')
+
+@pytest.mark.parametrize('data_source', ['plain', 'columnar'])
+@pytest.mark.parametrize('filter_values', get_filter_sets())
+def test_local_filter_matches_reference(client, local_backend, data_source, filter_values):
+    expected_records = filter_records(data_source, filter_values)
+    table_data, dataset_sum = request_filtered_data(client, data_source, filter_values)
+
+    assert dataset_sum == len(expected_records)
+    assert table_data == expected_records
+
+@pytest.mark.parametrize('filter_values', get_filter_sets())
+def test_spark_filter_matches_local_filter(client, monkeypatch, filter_values):
+    pytest.importorskip('pyspark')
+    from helper import filter
+    from helper.spark_engine import start_spark_engine
+    from helper.result_cache import RESULT_CACHE_PATH
+    start_spark_engine()
+
+    # the results of both backends have the same cache key, so the cache is cleared before each backend filters
+    shutil.rmtree(RESULT_CACHE_PATH, ignore_errors=True)
+    monkeypatch.setattr(filter, 'FILTER_BACKEND', 'local')
+    local_table_data, local_dataset_sum = request_filtered_data(client, 'plain', filter_values)
+    shutil.rmtree(RESULT_CACHE_PATH, ignore_errors=True)
+    monkeypatch.setattr(filter, 'FILTER_BACKEND', 'spark')
+    spark_table_data, spark_dataset_sum = request_filtered_data(client, 'plain', filter_values)
+
+    # Spark writes the records in the order of the file splits
+    assert spark_dataset_sum == local_dataset_sum
+    assert sorted(map(str, spark_table_data)) == sorted(map(str, local_table_data))
+
+@pytest.mark.parametrize('data_source', ['plain', 'columnar'])
+def test_evicted_entry_is_filtered_again(client, local_backend, data_source):
+    from helper.filter import filter_table_data, read_filtered_data_lines
+    filter_values = FILTER_SETS[0]
+    entry_path, _ = filter_table_data(data_source, filter_values, str(uuid.uuid4()))
+
+    # the entry is removed from the cache after it was found, the page can't be read from it any more
+    shutil.rmtree(entry_path)
+    assert read_filtered_data_lines(entry_path, 1, 25) is None
+
+    table_data, dataset_sum = request_filtered_data(client, data_source, filter_values)
+    assert table_data == filter_records(data_source, filter_values)
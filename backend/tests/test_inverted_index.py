@@ -0,0 +1,76 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script tests the inverted indexes of the day folders of the data source 'columnar' (see conftest.py and
+inverted_index.py). It includes the following key functionalities:
+
+1. test_day_index_covers_all_minute_folders Function:
+   - Checks that each day folder has an up-to-date index of all of its minute folders.
+
+2. test_index_rows_match_records Function:
+   - Looks up the values of the records in the indexes and compares the row ids with the rows of the records with
+     the value in the datasets.json files of the minute folders.
+
+Run from the backend folder with: python -m pytest tests
+'''
+
+import os
+import json
+import pytest
+import numpy as np
+from helper.inverted_index import load_day_index, find_index_rows, get_row_ids
+from helper.dictionary import load_dictionary_tables
+from helper.local_filter import get_filter_index_keys
+
+DATA_SOURCE_PATH = os.path.join('database', 'columnar')
+
+# Function to get the day folders of the data source
+def get_day_folders():
+    return [os.path.join(DATA_SOURCE_PATH, name) for name in sorted(os.listdir(DATA_SOURCE_PATH))
+            if os.path.isdir(os.path.join(DATA_SOURCE_PATH, name, 'index'))]
+
+# Function to read the records of the minute folders of an index, (row id, record) pairs
+def read_index_records(day_folder_path, index):
+    records = []
+    for partition_number, partition in enumerate(index["partitions"]):
+        with open(os.path.join(day_folder_path, partition, 'datasets.json'), 'r') as f:
+            for row, line in enumerate(f):
+                records.append((int(get_row_ids(partition_number, np.array([row]))[0]), json.loads(line)))
+    return records
+
+# Function to check if a record has the value of an index
+def record_has_value(record, key, value):
+    if key == "aspath":
+        return value in record["aspath"]
+    return record[key] == value
+
+def test_day_index_covers_all_minute_folders(work_folder):
+    day_folder_paths = get_day_folders()
+    assert len(day_folder_paths) == 2
+
+    for day_folder_path in day_folder_paths:
+        index = load_day_index(day_folder_path)
+        assert index is not None
+        assert index.get("unindexed", []) == []
+
+@pytest.mark.parametrize('key', ['aspath', 'sourceasn', 'sourceip', 'nexthopip', 'prefix'])
+def test_index_rows_match_records(work_folder, key):
+    dictionary = load_dictionary_tables(DATA_SOURCE_PATH)
+
+    for day_folder_path in get_day_folders():
+        index = load_day_index(day_folder_path)
+        records = read_index_records(day_folder_path, index)
+        values = {value for _, record in records[:50] for value in (record[key] if key == "aspath" else [record[key]])}
+
+        for value in sorted(values):
+            keys = get_filter_index_keys(dictionary, key, value)
+            assert keys is not None and len(keys) == 1
+
+            expected_row_ids = [row_id for row_id, record in records if record_has_value(record, key, value)]
+            assert find_index_rows(index, key, keys[0]).tolist() == expected_row_ids, value
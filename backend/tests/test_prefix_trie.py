@@ -0,0 +1,77 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script tests the radix trie of prefix_trie.py against a comparison of each prefix with the searched network.
+It includes the following key functionalities:
+
+1. create_trie Function:
+   - Builds a trie like the day index does (see inverted_index.py) from random IPv4 and IPv6 prefixes, nested
+     into each other and some of them occurring in several rows.
+
+2. test_find_covered_rows and test_find_covering_rows Functions:
+   - Compare the rows found in the trie with the rows whose prefix is covered by or covers the searched network.
+
+Run from the backend folder with: python -m pytest tests
+'''
+
+import random
+import numpy as np
+import pytest
+from helper.inverted_index import build_postings
+from helper.prefix_trie import UINT64_MASK, get_address_width, mask_address, network_covers, build_trie_parents, \
+    find_covered_rows, find_covering_rows
+
+# Function to create random networks (family, masked address, length), more-specifics of earlier networks are frequent
+def create_networks(rng, count):
+    networks = []
+    for _ in range(count):
+        if networks and rng.random() < 0.6:
+            # a more-specific of an earlier network: its address with random host bits
+            family, address, length = rng.choice(networks)
+            address |= rng.getrandbits(get_address_width(family) - length) if length < get_address_width(family) else 0
+            length = min(length + rng.randrange(0, 9), get_address_width(family))
+        else:
+            family = rng.choice((4, 6))
+            address = rng.getrandbits(get_address_width(family))
+            length = rng.randrange(0, get_address_width(family) + 1)
+        networks.append((family, mask_address(family, address, length), length))
+    return networks
+
+# Function to build a trie of the network of each row
+def create_trie(row_networks):
+    families = np.array([network[0] for network in row_networks], dtype=np.uint8)
+    prefix_his = np.array([network[1] >> 64 for network in row_networks], dtype=np.uint64)
+    prefix_los = np.array([network[1] & UINT64_MASK for network in row_networks], dtype=np.uint64)
+    lengths = np.array([network[2] for network in row_networks], dtype=np.uint8)
+
+    keys, offsets, rows = build_postings([families, prefix_his, prefix_los, lengths], np.arange(len(row_networks), dtype=np.uint64))
+    return {"keys": keys, "offsets": offsets, "rows": rows, "parent": build_trie_parents(keys)}
+
+@pytest.fixture(scope='module')
+def row_networks():
+    rng = random.Random(1)
+    networks = create_networks(rng, 300)
+    return [rng.choice(networks) for _ in range(1000)]
+
+@pytest.fixture(scope='module')
+def searched_networks(row_networks):
+    rng = random.Random(2)
+    return list(set(row_networks[:100])) + create_networks(rng, 100)
+
+def test_find_covered_rows(row_networks, searched_networks):
+    trie = create_trie(row_networks)
+    for network in searched_networks:
+        expected_rows = [row for row, row_network in enumerate(row_networks) if network_covers(network, row_network)]
+        assert find_covered_rows(trie, network).tolist() == expected_rows, network
+
+def test_find_covering_rows(row_networks, searched_networks):
+    trie = create_trie(row_networks)
+    for network in searched_networks:
+        expected_rows = [row for row, row_network in enumerate(row_networks) if network_covers(row_network, network)]
+        assert find_covering_rows(trie, network).tolist() == expected_rows, network
@@ -0,0 +1,93 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script tests the charts of time ranges of '/api/range' (see range_counts.py) against the records of the data
+source 'plain' of conftest.py counted per bucket. It includes the following key functionalities:
+
+1. test_range_counts_match_scan Function:
+   - Requests ranges within a day, across the day folders and beyond the records with different bucket widths
+     and compares the datasetSum, graphData and pieData with the counts of a scan of the records.
+
+2. test_range_counts_of_iso_times Function:
+   - Checks that a range given in ISO 8601 times of a folder below the root folder counts the same records as
+     the range in unix time.
+
+3. test_invalid_range Function:
+   - Checks the errors for an invalid range, too many buckets and an unknown data source.
+
+Run from the backend folder with: python -m pytest tests
+'''
+
+from datetime import datetime, timezone
+import pytest
+from conftest import read_records
+
+# Validation keys of the records and the chart state of their values
+VALIDATION_STATES = {
+    "ROA": ("roa1", {2: "invalid", 0: "valid", 1: "unknown"}),
+    "ASPA_CAIDA": ("aspa2", {1: "invalid", 2: "valid", 0: "unknown"}),
+    "ASPA_AI": ("aspa1", {1: "invalid", 2: "valid", 0: "unknown"})
+}
+
+DAY_START = 1559779200
+
+# Ranges (start, end, bucket width) that are tested, the records are from DAY_START + 154 to DAY_START + 172196
+RANGES = [
+    (DAY_START, DAY_START + 3600, 60),
+    (DAY_START + 7, DAY_START + 7 + 10000, 997),
+    (DAY_START + 86400 - 5000, DAY_START + 86400 + 5000, 1000),
+    (DAY_START - 86400, DAY_START + 3 * 86400, 86400),
+    (DAY_START + 172000, DAY_START + 172300, 1),
+]
+
+# Function to count the records of the buckets of a range like the range counts do
+def count_range(records, start, end, width):
+    limits = list(range(start, end, width)) + [end]
+    counts = {"datasetSum": 0, "graphData": [], "pieData": {validation: {"invalid": 0, "valid": 0, "unknown": 0} for validation in VALIDATION_STATES}}
+
+    for bucket_start, bucket_end in zip(limits, limits[1:]):
+        bucket_time = datetime.fromtimestamp(bucket_start, timezone.utc)
+        dataset = {"label": bucket_time.strftime("%d.%m.%Y - %H:%M:%S")}
+        dataset.update({validation: {"invalid": 0, "valid": 0, "unknown": 0} for validation in VALIDATION_STATES})
+
+        for record in records:
+            if bucket_start <= record["timestamp"] < bucket_end:
+                counts["datasetSum"] += 1
+                for validation, (key, states) in VALIDATION_STATES.items():
+                    if record[key] in states:
+                        dataset[validation][states[record[key]]] += 1
+                        counts["pieData"][validation][states[record[key]]] += 1
+        counts["graphData"].append(dataset)
+
+    return counts
+
+@pytest.mark.parametrize('start, end, width', RANGES)
+def test_range_counts_match_scan(client, start, end, width):
+    expected_counts = count_range(read_records('plain'), start, end, width)
+    response = client.get(f'/api/range?data_source=plain&start={start}&end={end}&bucket={width}')
+    assert response.status_code == 200, response.json
+
+    assert response.json["datasetSum"] == expected_counts["datasetSum"]
+    assert response.json["pieData"] == expected_counts["pieData"]
+    assert response.json["graphData"] == expected_counts["graphData"]
+
+def test_range_counts_of_iso_times(client):
+    response = client.get('/api/range?data_source=plain/2019-06-06&start=2019-06-06T00:00:00&end=2019-06-06T01:00:00Z&bucket=600')
+    assert response.status_code == 200, response.json
+    assert response.json == client.get(f'/api/range?data_source=plain&start={DAY_START}&end={DAY_START + 3600}&bucket=600').json
+
+@pytest.mark.parametrize('query, status_code', [
+    ('data_source=plain&start=10&end=10', 400),
+    ('data_source=plain&start=x&end=10', 400),
+    ('data_source=plain&start=0&end=1000000&bucket=1', 400),
+    ('data_source=plain&start=0&end=10&bucket=0', 400),
+    ('data_source=unknown&start=0&end=10', 404),
+])
+def test_invalid_range(client, query, status_code):
+    assert client.get(f'/api/range?{query}').status_code == status_code
@@ -0,0 +1,51 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script tests the ETags and the compression of the JSON responses of the Flask app (see response_encoding.py).
+It includes the following key functionalities:
+
+1. test_page_is_revalidated Function:
+   - Checks that a page of '/api/data' requested with GET gets the ETag of the response-data.json, is answered with
+     304 Not Modified for this ETag and has the same body as the page requested with POST.
+
+2. test_unknown_data_source_has_no_etag Function:
+   - Checks that a data source that doesn't exist is not found, also with the ETag of a time period without records.
+
+3. test_response_is_compressed Function:
+   - Checks that a large JSON response is compressed with gzip if the client accepts it.
+
+Run from the backend folder with: python -m pytest tests
+'''
+
+import gzip
+import json
+import pytest
+
+PAGE_QUERY = 'page_size=25&page_number=2'
+
+def test_page_is_revalidated(client):
+    response = client.get(f'/api/data?{PAGE_QUERY}&data_source=plain&uuid=etag&pagination_req=true')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag == client.get('/api/data/aggregate?data_source=plain').headers['ETag']
+
+    assert client.get(f'/api/data?{PAGE_QUERY}&data_source=plain&uuid=etag&pagination_req=true',
+                      headers={'If-None-Match': etag}).status_code == 304
+    assert client.post(f'/api/data?{PAGE_QUERY}', json={
+        "data_source": "plain", "table_filter": [], "uuid": ["etag"], "pagination_req": True
+    }).json == response.json
+
+@pytest.mark.parametrize('url', ['/api/data?data_source=unknown', '/api/data/aggregate?data_source=unknown'])
+def test_unknown_data_source_has_no_etag(client, url):
+    assert client.get(url, headers={'If-None-Match': '"empty"'}).status_code == 404
+
+def test_response_is_compressed(client):
+    response = client.get('/api/data?page_size=100&data_source=plain&uuid=gzip', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert len(json.loads(gzip.decompress(response.data))["tableData"]) == 100
@@ -0,0 +1,125 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script tests the cache of filtered data of result_cache.py in a temporary folder. It includes the following
+key functionalities:
+
+1. test_filters_share_entry Function:
+   - Checks that the same filters in another order find the entry stored for them, until records are added.
+
+2. test_least_recently_used_entry_is_evicted Function:
+   - Stores entries above FILTER_CACHE_MAX_BYTES and checks that the least recently used ones are removed.
+
+3. test_expired_entry_is_evicted Function:
+   - Checks that entries unused for FILTER_CACHE_SESSION_TTL are removed unless a session still references them.
+
+4. test_pinned_entry_is_not_evicted Function:
+   - Checks that a pinned entry stays in the cache above FILTER_CACHE_MAX_BYTES until it is unpinned.
+
+Run from the backend folder with: python -m pytest tests
+'''
+
+import os
+import time
+import pytest
+from helper import result_cache
+
+DATA_SOURCE = 'sample'
+
+FILTERS = [
+    [{"key": "aspath", "value": "174"}],
+    [{"key": "sourceasn", "value": "6939"}],
+    [{"key": "roa1", "value": 1}],
+]
+
+@pytest.fixture
+def data_source_path(tmp_path, monkeypatch):
+    filtered_data_path = str(tmp_path / 'filtered_data')
+    monkeypatch.setattr(result_cache, 'FILTERED_DATA_PATH', filtered_data_path)
+    monkeypatch.setattr(result_cache, 'RESULT_CACHE_PATH', os.path.join(filtered_data_path, 'cache'))
+    monkeypatch.setattr(result_cache, 'SESSION_REFERENCE_PATH', os.path.join(filtered_data_path, 'sessions'))
+
+    path = tmp_path / DATA_SOURCE
+    path.mkdir()
+    (path / 'response-data.json').write_text('{}')
+    return str(path)
+
+# Function to store an entry with a filtered data file of size bytes (and the meta data) for filters
+def store_entry(data_source_path, filter_values, size=100):
+    temp_path = result_cache.get_temp_entry_path()
+    os.makedirs(temp_path)
+    with open(os.path.join(temp_path, 'part-00000.json'), 'w') as f:
+        f.write('x' * size)
+
+    version = result_cache.get_data_source_version(data_source_path)
+    return result_cache.store_cached_result(DATA_SOURCE, data_source_path, filter_values, version, temp_path, size)
+
+# Function to set the time of the last use of an entry
+def set_last_used(entry_path, last_used):
+    os.utime(os.path.join(entry_path, result_cache.ENTRY_META_FILE), (last_used, last_used))
+
+def test_filters_share_entry(data_source_path):
+    filter_values = FILTERS[0] + FILTERS[1]
+    entry_path = store_entry(data_source_path, filter_values)
+
+    assert result_cache.find_cached_result(DATA_SOURCE, data_source_path, list(reversed(filter_values))) == (entry_path, 100)
+    assert result_cache.find_cached_result(DATA_SOURCE, data_source_path, FILTERS[0]) is None
+
+    # records added to the data source rewrite its response-data.json, the entry is outdated
+    os.utime(os.path.join(data_source_path, 'response-data.json'), ns=(0, 0))
+    assert result_cache.find_cached_result(DATA_SOURCE, data_source_path, filter_values) is None
+
+def test_least_recently_used_entry_is_evicted(data_source_path, monkeypatch):
+    monkeypatch.setattr(result_cache, 'FILTER_CACHE_MAX_BYTES', 2000)
+    now = time.time()
+    first_entry_path = store_entry(data_source_path, FILTERS[0], 700)
+    second_entry_path = store_entry(data_source_path, FILTERS[1], 700)
+    set_last_used(first_entry_path, now - 20)
+    set_last_used(second_entry_path, now - 10)
+
+    # the first entry is used again, so the second one is the least recently used entry
+    assert result_cache.find_cached_result(DATA_SOURCE, data_source_path, FILTERS[0]) is not None
+    third_entry_path = store_entry(data_source_path, FILTERS[2], 700)
+
+    assert os.path.isdir(first_entry_path)
+    assert not os.path.isdir(second_entry_path)
+    assert os.path.isdir(third_entry_path)
+
+def test_expired_entry_is_evicted(data_source_path, monkeypatch):
+    monkeypatch.setattr(result_cache, 'FILTER_CACHE_SESSION_TTL', 60)
+    expired_time = time.time() - 120
+    referenced_entry_path = store_entry(data_source_path, FILTERS[0])
+    unreferenced_entry_path = store_entry(data_source_path, FILTERS[1])
+    result_cache.set_session_result('session', referenced_entry_path)
+    set_last_used(referenced_entry_path, expired_time)
+    set_last_used(unreferenced_entry_path, expired_time)
+
+    store_entry(data_source_path, FILTERS[2])
+    assert os.path.isdir(referenced_entry_path)
+    assert not os.path.isdir(unreferenced_entry_path)
+
+    # the reference of a session unused for the TTL is removed too, then its entry is evicted
+    reference_path = os.path.join(result_cache.SESSION_REFERENCE_PATH, 'session')
+    os.utime(reference_path, (expired_time, expired_time))
+    result_cache.evict_cached_results()
+    assert not os.path.exists(reference_path)
+    assert not os.path.isdir(referenced_entry_path)
+
+def test_pinned_entry_is_not_evicted(data_source_path, monkeypatch):
+    monkeypatch.setattr(result_cache, 'FILTER_CACHE_MAX_BYTES', 1000)
+    pinned_entry_path = store_entry(data_source_path, FILTERS[0], 700)
+    assert result_cache.pin_cached_result(pinned_entry_path)
+
+    store_entry(data_source_path, FILTERS[1], 700)
+    assert os.path.isdir(pinned_entry_path)
+
+    result_cache.unpin_cached_result(pinned_entry_path)
+    store_entry(data_source_path, FILTERS[2], 700)
+    assert not os.path.isdir(pinned_entry_path)
+    assert not result_cache.pin_cached_result(pinned_entry_path)
@@ -0,0 +1,97 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script tests the table data sorted on the server (see sort_permutation.py) against the records of the data
+sources of conftest.py sorted with Python. It includes the following key functionalities:
+
+1. test_sorted_pages_match_reference Function:
+   - Requests sorted pages of all records and of filtered records through /api/data, in ascending and descending
+     order, and compares them with the pages of the sorted records.
+
+2. test_sorted_page_of_evicted_entry Function:
+   - Removes the cache entry after the first sorted page and checks that it isn't read any more and that the next
+     page is still sorted.
+
+Run from the backend folder with: python -m pytest tests
+'''
+
+import uuid
+import shutil
+import ipaddress
+import pytest
+from conftest import read_records
+
+SORT_KEYS = ["prefix", "length", "roa1", "aspa1", "aspa2", "numberpeers", "timestamp"]
+
+# Filters of the tested pages, the records of the filter have to be selected by select_records
+TABLE_FILTERS = [[], [{"key": "aspath", "value": "174"}]]
+
+PAGE_SIZE = 25
+
+# Function to get the value a record is sorted by, prefixes are sorted by IP version, address and length
+def get_sort_value(record, sort_by):
+    if sort_by == "prefix":
+        address = ipaddress.ip_address(record["prefix"])
+        return address.version, int(address), record["length"]
+    return record[sort_by]
+
+# Function to select the records of a data source matching a filter of TABLE_FILTERS
+def select_records(data_source, table_filter):
+    records = read_records(data_source)
+    if table_filter:
+        records = [record for record in records if table_filter[0]["value"] in record["aspath"]]
+    return records
+
+# Function to sort records like the server, records with the same value are in time order (reversed for desc)
+def sort_records(records, sort_by, sort_order):
+    sorted_records = sorted(records, key=lambda record: get_sort_value(record, sort_by))
+    return sorted_records[::-1] if sort_order == "desc" else sorted_records
+
+# Function to get a sorted page from /api/data
+def request_sorted_page(client, data_source, table_filter, sort_by, sort_order, page_number, session_id):
+    response = client.post(f'/api/data?page_size={PAGE_SIZE}&page_number={page_number}', json={
+        "data_source": data_source, "table_filter": table_filter, "uuid": [session_id],
+        "pagination_req": page_number > 1, "sort_by": sort_by, "sort_order": sort_order
+    })
+    assert response.status_code == 200, response.json
+    return response.json["tableData"]
+
+@pytest.mark.parametrize('data_source', ['plain', 'columnar'])
+@pytest.mark.parametrize('table_filter', TABLE_FILTERS)
+@pytest.mark.parametrize('sort_order', ['asc', 'desc'])
+def test_sorted_pages_match_reference(client, data_source, table_filter, sort_order):
+    records = select_records(data_source, table_filter)
+    session_id = str(uuid.uuid4())
+
+    for sort_by in SORT_KEYS:
+        sorted_records = sort_records(records, sort_by, sort_order)
+        for page_number in (1, 2, len(records) // PAGE_SIZE + 1):
+            page = request_sorted_page(client, data_source, table_filter, sort_by, sort_order, page_number, session_id)
+            start_index = (page_number - 1) * PAGE_SIZE
+            assert page == sorted_records[start_index:start_index + PAGE_SIZE], (sort_by, page_number)
+
+@pytest.mark.parametrize('table_filter', TABLE_FILTERS)
+def test_sorted_page_of_evicted_entry(client, table_filter):
+    from helper.filter import filter_table_data, get_data_source_result, read_sorted_data_lines
+    from helper import row_bitmap
+    sorted_records = sort_records(select_records('columnar', table_filter), "numberpeers", "desc")
+    session_id = str(uuid.uuid4())
+
+    assert request_sorted_page(client, 'columnar', table_filter, "numberpeers", "desc", 1, session_id) == sorted_records[:PAGE_SIZE]
+    if table_filter:
+        entry_path, _ = filter_table_data('columnar', table_filter, session_id)
+    else:
+        entry_path, _ = get_data_source_result('columnar')
+
+    # the entry is removed from the cache after it was found and its bitmap from memory, the page can't be read from it any more
+    shutil.rmtree(entry_path)
+    with row_bitmap.LOADED_BITMAPS_LOCK:
+        row_bitmap.LOADED_BITMAPS.clear()
+    assert read_sorted_data_lines(entry_path, 2, PAGE_SIZE, "numberpeers", "desc") is None
+    assert request_sorted_page(client, 'columnar', table_filter, "numberpeers", "desc", 2, session_id) == sorted_records[PAGE_SIZE:2 * PAGE_SIZE]
@@ -0,0 +1,118 @@
+'''
+IM_PRJ - Internet Routing Analysis
+Copyright (c) 2023 Leitwert GmbH. All rights reserved.
+This work is licensed under the terms of the MIT license.
+For a copy, see LICENSE.txt in the project root.
+
+@version: 0.1
+@date: 17.10.2026
+
+This script tests that sort_raw_exabgp_data.py writes the same data source folder, no matter if the raw file is
+sorted by one process, by several processes (--workers) or in two runs (--append). It includes the following
+key functionalities:
+
+1. test_serial_sort_writes_all_records Function:
+   - Checks that the serial run writes every record of the fixture fixtures/exabgp_sample.jsons exactly once.
+
+2. test_parallel_sort_matches_serial_sort Function:
+   - Sorts the fixture serially and with --workers and compares both folders, JSON files (e.g. top-data.json) are
+     compared as parsed JSON.
+
+3. test_appended_sort_matches_serial_sort Function:
+   - Sorts the first half of the fixture, adds the second half with --append (serially and with --workers) and
+     compares the folder with the folder of a single serial run.
+
+Run from the backend folder with: python -m pytest tests
+'''
+
+import os
+import sys
+import json
+import shutil
+import subprocess
+import pytest
+
+BACKEND_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_PATH = os.path.join(BACKEND_FOLDER, 'sort_raw_exabgp_data.py')
+FIXTURE_PATH = os.path.join(BACKEND_FOLDER, 'tests', 'fixtures', 'exabgp_sample.jsons')
+
+ROOT_FOLDER_NAME = 'sample'
+
+# Function to sort the raw file into ./database/sample of work_folder with the given options
+def sort_raw_file(work_folder, raw_dataset_path, *options):
+    os.makedirs(work_folder, exist_ok=True)
+    subprocess.run([sys.executable, SCRIPT_PATH, ROOT_FOLDER_NAME, raw_dataset_path, *options],
+                   cwd=work_folder, check=True, stdout=subprocess.DEVNULL, stdin=subprocess.DEVNULL)
+    return os.path.join(work_folder, 'database', ROOT_FOLDER_NAME)
+
+# Function to read a file of a data source folder, JSON files are parsed because the order of their keys may differ
+def read_tree_file(file_path):
+    with open(file_path, 'rb') as f:
+        content = f.read()
+
+    if file_path.endswith('.json') and not file_path.endswith('datasets.json'):
+        return json.loads(content)
+    return content
+
+# Function to read all files of a data source folder (relative path -> content)
+def read_tree(folder_path):
+    tree = {}
+    for current_path, _, file_names in os.walk(folder_path):
+        for file_name in file_names:
+            file_path = os.path.join(current_path, file_name)
+            tree[os.path.relpath(file_path, folder_path)] = read_tree_file(file_path)
+    return tree
+
+# Function to assert that two data source folders have the same files with the same content
+def assert_same_tree(expected_folder_path, folder_path):
+    expected_tree, tree = read_tree(expected_folder_path), read_tree(folder_path)
+    assert sorted(tree) == sorted(expected_tree)
+
+    different_files = [path for path in expected_tree if tree[path] != expected_tree[path]]
+    assert different_files == []
+
+@pytest.fixture
+def raw_dataset_path(tmp_path):
+    # all runs sort the same file, so their ingest-state.json files have the same path as key
+    path = str(tmp_path / 'raw.jsons')
+    shutil.copyfile(FIXTURE_PATH, path)
+    return path
+
+@pytest.fixture
+def serial_folder_path(tmp_path, raw_dataset_path):
+    return sort_raw_file(str(tmp_path / 'serial'), raw_dataset_path)
+
+def test_serial_sort_writes_all_records(serial_folder_path, raw_dataset_path):
+    with open(raw_dataset_path, 'r') as f:
+        raw_records = sorted(line.strip() for line in f if line.strip())
+
+    sorted_records = []
+    for current_path, _, file_names in os.walk(serial_folder_path):
+        if 'datasets.json' in file_names:
+            with open(os.path.join(current_path, 'datasets.json'), 'r') as f:
+                sorted_records.extend(line.strip() for line in f if line.strip())
+
+    assert sorted(sorted_records) == raw_records
+    assert os.path.isfile(os.path.join(serial_folder_path, 'top-data.json'))
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_parallel_sort_matches_serial_sort(tmp_path, raw_dataset_path, serial_folder_path, workers):
+    parallel_folder_path = sort_raw_file(str(tmp_path / 'parallel'), raw_dataset_path, '--workers', str(workers))
+    assert_same_tree(serial_folder_path, parallel_folder_path)
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_appended_sort_matches_serial_sort(tmp_path, raw_dataset_path, workers):
+    with open(raw_dataset_path, 'r') as f:
+        lines = f.readlines()
+
+    # the first half is sorted, then the second half is added to the raw file and sorted with --append
+    with open(raw_dataset_path, 'w') as f:
+        f.writelines(lines[:len(lines) // 2])
+    appended_folder_path = sort_raw_file(str(tmp_path / 'appended'), raw_dataset_path, '--workers', str(workers))
+
+    with open(raw_dataset_path, 'a') as f:
+        f.writelines(lines[len(lines) // 2:])
+    sort_raw_file(str(tmp_path / 'appended'), raw_dataset_path, '--append', '--workers', str(workers))
+
+    serial_folder_path = sort_raw_file(str(tmp_path / 'serial'), raw_dataset_path)
+    assert_same_tree(serial_folder_path, appended_folder_path)
@@ -41,7 +41,7 @@ export const MetaDataRequest = async (aspathArray) => {
 }
 
 /**
- * Sends a POST request to fetch data based on specified parameters.
+ * Sends a request to fetch data based on specified parameters, a GET request without filters and a POST request with filters.
  * @param {number} pageNumber - Current page number for pagination.
  * @param {number} pageSize - Number of items to fetch per page.
  * @param {string} datasourceFolderPath - Path to the data source.
@@ -55,14 +55,21 @@ export const DataRequest = async (pageNumber, pageSize, datasourceFolderPath, ta
 
     console.log(datasourceFolderPath)
 
-    const requestBody = {
-        data_source: datasourceFolderPath,
-        table_filter: tableFilter,
-        uuid: sessionId,
-        pagination_req: paginationReq
-    };
-
-    const result = await POST(requestEndpoint, requestBody);
+    let result;
+    if (tableFilter.length === 0) {
+        // Pages without filters are GET requests, so the browser revalidates them with their ETag (304 Not Modified)
+        const query = `&data_source=${encodeURIComponent(datasourceFolderPath)}&uuid=${encodeURIComponent(sessionId[0])}&pagination_req=${paginationReq}`;
+        result = await GET(requestEndpoint + query);
+    } else {
+        const requestBody = {
+            data_source: datasourceFolderPath,
+            table_filter: tableFilter,
+            uuid: sessionId,
+            pagination_req: paginationReq
+        };
+
+        result = await POST(requestEndpoint, requestBody);
+    }
 
     for(let i = 0; i < result.tableData.length; i++) {
         const data = result.tableData[i];